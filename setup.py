@@ -44,6 +44,7 @@ setup_args = {
     #                  'aliyunsdkcore.vendored.requests.packages.certifi': ['cacert.pem']},
     'platforms': 'any',
     # 'install_requires': requires,
+    'extras_require': {'prepared': ['mysql-connector-python>=8.0.23']},
     'classifiers': [
         'Development Status :: 5 - Production/Stable',
         'Intended Audience :: Developers',
@@ -10,4 +10,6 @@ SQLite
 2020.01.28 -- _select OFFSET 添加str()
 """
 
-from .sqlite import SQLiteAPI
+from .sqlite import SQLiteAPI, SQLiteSnapshot
+from .kvstore import KVStore
+from .document import DocumentStore
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : cdc.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 01:00
+
+SQLite 表的变更捕获(CDC)：触发器把每行的变更写入变更日志表，消费者只处理增量
+
+    api.enable_cdc('user')                          # 所有连接上的 INSERT / UPDATE / DELETE 都会记录
+    pos = api.cdc_position()
+    for change in api.changes(since=pos):           # {'seq', 'table', 'op': 'I'|'U'|'D', 'key', 'data'}
+        cache.pop(change['key'], None)
+        pos = change['seq']
+    api.prune_changes(pos)                          # 删除已消费的日志
+
+    api.enable_cdc('user', notify=lambda table, op, key: ...)   # 本连接的写入同步回调
+
+    1. 日志表 sqllib_changelog(seq, tbl, op, key, data)；key 为主键值，复合主键为 JSON 数组，没有主键时为 rowid
+    2. with_data=True 时 data 为新行的 JSON(DELETE 为 NULL)，需要 JSON1 且表中不能有 BLOB 值
+    3. 修改主键的 UPDATE 记为旧键的 D 与新键的 U
+    4. notify 以 TEMP 触发器实现，只响应本连接的写入，在写入语句执行中调用(事务可能随后回滚)，回调中不能写数据库；
+       Python 的 sqlite3 没有提供 update hook，这是等价的进程内通知方式
+    5. 表结构变化后重新调用 enable_cdc() 以更新触发器
+"""
+from sqllib.common.common import SQLiteJson
+from sqllib.common.error import SqlKeyNameError
+
+__all__ = ['CHANGELOG', 'enable_cdc', 'disable_cdc', 'changes']
+
+CHANGELOG = 'sqllib_changelog'
+_NOTIFY = 'sqllib_cdc_notify'
+_OPS = (('I', 'INSERT'), ('U', 'UPDATE'), ('D', 'DELETE'))
+
+
+def _key_expr(api, table, row) -> str:
+    """NEW / OLD 行的键表达式"""
+    pks = sorted((_ for _ in api.show_columns(table, name_only=False) if _['pk']), key=lambda _: _['pk'])
+    if not pks:
+        return f'{row}.rowid'
+    if len(pks) == 1:
+        return f'{row}.`{pks[0]["name"]}`'
+    return f'json_array({", ".join(f"{row}.`{_c}`" for _c in (_["name"] for _ in pks))})'
+
+
+def _trigger(table, op, temp=False):
+    return f'{table}_cdc_{op.lower()}{"_notify" if temp else ""}'
+
+
+def _drop_triggers(api, table, temp=False):
+    for op, _ in _OPS:
+        api.write_db(f'DROP TRIGGER IF EXISTS {"temp" if temp else "main"}.`{_trigger(table, op, temp)}`')
+
+
+def enable_cdc(api, table, with_data=False, notify=None):
+    """为 table 安装(或更新)变更捕获触发器，见模块说明"""
+    table = api.get_real_table_name(table)
+    if not api.show_columns(table):
+        raise SqlKeyNameError(f'表 {table} 不存在')
+    api.write_db(f'CREATE TABLE IF NOT EXISTS `{CHANGELOG}` (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                 f'tbl TEXT NOT NULL, op TEXT NOT NULL, key, data TEXT)')
+    new_key, old_key = _key_expr(api, table, 'NEW'), _key_expr(api, table, 'OLD')
+    data = ('json_object(' + ', '.join(f"'{_c}', NEW.`{_c}`" for _c in api.show_columns(table)) + ')'
+            if with_data else 'NULL')
+    _insert = f'INSERT INTO `{CHANGELOG}` (tbl, op, key, data)'
+    body = {
+        'I': f"{_insert} VALUES ('{table}', 'I', {new_key}, {data});",
+        'U': f"{_insert} SELECT '{table}', 'D', {old_key}, NULL WHERE {old_key} IS NOT {new_key}; "
+             f"{_insert} VALUES ('{table}', 'U', {new_key}, {data});",
+        'D': f"{_insert} VALUES ('{table}', 'D', {old_key}, NULL);",
+    }
+    _drop_triggers(api, table)
+    for op, event in _OPS:
+        api.write_db(f'CREATE TRIGGER `{_trigger(table, op)}` AFTER {event} ON `{table}` BEGIN {body[op]} END')
+
+    _drop_triggers(api, table, temp=True)
+    if notify is not None:
+        def _notify(_table, _op, _key):
+            notify(_table, _op, _key)  # 返回值不交给 SQLite
+
+        api.get_connect.create_function(_NOTIFY, 3, _notify)
+        for op, event in _OPS:
+            key = old_key if op == 'D' else new_key
+            api.write_db(f'CREATE TEMP TRIGGER `{_trigger(table, op, True)}` AFTER {event} ON main.`{table}` '
+                         f"BEGIN SELECT {_NOTIFY}('{table}', '{op}', {key}); END")
+
+
+def disable_cdc(api, table):
+    """删除 table 的变更捕获触发器(变更日志保留)"""
+    table = api.get_real_table_name(table)
+    _drop_triggers(api, table)
+    _drop_triggers(api, table, temp=True)
+
+
+def changes(api, since=0, table=None, batch_rows=1000):
+    """按 seq 顺序产出 seq > since 的变更；分批读取，读到末尾时结束"""
+    if not api.read_db('SELECT 1 FROM sqlite_master WHERE type="table" AND name=?', (CHANGELOG,)):
+        return
+    _where = 'seq > ?' + (' AND tbl = ?' if table else '')
+    while True:
+        _args = (since, api.get_real_table_name(table)) if table else (since,)
+        rows = api.read_db(f'SELECT seq, tbl, op, key, data FROM `{CHANGELOG}` WHERE {_where} '
+                           f'ORDER BY seq LIMIT {int(batch_rows)}', _args)
+        for seq, tbl, op, key, data in rows:
+            yield {'seq': seq, 'table': tbl, 'op': op, 'key': key,
+                   'data': None if data is None else SQLiteJson.loads(data)}
+        if len(rows) < batch_rows:
+            return
+        since = rows[-1][0]
@@ -0,0 +1,224 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : document.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 18:20
+
+基于 SQLite JSON1 的文档存储(类 MongoDB 集合)，无需服务器
+
+    1. 每个集合一张表：_id INTEGER PRIMARY KEY, doc TEXT (json_valid 约束)
+    2. create_index('a.b') 为 JSON 路径添加虚拟生成列 `$.a.b` 并在其上建立真正的索引；
+       查询条件命中已索引的路径时直接使用该列，成为索引查找而不是全表扫描
+    3. insert_many 按批次在事务中写入
+
+    with DocumentStore('docs.db') as store:
+        users = store['users']
+        users.create_index('age')
+        users.insert_many([{'name': 'a', 'age': 18}, {'name': 'b', 'age': 30, 'tags': ['x']}])
+        users.find({'age': {'$gte': 20}}, projection=['name'])
+"""
+import logging
+
+from sqllib.common.common import SQLiteJson
+from sqllib.common.error import *
+from .nosql import SQLiteNoSQLBase
+
+logger = logging.getLogger('sqllib.document')
+
+__all__ = ['DocumentStore', 'Collection']
+
+_OPERATORS = {'$eq': '=', '$ne': '<>', '$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}
+_json_path = SQLiteJson.path
+
+
+def _project(doc: dict, projection):
+    """按路径列表或 {path: 0/1} 取出字段，保持嵌套结构；_id 默认保留"""
+    if isinstance(projection, dict):
+        keep_id = projection.get('_id', 1)
+        paths = [_ for _, _v in projection.items() if _v and _ != '_id']
+    else:
+        keep_id, paths = True, [_ for _ in projection if _ != '_id']
+    result = {'_id': doc['_id']} if keep_id else {}
+    for path in paths:
+        src, dst, keys = doc, result, path.split('.')
+        for key in keys[:-1]:
+            if not isinstance(src, dict) or key not in src:
+                break
+            src, dst = src[key], dst.setdefault(key, {})
+        else:
+            if isinstance(src, dict) and keys[-1] in src:
+                dst[keys[-1]] = src[keys[-1]]
+    return result
+
+
+class Collection:
+    """文档集合，通过 DocumentStore.collection(name) 或 store[name] 获得"""
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+        self.table = store.get_real_table_name(name)
+        store._write_db(f'CREATE TABLE IF NOT EXISTS `{self.table}` '
+                        f'(_id INTEGER PRIMARY KEY, doc TEXT NOT NULL CHECK (json_valid(doc)))')
+        self._indexed = set(self._load_indexed())
+
+    def _load_indexed(self):
+        """已建立索引的路径即名为 `$.path` 的生成列"""
+        return [_[1][2:] for _ in self.store._read_db(f'PRAGMA table_xinfo(`{self.table}`)') if _[1].startswith('$.')]
+
+    def _expr(self, path):
+        """查询条件中路径对应的SQL表达式：已索引时使用生成列"""
+        if path == '_id':
+            return '_id'
+        if path in self._indexed:
+            return f'`$.{path}`'
+        return f"json_extract(doc, '{_json_path(path)}')"
+
+    def _where(self, _filter):
+        """把 {path: value | {'$op': value}} 编译为 (WHERE 子句, 参数)"""
+        clauses, args = [], []
+        for path, cond in (_filter or {}).items():
+            expr = self._expr(path)
+            ops = cond if isinstance(cond, dict) and cond and all(_.startswith('$') for _ in cond) else {'$eq': cond}
+            for op, value in ops.items():
+                if op in ('$in', '$nin'):
+                    value = list(value)
+                    if not value:
+                        clauses.append('0' if op == '$in' else '1')
+                        continue
+                    clauses.append(f'{expr} {"NOT " if op == "$nin" else ""}IN ({", ".join("?" * len(value))})')
+                    args.extend(value)
+                elif op == '$exists':
+                    clauses.append(f"json_type(doc, '{_json_path(path)}') IS {'NOT ' if value else ''}NULL")
+                elif op not in _OPERATORS:
+                    raise SqlModuleError(f'不支持的操作符 {op}，可选 {list(_OPERATORS) + ["$in", "$nin", "$exists"]}')
+                elif value is None and op in ('$eq', '$ne'):
+                    clauses.append(f'{expr} IS {"NOT " if op == "$ne" else ""}NULL')
+                elif isinstance(value, (dict, list)):  # 与子文档比较：json_extract 返回压缩后的 JSON 文本
+                    clauses.append(f'{expr} {_OPERATORS[op]} json(?)')
+                    args.append(SQLiteJson.dumps(value))
+                else:
+                    clauses.append(f'{expr} {_OPERATORS[op]} ?')
+                    args.append(value)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', args
+
+    # 写入
+    def insert_one(self, doc: dict) -> int:
+        """插入一个文档，返回 _id"""
+        doc = {k: v for k, v in doc.items() if k != '_id'}
+        with self.store._lock:
+            self.store._write_db(f'INSERT INTO `{self.table}` (doc) VALUES (?)', (SQLiteJson.dumps(doc),))
+            return self.store._sql.execute('SELECT last_insert_rowid()').fetchone()[0]
+
+    def insert_many(self, docs, batch_rows=1000) -> int:
+        """按 batch_rows 分批插入，每批一个事务，返回插入的文档数"""
+        command = f'INSERT INTO `{self.table}` (doc) VALUES (?)'
+        total, batch = 0, []
+        for doc in docs:
+            batch.append((SQLiteJson.dumps({k: v for k, v in doc.items() if k != '_id'}),))
+            if len(batch) >= batch_rows:
+                total += self.store._write_affair(command, batch)
+                batch = []
+        if batch:
+            total += self.store._write_affair(command, batch)
+        return total
+
+    def update_many(self, _filter, _set: dict) -> int:
+        """对匹配的文档设置字段(json_set)，返回更新的文档数"""
+        where, args = self._where(_filter)
+        sets = ', '.join(f"'{_json_path(_)}', json(?)" for _ in _set)
+        return self.store._write_db(f'UPDATE `{self.table}` SET doc = json_set(doc, {sets}){where}',
+                                    [SQLiteJson.dumps(_) for _ in _set.values()] + args)
+
+    def delete_many(self, _filter) -> int:
+        """删除匹配的文档，返回删除数"""
+        where, args = self._where(_filter)
+        return self.store._write_db(f'DELETE FROM `{self.table}`{where}', args)
+
+    # 查询
+    def find(self, _filter=None, projection=None, sort=None, limit=None, skip=None) -> list:
+        """ 查询文档
+
+        :param _filter: {path: value} 相等；{path: {'$gt': 1, '$in': [...], '$exists': True}} 运算
+        :param projection: 路径列表 或 {path: 1, '_id': 0}
+        :param sort: [(path, 1 | -1), ...]
+        """
+        where, args = self._where(_filter)
+        command = f'SELECT _id, doc FROM `{self.table}`{where}'
+        if sort:
+            command += ' ORDER BY ' + ', '.join(f'{self._expr(p)} {"DESC" if d < 0 else "ASC"}' for p, d in sort)
+        if limit is not None or skip:
+            command += f' LIMIT {int(-1 if limit is None else limit)} OFFSET {int(skip or 0)}'
+        docs = [dict(SQLiteJson.loads(doc), _id=_id) for _id, doc in self.store._read_db(command, args)]
+        return [_project(_, projection) for _ in docs] if projection else docs
+
+    def find_one(self, _filter=None, projection=None):
+        docs = self.find(_filter, projection, limit=1)
+        return docs[0] if docs else None
+
+    def count(self, _filter=None) -> int:
+        where, args = self._where(_filter)
+        return self.store._read_db(f'SELECT COUNT(*) FROM `{self.table}`{where}', args)[0][0]
+
+    def explain(self, _filter=None) -> list:
+        """返回 EXPLAIN QUERY PLAN 的说明，用于确认是否命中索引"""
+        where, args = self._where(_filter)
+        return [_[-1] for _ in self.store._read_db(f'EXPLAIN QUERY PLAN SELECT _id, doc FROM `{self.table}`{where}',
+                                                   args)]
+
+    # 索引
+    def create_index(self, path, unique=False):
+        """为 JSON 路径建立索引：添加虚拟生成列 `$.path`，并在其上建立索引"""
+        _json_path(path)
+        with self.store._lock:
+            if path not in self._indexed:
+                self.store._write_db(f"ALTER TABLE `{self.table}` ADD COLUMN `$.{path}` "
+                                     f"GENERATED ALWAYS AS (json_extract(doc, '{_json_path(path)}')) VIRTUAL")
+                self._indexed.add(path)
+            self.store._write_db(f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS '
+                                 f'`{self.table}.{path}` ON `{self.table}` (`$.{path}`)')
+
+    def list_indexes(self) -> list:
+        return sorted(self._indexed)
+
+    def drop_index(self, path):
+        """删除索引与生成列"""
+        with self.store._lock:
+            self.store._write_db(f'DROP INDEX IF EXISTS `{self.table}.{path}`')
+            if path in self._indexed:
+                self.store._write_db(f'ALTER TABLE `{self.table}` DROP COLUMN `$.{path}`')
+                self._indexed.discard(path)
+
+    def __len__(self):
+        return self.count()
+
+
+class DocumentStore(SQLiteNoSQLBase):
+    """ 文档存储
+
+    :param db: 数据库文件路径，':memory:' 为内存库
+    :param prefix: 集合(表)名前缀
+    :param kwargs: 传给 sqlite3.connect()
+    """
+
+    def __init__(self, db=':memory:', prefix='', **kwargs):
+        super().__init__(db, prefix=prefix, **kwargs)
+        self._collections = {}
+
+    def collection(self, name) -> Collection:
+        """获取(不存在时创建)集合"""
+        if name not in self._collections:
+            self._collections[name] = Collection(self, name)
+        return self._collections[name]
+
+    def __getitem__(self, name) -> Collection:
+        return self.collection(name)
+
+    def list_collections(self) -> list:
+        return [_[0] for _ in self._read_db("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ?",
+                                            (f'{self.TABLE_PREFIX}%',))]
+
+    def drop_collection(self, name):
+        self._collections.pop(name, None)
+        return self._write_db(f'DROP TABLE IF EXISTS `{self.get_real_table_name(name)}`')
@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : kvstore.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 17:10
+
+基于 SQLite 的嵌入式键值存储，无额外依赖
+
+    1. 每个命名空间一张 WITHOUT ROWID 表，主键即键，按键有序存放，前缀扫描走主键区间
+    2. WAL 日志 + synchronous=NORMAL，读写互不阻塞
+    3. multi_put / batch() 在一个事务内批量写入
+    4. 进程内 LRU 读缓存，写入与删除时同步更新
+
+    with KVStore('cache.db') as kv:
+        kv.put('user:1', b'...')
+        kv.multi_put({'user:2': b'...', 'user:3': b'...'})
+        kv.get('user:1'), kv.multi_get(['user:2', 'user:9'])
+        list(kv.scan_prefix('user:'))
+"""
+import logging
+from collections import OrderedDict
+
+from .nosql import SQLiteNoSQLBase
+
+logger = logging.getLogger('sqllib.kvstore')
+
+__all__ = ['KVStore']
+
+_MISSING = object()
+
+
+def _prefix_upper(prefix: str):
+    """前缀区间的上界：最后一个字符加一；前缀为空时没有上界"""
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class KVStore(SQLiteNoSQLBase):
+    """ SQLite 键值存储
+
+    :param db: 数据库文件路径，':memory:' 为内存库
+    :param table: 命名空间(表名)，受 prefix 前缀规则影响
+    :param cache_size: 读缓存的条目数，0 关闭缓存
+    :param serializer: 可选的序列化器，需提供 dumps / loads (如 pickle、json)；默认原样保存 bytes / str / 数字
+    :param prefix: 表前缀
+    :param kwargs: 传给 sqlite3.connect()
+    """
+
+    BATCH_PARAMS = 500  # 单条语句绑定的参数个数上限(低于 SQLite 默认的 999)
+
+    def __init__(self, db=':memory:', table='kv', cache_size=10000, serializer=None, prefix='', **kwargs):
+        super().__init__(db, prefix=prefix, **kwargs)
+        self.table = self.get_real_table_name(table)
+        self.cache_size = cache_size
+        self.serializer = serializer
+        self._cache = OrderedDict()
+        self._write_db(f'CREATE TABLE IF NOT EXISTS `{self.table}` '
+                       f'(k TEXT PRIMARY KEY NOT NULL, v BLOB) WITHOUT ROWID')
+
+    def close(self):
+        with self._lock:
+            super().close()
+            self._cache.clear()
+
+    def _on_rollback(self):
+        self._cache.clear()  # 回滚后缓存可能与数据库不一致
+
+    # 缓存
+    def _cache_get(self, key):
+        value = self._cache.get(key, _MISSING)
+        if value is not _MISSING:
+            self._cache.move_to_end(key)
+        return value
+
+    def _cache_set(self, key, value):
+        if not self.cache_size:
+            return
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _dumps(self, value):
+        return self.serializer.dumps(value) if self.serializer is not None else value
+
+    def _loads(self, value):
+        return self.serializer.loads(value) if self.serializer is not None else value
+
+    # 接口
+    def get(self, key, default=None):
+        """读取一个键，不存在时返回 default"""
+        with self._lock:
+            value = self._cache_get(key)
+            if value is _MISSING:
+                rows = self._read_db(f'SELECT v FROM `{self.table}` WHERE k=?', (key,))
+                if not rows:
+                    return default
+                value = rows[0][0]
+                self._cache_set(key, value)
+            return self._loads(value)
+
+    def put(self, key, value):
+        """写入(覆盖)一个键"""
+        value = self._dumps(value)
+        with self._lock:
+            self._write_db(f'INSERT OR REPLACE INTO `{self.table}` (k, v) VALUES (?, ?)', (key, value))
+            self._cache_set(key, value)
+
+    def delete(self, key):
+        """删除一个键，返回删除的行数"""
+        with self._lock:
+            self._cache.pop(key, None)
+            return self._write_db(f'DELETE FROM `{self.table}` WHERE k=?', (key,))
+
+    def multi_get(self, keys) -> dict:
+        """批量读取，返回存在的 {key: value}"""
+        result, missing = {}, []
+        with self._lock:
+            for key in keys:
+                value = self._cache_get(key)
+                if value is _MISSING:
+                    missing.append(key)
+                else:
+                    result[key] = value
+            for index in range(0, len(missing), self.BATCH_PARAMS):
+                chunk = missing[index:index + self.BATCH_PARAMS]
+                for key, value in self._read_db(f'SELECT k, v FROM `{self.table}` '
+                                                f'WHERE k IN ({", ".join("?" * len(chunk))})', chunk):
+                    self._cache_set(key, value)
+                    result[key] = value
+        return {key: self._loads(value) for key, value in result.items()}
+
+    def multi_put(self, items):
+        """在一个事务中批量写入 dict 或 (key, value) 序列"""
+        items = [(key, self._dumps(value)) for key, value in (items.items() if isinstance(items, dict) else items)]
+        with self._lock:
+            self._write_affair(f'INSERT OR REPLACE INTO `{self.table}` (k, v) VALUES (?, ?)', items)
+            for key, value in items:
+                self._cache_set(key, value)
+
+    def multi_delete(self, keys):
+        """在一个事务中批量删除"""
+        keys = [(_,) for _ in keys]
+        with self._lock:
+            for (key,) in keys:
+                self._cache.pop(key, None)
+            return self._write_affair(f'DELETE FROM `{self.table}` WHERE k=?', keys)
+
+    def scan_prefix(self, prefix='', limit=None, batch_rows=1000):
+        """按键的顺序产出以 prefix 开头的 (key, value)，分批读取，不经过缓存"""
+        upper = _prefix_upper(prefix)
+        last, count = None, 0
+        while True:
+            command = f'SELECT k, v FROM `{self.table}` WHERE k >= ?'
+            args = [prefix]
+            if upper is not None:
+                command += ' AND k < ?'
+                args.append(upper)
+            if last is not None:  # 键集分页，避免长时间持有游标
+                command += ' AND k > ?'
+                args.append(last)
+            size = batch_rows if limit is None else min(batch_rows, limit - count)
+            rows = self._read_db(command + ' ORDER BY k LIMIT ?', args + [size])
+            for key, value in rows:
+                yield key, self._loads(value)
+            count += len(rows)
+            if len(rows) < size or (limit is not None and count >= limit):
+                return
+            last = rows[-1][0]
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return self._read_db(f'SELECT COUNT(*) FROM `{self.table}`')[0][0]
+
+    def clear_cache(self):
+        """清空进程内读缓存"""
+        with self._lock:
+            self._cache.clear()
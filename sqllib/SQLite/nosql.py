@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : nosql.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 18:00
+
+SQLite 上的 NoSQL 存储的公共基类：连接、WAL、加锁的读写与 batch() 事务
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from sqllib.common.base_no_sql import NoSQLBase
+from sqllib.common.error import *
+
+__all__ = ['SQLiteNoSQLBase']
+
+
+class SQLiteNoSQLBase(NoSQLBase):
+    """ 以 SQLite 为存储引擎的 NoSQL 基类
+
+    连接以 check_same_thread=False 打开，所有访问由 self._lock 串行化，可以在多个线程间共享。
+
+    :param db: 数据库文件路径，':memory:' 为内存库
+    :param prefix: 表前缀
+    :param kwargs: 传给 sqlite3.connect()
+    """
+
+    def __init__(self, db=':memory:', prefix='', **kwargs):
+        self.TABLE_PREFIX = prefix
+        self._lock = threading.RLock()
+        self._in_batch = False
+        kwargs.setdefault('check_same_thread', False)
+        self._sql = sqlite3.connect(db, **kwargs)
+        self._sql.execute('PRAGMA journal_mode=WAL;')
+        self._sql.execute('PRAGMA synchronous=NORMAL;')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._sql.close()
+
+    def _write_db(self, command, args=None):
+        with self._lock:
+            try:
+                cur = self._sql.execute(command, args or ())
+                if not self._in_batch:
+                    self._sql.commit()
+                return cur.rowcount
+            except Exception as e:
+                if not self._in_batch:
+                    self._sql.rollback()
+                raise SqlWriteError(f'操作数据库时出现问题：{e}\n\n>>COMMEND:\n{command}')
+
+    def _write_affair(self, command, args):
+        with self._lock:
+            try:
+                cur = self._sql.executemany(command, args)
+                if not self._in_batch:
+                    self._sql.commit()
+                return cur.rowcount
+            except Exception as e:
+                if not self._in_batch:
+                    self._sql.rollback()
+                raise SqlWriteError(f'执行写事物时出错：{e}\n\n>>COMMEND:\n{command}')
+
+    def _read_db(self, command, args=None, result_type=None):
+        with self._lock:
+            return self._sql.execute(command, args or ()).fetchall()
+
+    def _on_rollback(self):
+        """batch() 回滚后的回调，子类用来丢弃缓存等状态"""
+
+    @contextmanager
+    def batch(self):
+        """在一个事务中执行多次写入，退出时提交，出现异常时回滚"""
+        with self._lock:
+            if self._in_batch:  # 嵌套时并入外层事务
+                yield self
+                return
+            self._in_batch = True
+            try:
+                yield self
+                self._sql.commit()
+            except Exception:
+                self._sql.rollback()
+                self._on_rollback()
+                raise
+            finally:
+                self._in_batch = False
@@ -0,0 +1,162 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : parallel.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 23:55
+
+SQLite 多进程并行查询：一个连接只能使用一个核，分析型的大表扫描按区间拆给多个进程
+
+    rows = api.parallel_query('SELECT * FROM big WHERE {partition} AND x > ?', (10,), workers=8)
+    rows = api.parallel_query('SELECT city, COUNT(*) AS n, SUM(x) AS s, MAX(x) AS m FROM big '
+                              'WHERE {partition} GROUP BY city', merge={'n': 'sum', 's': 'sum', 'm': 'max'})
+
+    1. SQL 中的 {partition} 替换为 partition_by 列(整数，默认 rowid)的区间条件；
+       区间数为 workers 的数倍，由进程池依次领取，区间之间的数据量不均匀时也能保持各进程忙碌
+    2. 每个进程以 file:...?mode=ro&immutable=1 只读打开数据库，不加锁；
+       数据库为 WAL 模式时默认不使用 immutable (immutable 会忽略尚未检查点的 WAL 内容)
+    3. merge='concat' 按区间顺序拼接结果；{列名: 'sum' | 'count' | 'min' | 'max'} 合并各区间的部分聚合，
+       其余列作为分组键；callable(rows) -> rows 对拼接后的结果再处理。
+       AVG 不能直接合并，请分别查询 SUM 与 COUNT
+    4. ORDER BY / LIMIT 在每个区间内生效；结果只在各区间内有序
+"""
+import logging
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+
+from sqllib.common.error import SqlKeyNameError, SqlModuleError
+
+logger = logging.getLogger('sqllib.parallel')
+
+__all__ = ['parallel_query', 'merge_partials', 'MERGES']
+
+_RE_FROM = re.compile(r'\bFROM\s+[`"\[]?(\w+)', re.I)
+
+
+def _merge_sum(a, b):
+    return b if a is None else a if b is None else a + b
+
+
+def _merge_min(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _merge_max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+# 部分聚合的合并方式，NULL 与 SQL 聚合一样被忽略
+MERGES = {'sum': _merge_sum, 'count': _merge_sum, 'min': _merge_min, 'max': _merge_max}
+
+
+def merge_partials(names, parts, merge: dict) -> list:
+    """ 合并各区间的部分聚合结果
+
+    :param names: 结果的列名
+    :param parts: 每个区间的结果行
+    :param merge: {列名: 'sum' | 'count' | 'min' | 'max'}，其余列为分组键
+    """
+    try:
+        aggs = {names.index(col): MERGES[how.lower()] for col, how in merge.items()}
+    except ValueError:
+        raise SqlKeyNameError(f'merge 中的列 {list(merge)} 不全在查询结果 {names} 中')
+    except KeyError:
+        raise SqlModuleError(f'merge 只支持 {list(MERGES)}，而不是 {list(merge.values())}')
+    keys = [_i for _i in range(len(names)) if _i not in aggs]
+    groups = {}
+    for rows in parts:
+        for row in rows:
+            _k = tuple(row[_i] for _i in keys)
+            acc = groups.get(_k)
+            if acc is None:
+                groups[_k] = list(row)
+            else:
+                for _i, func in aggs.items():
+                    acc[_i] = func(acc[_i], row[_i])
+    return [tuple(_) for _ in groups.values()]
+
+
+# 工作进程中的只读连接，由进程池的 initializer 建立
+_conn = None
+
+
+def _init_worker(uri):
+    global _conn
+    _conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    _conn.execute('PRAGMA query_only=1')
+
+
+def _run_partition(sql, args):
+    cur = _conn.execute(sql, args or ())
+    try:
+        return [_[0] for _ in cur.description or ()], cur.fetchall()
+    finally:
+        cur.close()
+
+
+def _read_only_uri(api, immutable) -> str:
+    db = str(api._db)
+    if not api._connect_kwargs.get('uri'):
+        db = f'file:{quote(Path(db).absolute().as_posix())}'
+    db += ('&' if '?' in db else '?') + 'mode=ro'
+    return db + '&immutable=1' if immutable else db
+
+
+def _ranges(api, table, key, partitions) -> list:
+    """把 [MIN(key), MAX(key)] 等分为 partitions 个 [start, end) 区间；只用到索引两端，不扫描全表"""
+    _min, _max = api.read_db(f'SELECT MIN({key}), MAX({key}) FROM `{table}`')[0]
+    if _min is None:
+        return []
+    width = max(1, -(-(_max - _min + 1) // partitions))  # 向上取整
+    return [(start, min(start + width, _max + 1)) for start in range(_min, _max + 1, width)]
+
+
+def parallel_query(api, sql, args=None, partition_by='rowid', workers=4, merge='concat', table=None,
+                   partitions=None, immutable=None, result_type=None) -> list:
+    """ 在 workers 个进程中按区间并行执行 sql，见模块说明
+
+    :param sql: 含有 {partition} 的查询语句
+    :param partition_by: 整数列，多表查询时可以写成 别名.列
+    :param table: partition_by 所在的表，默认取 FROM 后的第一张表
+    :param partitions: 区间数，默认 workers * 4
+    :param immutable: 是否以 immutable=1 打开，默认在非 WAL 模式时使用；查询期间有写入时必须为 False
+    :param result_type: None 返回元组，dict 返回字典
+    """
+    if api.is_memory:
+        raise SqlModuleError('内存数据库无法被其他进程访问，不能并行查询')
+    if sql.count('{partition}') != 1:
+        raise SqlModuleError('parallel_query() 的SQL中需要有且只有一个 {partition}')
+    if table is None:
+        _m = _RE_FROM.search(sql)
+        if not _m:
+            raise SqlModuleError('无法从SQL中找到表名，请指定 table')
+        table = _m.group(1)
+    table = api.get_real_table_name(table)
+    if immutable is None:
+        immutable = api.read_db('PRAGMA journal_mode')[0][0].lower() != 'wal'
+
+    ranges = _ranges(api, table, partition_by.split('.')[-1], partitions or workers * 4)
+    statements = [sql.replace('{partition}', f'({partition_by} >= {start} AND {partition_by} < {end})')
+                  for start, end in ranges]
+    logger.debug(f'{table}: {len(ranges)} partitions on {partition_by}, {workers} workers')
+    names, parts = [], []
+    if statements:
+        with ProcessPoolExecutor(max_workers=min(workers, len(statements)), initializer=_init_worker,
+                                 initargs=(_read_only_uri(api, immutable),)) as pool:
+            for names, rows in pool.map(_run_partition, statements, [args] * len(statements)):
+                parts.append(rows)
+
+    if isinstance(merge, dict):
+        rows = merge_partials(names, parts, merge) if parts else []
+    else:
+        rows = [_r for _rows in parts for _r in _rows]
+        if callable(merge):
+            rows = merge(rows)
+        elif merge != 'concat':
+            raise SqlModuleError(f"merge 可选 'concat'、{{列名: 合并方式}} 或 callable，而不是 {merge!r}")
+    if result_type is dict:
+        return [dict(zip(names, _r)) for _r in rows]
+    return rows
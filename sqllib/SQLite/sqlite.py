@@ -13,9 +13,16 @@ import logging
 import sys
 import sqlite3
 import re
-from sqllib.common.common import sql_join
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from pathlib import Path
+from urllib.parse import quote
+from sqllib.common.common import sql_join, SQLiteJson
 from sqllib.common.base_sql import BaseSQL, BaseSQLAPI
 from sqllib.common.error import *
+from . import cdc, parallel
 
 logger = logging.getLogger("logger")  # 创建实例
 formatter = logging.Formatter("[%(asctime)s] < %(funcName)s: %(thread)d > [%(levelname)s] %(message)s")
@@ -27,6 +34,7 @@ logger.setLevel(logging.DEBUG)  # 设置日志文件等级
 __all__ = ['SQLiteAPI', 'SQLiteBase']
 
 
+
 # 以字典形式返回游标的sqlite实现
 def dict_factory(cursor, row) -> dict:
     """用来替换sqlite.connect().row_factory
@@ -42,10 +50,31 @@ def dict_factory(cursor, row) -> dict:
 class SQLiteBase(BaseSQL):
     """SQLite实现的基类
 
+    :param db: 数据库文件路径
+    :param prefix: 表前缀
+    :param json_columns: 为True时，声明类型为 JSON 的列写入 dict / list 自动序列化，读出时自动解析 (见 SQLiteJson)；
+                         insert() 中 JSON 列的 list 是一个值，多行插入时用 tuple 或由其他列的 list 决定；
+                         连接以 PARSE_DECLTYPES 打开，DATE / TIMESTAMP 列读出为 date / datetime
+    :param convert_types: 为True时，select() / query() 的结果按声明类型转换为 datetime、Decimal、dict、bytes，
+                          与 MySqlAPI 返回的类型一致 (见 common.convert)
+    :param kwargs: 传给 sqlite3.connect()
     """
+    DIALECT = 'sqlite'
+    PROGRESS_STEPS = 1000  # time_limit() 中每执行多少条虚拟机指令检查一次是否超时
+    # 参数的类型 -> 写入的值；只对本类的连接生效(sqlite3.register_adapter 会影响进程中所有连接)
+    # MySQL 返回的 Decimal 写入 SQLite 时按文本保存，避免精度损失
+    ADAPTERS = {Decimal: str}
 
     def __init__(self, db, **kwargs):
         self.TABLE_PREFIX = kwargs.pop('prefix', '')
+        self.convert_types = kwargs.pop('convert_types', False)
+        self.json_columns = kwargs.pop('json_columns', False)
+        if self.json_columns:  # 声明为 JSON 的列自动序列化 / 解析
+            SQLiteJson.register()
+            self.ADAPTERS = {**self.ADAPTERS, **SQLiteJson.adapters()}
+            kwargs['detect_types'] = kwargs.get('detect_types', 0) | sqlite3.PARSE_DECLTYPES
+        self._db = db
+        self._connect_kwargs = kwargs
         self._sql = sqlite3.connect(db, **kwargs)
 
     def close(self):
@@ -63,8 +92,100 @@ class SQLiteBase(BaseSQL):
         """返回数据库链接句柄"""
         return self._sql
 
+    @property
+    def MAX_IN_PARAMS(self) -> int:
+        """连接的 SQLITE_LIMIT_VARIABLE_NUMBER (3.32 之前为 999，之后为 32766)"""
+        try:
+            return self._sql.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+        except AttributeError:  # Python < 3.11
+            return 999
+
+    @property
+    def is_memory(self) -> bool:
+        """是否为内存数据库（无法被其他连接访问）"""
+        return str(self._db) in ('', ':memory:') or 'mode=memory' in str(self._db)
+
+    def enable_wal(self):
+        """开启WAL日志模式，允许读连接与写连接并发"""
+        return self._sql.execute('PRAGMA journal_mode=WAL;').fetchone()[0]
+
+    @contextmanager
+    def time_limit(self, seconds):
+        """超时的语句由 progress handler 中断，抛出 SqlTimeoutError；可以嵌套，以较早的截止时间为准
+
+        嵌套关系按连接记录：SQLiteSnapshot 中每个线程使用自己的连接，各线程的截止时间互不影响
+        """
+        conn = self._sql
+        stacks = self.__dict__.setdefault('_time_limits', {})  # id(连接) -> [(截止时间, handler), ...]
+        limits = stacks.setdefault(id(conn), [])
+        deadline = time.monotonic() + seconds
+        if limits:
+            deadline = min(deadline, limits[-1][0])
+        fired = []
+
+        def _handler():
+            if time.monotonic() >= deadline:
+                fired.append(True)
+                return 1  # 非0: 中断当前语句
+            return 0
+
+        limits.append((deadline, _handler))
+        conn.set_progress_handler(_handler, self.PROGRESS_STEPS)
+        try:
+            yield self
+        except Exception as _e:
+            if fired:
+                raise SqlTimeoutError(f'语句执行超过截止时间，已中断: {_e}') from _e
+            raise
+        finally:
+            limits.pop()
+            conn.set_progress_handler(limits[-1][1] if limits else None, self.PROGRESS_STEPS)
+            if not limits:
+                stacks.pop(id(conn), None)
+
+    def fork(self, read_only=False):
+        """打开一个指向同一数据库文件的新连接
+
+        :param read_only: 以 mode=ro 的URI只读打开
+        """
+        if self.is_memory:
+            raise SqlModuleError('内存数据库无法建立独立连接')
+        kwargs = dict(self._connect_kwargs, prefix=self.TABLE_PREFIX, json_columns=self.json_columns,
+                      convert_types=self.convert_types)
+        db = self._db
+        if read_only:
+            if not kwargs.get('uri'):
+                db = f'file:{quote(Path(db).absolute().as_posix())}'
+            db += ('&' if '?' in str(db) else '?') + 'mode=ro'
+            kwargs['uri'] = True
+        return type(self)(db, **kwargs)
+
+    def parallel_query(self, sql, args=None, partition_by='rowid', workers=4, merge='concat', **kwargs) -> list:
+        """ 多进程并行查询：SQL 中的 {partition} 替换为 partition_by 的区间条件，每个进程只读打开数据库
+
+            api.parallel_query('SELECT city, COUNT(*) AS n FROM big WHERE {partition} GROUP BY city',
+                               workers=8, merge={'n': 'sum'})
+
+        :param merge: 'concat' | {列名: 'sum' | 'count' | 'min' | 'max'} | callable，详见 SQLite.parallel
+        :param kwargs: table, partitions, immutable, result_type
+        """
+        return parallel.parallel_query(self, sql, args, partition_by, workers, merge, **kwargs)
+
+    def _adapt(self, args):
+        """按 ADAPTERS 转换一条语句的参数(序列或命名参数的字典)；没有需要转换的值时原样返回"""
+        adapters = self.ADAPTERS
+        if not args or isinstance(args, (str, bytes)):
+            return args
+        values = args.values() if isinstance(args, dict) else args
+        if not any(type(_v) in adapters for _v in values):
+            return args
+        if isinstance(args, dict):
+            return {_k: adapters[type(_v)](_v) if type(_v) in adapters else _v for _k, _v in args.items()}
+        return [adapters[type(_v)](_v) if type(_v) in adapters else _v for _v in args]
+
     # 写数据库操作
     def _write_db(self, command, args=None):
+        args = self._adapt(args)
         __sql = self._sql
         cur = __sql.cursor()  # 使用cursor()方法获取操作游标
         logger.debug(f'SQL: {command}')
@@ -101,7 +222,7 @@ class SQLiteBase(BaseSQL):
         cur = __sql.cursor()
         logger.debug(f'SQL: {command}')
         try:
-            cur.executemany(command, args)
+            cur.executemany(command, (self._adapt(_) for _ in args))
             __sql.commit()
             return cur.rowcount
         except Exception as e:
@@ -112,20 +233,38 @@ class SQLiteBase(BaseSQL):
         finally:
             cur.close()
 
-    def _read_db(self, command, args=None, result_type=None):
-        """数据库读取的具体实现。主要涉及数据库查询"""
+    def _read_db(self, command, args=None, result_type=None, table=None):
+        """数据库读取的具体实现。主要涉及数据库查询；给出 table 时按其声明类型转换结果"""
         logger.debug(f'SQL: {command}')
+        self._notify_read(command, args)
         __sql = self._sql
         if result_type is dict:
             __sql.row_factory = dict_factory
         else:
             __sql.row_factory = sqlite3.connect('').row_factory
         cur = __sql.cursor()
-        cur.execute(command)
-        results = cur.fetchall()
+        cur.execute(command, self._adapt(args) or ())
+        results, description = cur.fetchall(), cur.description
         cur.close()
+        if table is not None:
+            results = self.convert_rows(table, description, results)
         return results
 
+    def _iter_db(self, command, args=None, batch_rows=1000, result_type=None):
+        """流式读取，sqlite3的游标本身就是逐步步进的"""
+        logger.debug(f'SQL: {command}')
+        cur = self._sql.cursor()
+        cur.row_factory = dict_factory if result_type is dict else None
+        try:
+            cur.execute(command, self._adapt(args) or ())
+            while True:
+                rows = cur.fetchmany(batch_rows)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cur.close()
+
     def write_no_except(self, cmd, args=None):
         """数据库写入对外接口，它没有收集任何错误! """
         logger.warning("使用此函数时注意表前缀! ")
@@ -167,13 +306,13 @@ class SQLiteBase(BaseSQL):
         _c += "VALUES ( "
         _c += ", ".join([f"?" for _ in kwargs.values()]) + " ) ; "
         # print(_c, kwargs)
-        if isinstance(list(kwargs.values())[0], (tuple, list)):  # kwargs第一个键是不是字符串
+        # JSON 列的 list 是一个值；其他列的 list / tuple 或 JSON 列的 tuple 表示插入多行
+        json_cols = self.json_column_names(table_name) \
+            if self.json_columns and any(isinstance(_, list) for _ in kwargs.values()) else ()
+        if any(isinstance(v, tuple) or (isinstance(v, list) and k not in json_cols) for k, v in kwargs.items()):
             arg = self.zip_data_for_insert(tuple(kwargs.values()))
             return self._write_affair(_c, arg)
         else:
-            for x in kwargs.values():
-                if isinstance(x, (list, tuple)):
-                    raise InsertZipError(f"INSERT一条数据时，出现列表列或元组！确保数据统一: VALUE({x})")
             return self._write_db(_c, list(kwargs.values()))  # 提交
 
     # def _insert_rows(self, table_name, args, k=None, ignore_repeat=False):
@@ -209,13 +348,13 @@ class SQLiteBase(BaseSQL):
         :param kwargs: {'WHERE', 'LIMIT', 'OFFSET', ORDER} 全大写
         :return 结果集
         """
+        kwargs = {key.upper(): value for key, value in kwargs.items()}
         command = f'SELECT  ' + ' , '.join(cols) + ' ' + f'FROM `{self.get_real_table_name(table)}` '
-        command += ' '.join([' '.join((key.upper(), str(value))) for key, value in kwargs.items()
-                             if key.upper() in ['WHERE', 'LIMIT', 'OFFSET']]) + '  '
-        command += ' '.join([f'ORDER BY {value}' for key, value in kwargs.items()
-                             if key.upper() == 'ORDER']) + ' '
+        command += f' WHERE {kwargs["WHERE"]} ' if 'WHERE' in kwargs else ''
+        command += f' ORDER BY {kwargs["ORDER"]} ' if 'ORDER' in kwargs else ''  # ORDER BY 必须在 LIMIT 之前
+        command += ' '.join([' '.join((key, str(kwargs[key]))) for key in ('LIMIT', 'OFFSET') if key in kwargs]) + ' '
         # print(command)
-        return self._read_db(command, result_type=result_type)
+        return self._read_db(command, result_type=result_type, table=table if self.convert_types else None)
 
     # 更新表
     def _update(self, table, where_key, where_value, **kwargs):
@@ -294,6 +433,41 @@ class SQLiteBase(BaseSQL):
         else:
             return [_ for _ in self.read_db(f'PRAGMA table_info({table_name});', result_type=dict)]
 
+    def columns_info(self, table) -> list:
+        """统一格式的列信息"""
+        return [{'name': _['name'], 'type': _['type'], 'notnull': bool(_['notnull']), 'pk': bool(_['pk'])}
+                for _ in self.show_columns(table, name_only=False)]
+
+    def json_column_names(self, table) -> set:
+        """声明类型为 JSON 的列名"""
+        return {_['name'] for _ in self.columns_info(table) if (_['type'] or '').upper() == SQLiteJson.DECLTYPE}
+
+    def list_indexes(self, table) -> list:
+        """表上的索引；UNIQUE / PRIMARY KEY 约束自动创建的索引(sqlite_autoindex_*)不能单独删除，sql 为 None"""
+        table = self.get_real_table_name(table)
+        ddl = dict(self.read_db('SELECT name, sql FROM sqlite_master WHERE type="index" AND tbl_name=?', (table,)))
+        result = []
+        for _i in reversed(self.read_db(f'PRAGMA index_list(`{table}`)', result_type=dict)):  # 按创建顺序
+            columns = [_c['name'] for _c in self.read_db(f'PRAGMA index_info(`{_i["name"]}`)', result_type=dict)]
+            result.append({'name': _i['name'], 'columns': columns, 'unique': bool(_i['unique']),
+                           'primary': _i['origin'] == 'pk', 'sql': ddl.get(_i['name'])})
+        return result
+
+    def rebuild_index(self, table, name=None):
+        """REINDEX 表上的全部索引，或只重建 name"""
+        return self._write_db(f'REINDEX `{name or self.get_real_table_name(table)}`')
+
+    def range_key(self, table):
+        """单列整数主键即 rowid 的别名；否则直接使用 rowid (WITHOUT ROWID 表除外)"""
+        table = self.get_real_table_name(table)
+        pks = [_ for _ in self.columns_info(table) if _['pk']]
+        if len(pks) == 1 and 'INT' in pks[0]['type'].upper():
+            return pks[0]['name']
+        _sql = self.read_db('SELECT sql FROM sqlite_master WHERE type="table" AND name=?', (table,))
+        if _sql and 'WITHOUT ROWID' in (_sql[0][0] or '').upper():
+            return None
+        return 'rowid'
+
     # 修改表结构
     def _alter(self, table_name, command):
         """ 目前sqlite只支持RENAME，ADD COLUMN """
@@ -314,6 +488,14 @@ class SQLiteAPI(SQLiteBase, BaseSQLAPI):
     def show_dbs(self, *args, **kwargs):
         pass
 
+    @classmethod
+    def open_snapshot(cls, path, **kwargs) -> 'SQLiteSnapshot':
+        """ 以只读快照方式打开不会再被修改的数据库文件(随服务发布的查找库等)，详见 SQLiteSnapshot
+
+        :param kwargs: mmap_size, cache_size, shared_cache, prefix 以及 sqlite3.connect() 的参数
+        """
+        return SQLiteSnapshot(path, **kwargs)
+
     # def insert(self, table_name, ignore_repeat=False, **kwargs):
     #     """插入数据到数据库，支持插入多条数据。
     #
@@ -382,10 +564,36 @@ class SQLiteAPI(SQLiteBase, BaseSQLAPI):
     #     """删除一个数据库"""
     #     return self._drop('TABLE', table_name)
 
-    def drop_index(self, index_name):
-        """删除一个索引"""
+    def drop_index(self, index_name, table=None):
+        """删除一个索引；SQLite 的索引名在库内唯一，不需要 table"""
         return self._drop('INDEX', index_name)
 
+    # 变更捕获
+    def enable_cdc(self, table, with_data=False, notify=None):
+        """ 安装触发器，把 table 的每行变更写入变更日志表 sqllib_changelog，详见 SQLite.cdc
+
+        :param with_data: 同时记录新行的 JSON
+        :param notify: notify(table, op, key)，本连接写入时同步回调
+        """
+        return cdc.enable_cdc(self, table, with_data, notify)
+
+    def disable_cdc(self, table):
+        return cdc.disable_cdc(self, table)
+
+    def changes(self, since=0, table=None, batch_rows=1000):
+        """seq > since 的变更 {'seq', 'table', 'op', 'key', 'data'}，按 seq 顺序分批读取"""
+        return cdc.changes(self, since, table, batch_rows)
+
+    def cdc_position(self) -> int:
+        """当前最新的变更序号，从这里开始消费即只处理之后的变更"""
+        if not self.read_db('SELECT 1 FROM sqlite_master WHERE type="table" AND name=?', (cdc.CHANGELOG,)):
+            return 0
+        return self.read_db(f'SELECT COALESCE(MAX(seq), 0) FROM `{cdc.CHANGELOG}`')[0][0]
+
+    def prune_changes(self, until):
+        """删除 seq <= until 的变更(已被所有消费者处理)"""
+        return self._write_db(f'DELETE FROM `{cdc.CHANGELOG}` WHERE seq <= ?', (until,))
+
     def alter_rename(self, old_name, new_name):
         """重命名表"""
         new_name = self.TABLE_PREFIX + new_name
@@ -418,6 +626,81 @@ class SQLiteAPI(SQLiteBase, BaseSQLAPI):
         return cmd
 
 
+class SQLiteSnapshot(SQLiteAPI):
+    """ 只读快照：file:...?mode=ro&immutable=1 打开，不加锁、不检查文件变化
+
+        snap = SQLiteAPI.open_snapshot('lookup.db', mmap_size=2 << 30)
+        snap.select('city', '*', WHERE='code="SZ"')      # 可以在多个线程中直接使用
+
+    1. 每个线程首次访问时打开自己的连接，线程之间不会互相阻塞；close() 关闭所有线程的连接
+    2. mmap_size: 以内存映射读取数据库文件，所有连接(以及所有进程)共享操作系统的页缓存，不再各自复制页面
+    3. query_only: 任何写入都会失败，抛出 SqlWriteError
+    4. shared_cache=True 时使用 cache=shared，同一进程的连接共享一份 SQLite 页缓存(适合没有 mmap 的平台)
+    5. 文件在快照打开期间不能被修改，否则查询结果不可预期
+
+    :param path: 数据库文件路径
+    :param mmap_size: 内存映射的最大字节数，受编译选项 SQLITE_MAX_MMAP_SIZE 限制
+    :param cache_size: 每个连接的页缓存(KiB)，默认使用 SQLite 的默认值
+    :param shared_cache: 使用共享缓存模式
+    """
+    MMAP_SIZE = 1 << 30
+
+    def __init__(self, path, mmap_size=None, cache_size=None, shared_cache=False, prefix='', **kwargs):
+        self._path = path
+        self._local = threading.local()
+        self._connections = []
+        self._conn_lock = threading.Lock()
+        self.mmap_size = self.MMAP_SIZE if mmap_size is None else mmap_size
+        self.cache_size = cache_size
+        self.shared_cache = shared_cache
+        uri = f'file:{quote(Path(path).absolute().as_posix())}?mode=ro&immutable=1'
+        if shared_cache:
+            uri += '&cache=shared'
+        kwargs.update(uri=True, check_same_thread=False)  # 连接可能由其他线程 close()
+        super().__init__(uri, prefix=prefix, **kwargs)
+
+    def _prepare(self, conn):
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        if self.cache_size is not None:
+            conn.execute(f'PRAGMA cache_size={-int(self.cache_size)}')
+        conn.execute('PRAGMA query_only=1')
+        return conn
+
+    @property
+    def _sql(self):
+        """当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self._sql = conn = sqlite3.connect(self._db, **self._connect_kwargs)
+        return conn
+
+    @_sql.setter
+    def _sql(self, conn):
+        self._local.conn = self._prepare(conn)
+        with self._conn_lock:
+            self._connections.append(conn)
+
+    @property
+    def connections(self) -> int:
+        """已经打开的连接数(访问过的线程数)"""
+        return len(self._connections)
+
+    def close(self):
+        with self._conn_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def close_db(self):
+        self.close()
+
+    def fork(self, read_only=False):
+        return type(self)(self._path, self.mmap_size, self.cache_size, self.shared_cache, self.TABLE_PREFIX,
+                          json_columns=self.json_columns, convert_types=self.convert_types,
+                          **{k: v for k, v in self._connect_kwargs.items() if k not in ('uri', 'check_same_thread')})
+
+
 if __name__ == '__main__':
     logger.addHandler(console_handler)  #
     table_structure = (  # f' CREATE TABLE `{table_name}` ( '
@@ -31,10 +31,16 @@ LiteDB:
     官网：http://www.litedb.org/
 """
 
-from .SQLite import SQLiteAPI
-from .mysql import MyMySqlAPI, MySqlAPI
+from .SQLite import SQLiteAPI, SQLiteSnapshot, KVStore, DocumentStore
+from .mysql import MyMySqlAPI, MySqlAPI, WriteSpool
 from .common.common import sql_join
 from .common.base_sql import BaseSQL, BaseSQLAPI
+from .common.transfer import copy_table
+from .common.sync import incremental_sync
+from .common.writer import BufferedWriter
+from .common.query import P, Query
+from .common.sharding import ShardedAPI
+from .common.retry import RetryPolicy, CircuitBreaker
 from .common import common
 
 # 直接访问会出错，但是，其他模块可以正常导入这些API
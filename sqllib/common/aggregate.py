@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : aggregate.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 00:30
+
+聚合下推：在数据库中完成 COUNT / SUM / MIN / MAX / GROUP BY，只传回聚合结果
+
+    api.aggregate('orders', group_by=['city'], metrics={'n': 'COUNT(*)', 's': ('sum', 'amount'),
+                                                        'avg': ('avg', 'amount'), 'users': ('count_distinct', 'uid')},
+                  where={'status': 'paid', 'created__gte': '2026-01-01'}, order_by=['-s'], limit=10)
+    # {'city': ['SZ', 'BJ'], 'n': [120, 98], 's': [...], 'avg': [...], 'users': [...]}
+
+    1. metrics 的值为原样拼接的SQL表达式，或 (函数, 列) 按方言生成：
+       count, count_distinct, sum, avg, min, max, stddev, group_concat
+    2. where 与 query().where() 相同：{列名[__操作符]: 值}，或原样拼接的条件字符串(列表)
+    3. 结果为列式的 {列名: [值, ...]}，列顺序为 group_by + metrics；没有 group_by 时每列只有一个值
+"""
+from .error import SqlModuleError
+
+__all__ = ['aggregate', 'metric_sql', 'columnar', 'FUNCTIONS']
+
+# (函数, 列) -> SQL；按方言区分的写法为 {方言: 模板}，None 为默认
+FUNCTIONS = {
+    'count': 'COUNT({})',
+    'count_distinct': 'COUNT(DISTINCT {})',
+    'sum': 'SUM({})',
+    'min': 'MIN({})',
+    'max': 'MAX({})',
+    'avg': {'mssql': 'AVG(CAST({} AS FLOAT))', None: 'AVG({})'},  # MSSQL 整数列的 AVG 结果仍为整数
+    'stddev': {'mysql': 'STDDEV_SAMP({})', 'mssql': 'STDEV({})'},
+    'group_concat': {'mssql': "STRING_AGG(CAST({} AS NVARCHAR(MAX)), ',')", None: 'GROUP_CONCAT({})'},
+}
+
+
+def metric_sql(dialect, spec) -> str:
+    """ 指标 -> SQL表达式
+
+    :param dialect: query.Dialect
+    :param spec: SQL表达式字符串，或 (函数, 列)；列为 None 或 '*' 时 count 为 COUNT(*)
+    """
+    if isinstance(spec, str):
+        return spec
+    func, column = spec
+    template = FUNCTIONS.get(func.lower())
+    if isinstance(template, dict):
+        template = template.get(dialect.name, template.get(None))
+    if template is None:
+        raise SqlModuleError(f'{dialect.name} 不支持聚合函数 {func}，可选 {list(FUNCTIONS)} 或直接写SQL表达式')
+    return template.format('*' if column in (None, '*') else dialect.quote(column))
+
+
+def columnar(names, rows) -> dict:
+    """行 -> {列名: [值, ...]}"""
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    return {name: list(values) for name, values in zip(names, columns)}
+
+
+def aggregate(api, table, group_by=(), metrics=None, where=None, having=None, order_by=None, limit=None) -> dict:
+    """在数据库中分组聚合，返回列式结果，见模块说明"""
+    group_by = [group_by] if isinstance(group_by, str) else list(group_by or ())
+    metrics = dict(metrics or {'count': 'COUNT(*)'})
+    q = api.query(table)
+    d = q.dialect
+    q.select(*group_by, *(f'{metric_sql(d, spec)} AS {d.quote(name)}' for name, spec in metrics.items()))
+    if isinstance(where, dict):
+        q.where(**where)
+    elif where:
+        q.where(*([where] if isinstance(where, str) else where))
+    if group_by:
+        q.group_by(*group_by)
+    if having:
+        q.having(*([having] if isinstance(having, str) else having))
+    if order_by:
+        q.order_by(*([order_by] if isinstance(order_by, str) else order_by))
+    if limit is not None:
+        q.limit(limit)
+    names = [_.split('.')[-1] for _ in group_by] + list(metrics)
+    return columnar(names, q.all())
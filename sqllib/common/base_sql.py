@@ -5,7 +5,9 @@
 @Author     : LeeCQ
 @Date-Time  : 2021/1/8 20:46
 """
+import threading
 from abc import ABC, ABCMeta, abstractmethod
+from contextlib import contextmanager
 from warnings import warn
 
 from .base import DBBase, APIBase
@@ -13,7 +15,14 @@ from .error import *
 
 __all__ = ['BaseSQL', 'BaseSQLAPI']
 
-from .common import sql_join
+from .common import sql_join, create_index_sql
+from . import aggregate as _aggregate
+from . import batch as _batch
+from . import explain as _explain
+from . import transfer
+from .convert import ConverterPlan
+from .hot import HotTable
+from .query import Query
 
 
 # from sqllib.SQLite.sqlite import SQLiteBase
@@ -23,6 +32,15 @@ class BaseSQL(DBBase, ABC):
     """关系型数据库的基类"""
 
     SQL_DB = None
+    PLACEHOLDER = '?'  # 参数占位符: SQLite ?, MySQL %s
+    DIALECT = None  # 查询构造器使用的方言，见 common.query.DIALECTS
+    convert_types = False  # 为True时 select() / query() 的结果按列的声明类型转换，见 common.convert
+    MAX_IN_PARAMS = 999  # get_many() 中每条 IN 查询的参数个数上限
+    MAX_IN_BYTES = None  # get_many() 中每条 IN 查询参数字面量的总长度上限(估算)，None 不限制
+    concurrent_reads = False  # 为True时可以在多个线程上同时 read_db()，get_many() 据此并发执行各批
+    iter_db_isolated = False  # 为True时 iter_db() 自己使用独立连接，可以直接在其他线程中调用，不需要先 fork()
+    _read_observers = ()  # ((线程 id, callback), ...)，见 observe_reads()
+    _observers_lock = threading.Lock()
 
     # 数据库
 
@@ -30,6 +48,45 @@ class BaseSQL(DBBase, ABC):
     def tables_name(self):
         pass
 
+    def columns_info(self, table) -> list:
+        """返回统一格式的列信息: [{'name': 列名, 'type': 声明类型, 'notnull': bool, 'pk': bool}, ...]"""
+        raise SqlModuleError(f'{type(self).__name__} 不支持读取列信息')
+
+    def column_types(self, table) -> dict:
+        """返回 {列名: 声明类型} """
+        return {_['name']: _['type'] for _ in self.columns_info(table)}
+
+    def converter_plan(self, table) -> ConverterPlan:
+        """表的类型转换计划，由列信息构建一次后缓存；表结构变化后调用 clear_converter_plans()"""
+        table = self.get_real_table_name(table)
+        plans = self.__dict__.setdefault('_converter_plans', {})
+        if table not in plans:
+            plans[table] = ConverterPlan(self.column_types(table))
+        return plans[table]
+
+    def clear_converter_plans(self, table=None):
+        """清除缓存的转换计划，table 为 None 时全部清除"""
+        plans = self.__dict__.setdefault('_converter_plans', {})
+        plans.clear() if table is None else plans.pop(self.get_real_table_name(table), None)
+
+    def convert_rows(self, table, description, rows):
+        """按 table 的转换计划转换结果集，description 为游标的 description"""
+        return self.converter_plan(table).apply(rows, [_[0] for _ in description or ()])
+
+    def range_key(self, table):
+        """返回可用于区间切分的整数主键名，没有则返回None；默认不切分"""
+        return None
+
+    def fork(self, read_only=False):
+        """返回一个连接到同一数据库、持有独立连接的新实例，用于并发访问"""
+        raise SqlModuleError(f'{type(self).__name__} 不支持建立独立连接')
+
+    def _iter_db(self, command, args=None, batch_rows=1000, result_type=None):
+        """流式读取数据库，每次产出不超过 batch_rows 行的列表；默认一次 read_db() 读出全部结果后切分"""
+        rows = self.read_db(command, args, result_type=result_type)
+        for start in range(0, len(rows), batch_rows):
+            yield rows[start:start + batch_rows]
+
     @abstractmethod
     def columns_name(self, table):
         pass
@@ -100,17 +157,79 @@ class BaseSQL(DBBase, ABC):
     def _alter(self, table, command: str):
         pass
 
-    def write_db(self, command, *args):
-        """write_db的外部访问"""
-        return self._write_db(command, *args)
+    @contextmanager
+    def observe_reads(self, callback):
+        """ 在此上下文中，当前线程经 _read_db() 执行的每条查询调用 callback(command, args)
+
+        可以嵌套，也可以在多个线程中同时使用；只观察进入上下文的线程，退出时只移除自己的回调
+        """
+        entry = (threading.get_ident(), callback)
+        with self._observers_lock:
+            self._read_observers = self._read_observers + (entry,)
+        try:
+            yield self
+        finally:
+            with self._observers_lock:
+                self._read_observers = tuple(_ for _ in self._read_observers if _ is not entry)
+
+    def _notify_read(self, command, args):
+        """由各后端的 _read_db() 在执行查询前调用"""
+        if self._read_observers:
+            ident = threading.get_ident()
+            for thread, callback in self._read_observers:
+                if thread == ident:
+                    callback(command, args)
+
+    def time_limit(self, seconds):
+        """ 限制语句执行时间的上下文，超时的语句被中断并抛出 SqlTimeoutError：
+
+            with api.time_limit(2):
+                api.select(...)
+
+        由各后端实现；read_db / write_db / write_rows / select 的 timeout= 参数使用它。
+        """
+        raise SqlModuleError(f'{type(self).__name__} 不支持查询超时')
+
+    def _limited(self, timeout, func, *args, **kwargs):
+        """timeout 不为 None 时在 time_limit(timeout) 中执行 func"""
+        if timeout is None:
+            return func(*args, **kwargs)
+        with self.time_limit(timeout):
+            return func(*args, **kwargs)
+
+    def write_db(self, command, *args, timeout=None):
+        """write_db的外部访问
+
+        :param timeout: 执行超时(秒)，超时抛出 SqlTimeoutError
+        """
+        return self._limited(timeout, self._write_db, command, *args)
 
-    def write_rows(self, command, *args):
+    def write_rows(self, command, *args, timeout=None):
         """write_rows的外部访问"""
-        return self._write_affair(command, *args)
+        return self._limited(timeout, self._write_affair, command, *args)
+
+    def read_db(self, command, args=None, result_type=None, table=None, timeout=None):
+        """读取数据库的外部访问
+
+        :param table: 给出时，结果中与该表同名的列按声明类型转换(DATETIME、DECIMAL、JSON、BLOB)
+        :param timeout: 执行超时(秒)，超时抛出 SqlTimeoutError
+        """
+        return self._limited(timeout, self._read_db, command, args, result_type, table=table)
 
-    def read_db(self, command, args=None, result_type=None):
-        """读取数据库的外部访问"""
-        return self._read_db(command, args, result_type)
+    def iter_db(self, command, args=None, batch_rows=1000, result_type=None):
+        """流式读取数据库的外部访问"""
+        return self._iter_db(command, args, batch_rows=batch_rows, result_type=result_type)
+
+    def explain(self, sql, args=None, **params) -> _explain.QueryPlan:
+        """ 执行计划：SQLite 为 EXPLAIN QUERY PLAN，MySQL 为 EXPLAIN FORMAT=JSON，统一为 QueryPlan
+
+        :param sql: SQL文本，或 query() / Statement (params 为 P() 占位的取值)
+        """
+        return _explain.explain(self, sql, args, **params)
+
+    def index_advisor(self) -> _explain.IndexAdvisor:
+        """汇总查询并给出索引建议，详见 common.explain"""
+        return _explain.IndexAdvisor(self)
 
 
 class BaseSQLAPI(BaseSQL, APIBase, metaclass=ABCMeta):
@@ -163,7 +282,7 @@ class BaseSQLAPI(BaseSQL, APIBase, metaclass=ABCMeta):
         """
         return self._insert(table, ignore_repeat=ignore_repeat, **kwargs)
 
-    def select(self, table, cols, *args, result_type=None, **kwargs):
+    def select(self, table, cols, *args, result_type=None, timeout=None, **kwargs):
         """ 从数据库中查找数据；
 
             column_name 可以设置别名；
@@ -174,6 +293,7 @@ class BaseSQLAPI(BaseSQL, APIBase, metaclass=ABCMeta):
         :param table:
         :param cols: 传参时自行使用 `` , 尤其是数字开头的参数
         :param result_type: 返回结果集：{dict, None, tuple, 'SSCursor', 'SSDictCursor'}
+        :param timeout: 执行超时(秒)，超时抛出 SqlTimeoutError
         :param kwargs: {'WHERE', 'LIMIT', 'OFFSET', 'ORDER'} 全大写
                         WHERE 查询字符串 如 KEY=VALUE
                         LIMIT 2 OFFSET 2  通常连在一起使用
@@ -189,7 +309,50 @@ class BaseSQLAPI(BaseSQL, APIBase, metaclass=ABCMeta):
             [_cols.append(_) for _ in cols]
         if args:
             [_cols.append(_) for _ in args]
-        return self._select(table, _cols, result_type=result_type, **kwargs)
+        return self._limited(timeout, self._select, table, _cols, result_type=result_type, **kwargs)
+
+    def query(self, table) -> Query:
+        """ 返回一个可组合的查询构造器，编译后的语句可以绑定新参数反复执行：
+
+            q = api.query('user').select('id', 'name').where(age__gte=P('age')).order_by('-id').limit(10)
+            q.all(age=18)
+            q.all(age=30)  # 不再重新编译
+
+        详见 sqllib.common.query
+        """
+        return Query(self, table)
+
+    def aggregate(self, table, group_by=(), metrics=None, where=None, having=None, order_by=None, limit=None) -> dict:
+        """ 在数据库中分组聚合，只传回聚合结果，返回列式的 {列名: [值, ...]}
+
+            api.aggregate('orders', group_by=['city'], metrics={'n': 'COUNT(*)', 's': ('sum', 'amount')},
+                          where={'status': 'paid'})
+
+        :param metrics: {名称: SQL表达式 或 (函数, 列)}，默认 {'count': 'COUNT(*)'}；函数按方言生成，详见 common.aggregate
+        :param where: 与 query().where() 相同的 {列名[__操作符]: 值}，或原样拼接的条件字符串(列表)
+        :param order_by: 'col' 升序，'-col' 降序，可以使用指标的名称
+        """
+        return _aggregate.aggregate(self, table, group_by, metrics, where, having, order_by, limit)
+
+    def get_many(self, table, key, values, cols=None, result_type=None, workers=4) -> dict:
+        """ 按键批量读取，返回 {键: 行}；键自动切分为若干条不超过 MAX_IN_PARAMS 个参数的 IN 查询
+
+            api.get_many('user', 'id', [1, 2, 3], cols=['id', 'name'])    # {1: (1, 'a'), 3: (3, 'c')}
+
+        :param cols: 读取的列，默认全部；不包含 key 时自动加入
+        :param workers: concurrent_reads 为真(如 MySQL 连接池)时并发读取的线程数
+        """
+        return _batch.get_many(self, table, key, values, cols, result_type, workers)
+
+    def batch_loader(self, table, key, cols=None, window=0.002, result_type=None) -> _batch.BatchLoader:
+        """ 合并并发点查：同一时间窗内各线程 / 协程的 load(key) 去重后一次 IN 查询
+
+            users = api.batch_loader('user', 'id')
+            users.load(7), await users.aload(7), users.load_many([1, 2])
+
+        :param window: 收集请求的时间窗(秒)，详见 common.batch.BatchLoader
+        """
+        return _batch.BatchLoader(self, table, key, cols, window, result_type)
 
     def select_new(self, table, columns_name: tuple or list, result_type=None, **kwargs):
         """ SELECT的另一种传参方式：
@@ -222,6 +385,7 @@ class BaseSQLAPI(BaseSQL, APIBase, metaclass=ABCMeta):
         :param name: table name
         :return: 0 or Error
         """
+        self.clear_converter_plans(name)
         return self._drop('TABLE', name)
 
     def drop_db(self, name):
@@ -253,4 +417,98 @@ class BaseSQLAPI(BaseSQL, APIBase, metaclass=ABCMeta):
                  );
         :return:
         """
+        self.clear_converter_plans(table)
         return self._alter(table, command)
+
+    def create_index(self, table, columns, name=None, unique=False):
+        """ 创建索引
+
+        :param columns: 列名或列名列表，可以带排序方向，如 ['city', 'age DESC']
+        :param name: 索引名，默认 idx_<表>_<列>
+        """
+        return self._write_db(create_index_sql(self.get_real_table_name(table), columns, name, unique))
+
+    def list_indexes(self, table) -> list:
+        """ 表上的索引 [{'name', 'columns', 'unique', 'primary', 'sql'}, ...]
+
+        sql 为重建该索引的语句；主键与约束自动创建的索引为 None
+        """
+        raise SqlModuleError(f'{type(self).__name__} 不支持 list_indexes()')
+
+    def rebuild_index(self, table, name=None):
+        """重建表上的全部索引，或只重建名为 name 的索引"""
+        raise SqlModuleError(f'{type(self).__name__} 不支持 rebuild_index()')
+
+    def _restore_indexes(self, table, indexes):
+        """按 list_indexes() 的结果逐个重建索引"""
+        for _i in indexes:
+            self._write_db(_i['sql'])
+
+    @contextmanager
+    def deferred_indexes(self, table, unique=False):
+        """ 批量导入前删除二级索引，退出时(无论是否出错)重新创建；先导入后建索引比逐行维护索引快数倍
+
+            with api.deferred_indexes('user'):
+                api.import_file('user', 'user.csv')
+
+        :param unique: 为True时唯一索引也延迟创建，导入期间不检查唯一性，重复的数据会导致重建失败
+        :return: 被延迟的索引(list_indexes() 的格式)
+        """
+        indexes = [_ for _ in self.list_indexes(table)
+                   if _['sql'] and not _['primary'] and (unique or not _['unique'])]
+        for _i in indexes:
+            self.drop_index(_i['name'], table)
+        try:
+            yield indexes
+        finally:
+            if indexes:
+                self._restore_indexes(table, indexes)
+
+    def hot_table(self, table, key, refresh_interval=60, **kwargs) -> HotTable:
+        """ 把表装入进程内的字典，点查 / 批量查不访问数据库，后台线程每 refresh_interval 秒刷新
+
+            cities = api.hot_table('city', 'code', refresh_interval=30, watermark_col='updated_at')
+            cities.get('SZ'), cities.get_many(['SZ', 'BJ'])
+
+        :param kwargs: cols, watermark_col, cdc, result_type，详见 common.hot.HotTable
+        """
+        return HotTable(self, table, key, refresh_interval=refresh_interval, **kwargs)
+
+    def export_table(self, table, path, format='csv', chunk_rows=10000, workers=1, cols=None):
+        """ 将数据表导出到文件。
+
+        按整数主键(SQLite 可退回 rowid)切分为若干区间，由 workers 个独立连接并发读取，
+        按区间顺序流式写入文件；同一时刻内存中最多保留 workers + 1 个区间的数据。
+        CSV 中 NULL 写为 \\N(与空字符串区分，import_file() 读回 NULL)；内容恰好是 \\N 的文本也会读回 NULL，
+        需要精确保留时使用 jsonl。
+
+        :param table: 表名
+        :param path: 输出文件路径
+        :param format: 'csv' 或 'jsonl'
+        :param chunk_rows: 每个区间的预估行数
+        :param workers: 并发读取的连接数
+        :param cols: 导出的列，默认全部列
+        :return: 导出的行数
+        """
+        return transfer.export_table(self, table, path, format=format, chunk_rows=chunk_rows,
+                                     workers=workers, cols=cols)
+
+    def import_file(self, table, path, format='csv', columns=None, batch_rows=5000, progress=None, checkpoint=None):
+        """ 从文件流式导入数据。
+
+        文件被逐行惰性解析，按 column_types() 的声明类型转换后，每 batch_rows 行一个事务写入；
+        内存占用与文件大小无关。CSV 第一行必须是表头，字段 \\N 为 NULL，数值等类型的空字段也视为 NULL。
+
+        :param table: 表名
+        :param path: 文件路径
+        :param format: 'csv' 或 'jsonl'
+        :param columns: 需要导入的字段，默认为 CSV 表头 / JSONL 首行的全部键
+        :param batch_rows: 每个事务写入的行数
+        :param progress: 每批提交后调用 progress(已导入行数)
+        :param checkpoint: 检查点文件路径；每批提交后记录进度，中断后再次调用将从此处继续，完成后删除；
+                           检查点记录的不是 path 时抛出 SqlModuleError。
+                           注意：提交与记录检查点之间中断时，最后一批可能被重复导入。
+        :return: 导入的总行数(包括从检查点跳过的行)
+        """
+        return transfer.import_file(self, table, path, format=format, columns=columns, batch_rows=batch_rows,
+                                    progress=progress, checkpoint=checkpoint)
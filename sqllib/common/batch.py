@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : batch.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 03:20
+
+按键批量读取
+
+    api.get_many('user', 'id', range(10000), cols=['id', 'name'])     # {1: (1, 'a'), 2: (2, 'b'), ...}
+
+    1. 键去重后切分为若干 IN (...) 查询，每条语句的参数个数不超过后端的上限 MAX_IN_PARAMS
+       (SQLite 为连接的 SQLITE_LIMIT_VARIABLE_NUMBER，MSSQL 为 2100 以内，MySQL 另按 MAX_IN_BYTES 控制语句长度)
+    2. 后端可以在多个线程上同时读取时(api.concurrent_reads，如启用了连接池的 MySqlAPI)各批并发执行
+
+合并点查(DataLoader)
+
+    users = api.batch_loader('user', 'id', window=0.002)
+    users.load(7)                       # 线程中：阻塞至所在批次完成，不存在时返回 None
+    await users.aload(7)                # asyncio 中
+    users.load_many([1, 2, 3])          # [行, 行, None]
+
+    1. 第一个请求等待 window 秒收集同一时间窗内其他线程 / 协程的请求，键去重后以 get_many() 一次查询，结果分发给各请求
+    2. 查询在收集窗口的发起者(线程)中执行，其他请求只等待结果；查询出错时该批次的所有请求抛出同一异常；
+       发起者在收集窗口内被中断或取消时，已收集的键仍会被查询，等待它们的其他请求不受影响
+    3. aload() 的查询在默认线程池中执行，不阻塞事件循环；api 需要允许在其他线程上使用
+       (SQLiteAPI 需以 check_same_thread=False 打开)
+    4. 键按数据库返回的值匹配，传入的键类型需要与列一致(如整数列不能用 '7' 查询)
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+__all__ = ['chunked', 'get_many', 'BatchLoader']
+
+
+def chunked(values, max_params, max_bytes=None):
+    """ 把 values 切分为参数个数不超过 max_params、(估算的)字面量总长度不超过 max_bytes 的列表 """
+    chunk, size = [], 0
+    for value in values:
+        _len = len(str(value)) + 4 if max_bytes else 0  # 引号、逗号与空格
+        if chunk and (len(chunk) >= max_params or (max_bytes and size + _len > max_bytes)):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(value)
+        size += _len
+    if chunk:
+        yield chunk
+
+
+def get_many(api, table, key, values, cols=None, result_type=None, workers=4) -> dict:
+    """ 按 key 的取值批量读取行，返回 {键: 行}；不存在的键不出现在结果中
+
+    :param cols: 读取的列，默认全部；不包含 key 时自动加在最前
+    :param result_type: None 行为元组，dict 行为字典
+    :param workers: 并发读取的线程数(仅 api.concurrent_reads 为真时)
+    """
+    values = list(dict.fromkeys(values))
+    if not values:
+        return {}
+    cols = list(cols or ())
+    if cols and key not in cols:
+        cols.insert(0, key)
+    chunks = list(chunked(values, getattr(api, 'MAX_IN_PARAMS', 999), getattr(api, 'MAX_IN_BYTES', None)))
+
+    def _fetch(chunk):
+        return api.query(table).select(*cols).where(**{f'{key}__in': chunk}).all(result_type=dict)
+
+    if len(chunks) > 1 and workers > 1 and getattr(api, 'concurrent_reads', False):
+        with ThreadPoolExecutor(max_workers=min(workers, len(chunks)), thread_name_prefix='sqllib-get-many') as pool:
+            results = list(pool.map(_fetch, chunks))
+    else:
+        results = [_fetch(_) for _ in chunks]
+    return {row[key]: row if result_type is dict else tuple(row.values()) for rows in results for row in rows}
+
+
+class BatchLoader:
+    """ 把同一时间窗内的点查合并为一次 IN 查询，见模块说明
+
+    :param api: BaseSQLAPI 实例
+    :param table: 表名
+    :param key: 键的列名
+    :param cols: 读取的列，默认全部
+    :param window: 收集请求的时间窗(秒)
+    :param result_type: None 行为元组，dict 行为字典
+    """
+
+    def __init__(self, api, table, key, cols=None, window=0.002, result_type=None):
+        self.api = api
+        self.table = table
+        self.key = key
+        self.cols = cols
+        self.window = window
+        self.result_type = result_type
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._collecting = False
+        self.stats = {'loads': 0, 'keys': 0, 'batches': 0}
+
+    def _enqueue(self, keys):
+        """登记请求，返回 (各键的 Future, 是否由本请求发起查询)"""
+        with self._lock:
+            futures = []
+            for key in keys:
+                if key not in self._pending:
+                    self._pending[key] = Future()
+                futures.append(self._pending[key])
+            self.stats['loads'] += len(futures)
+            leader, self._collecting = not self._collecting, True
+            return futures, leader
+
+    def dispatch(self):
+        """立即查询已收集的键并分发结果"""
+        with self._lock:
+            pending, self._pending, self._collecting = self._pending, {}, False
+        if not pending:
+            return
+        try:
+            rows = self.api.get_many(self.table, self.key, list(pending), self.cols, self.result_type)
+        except Exception as _e:
+            for future in pending.values():
+                future.set_exception(_e)
+            return
+        self.stats['keys'] += len(pending)
+        self.stats['batches'] += 1
+        for key, future in pending.items():
+            future.set_result(rows.get(key))
+
+    def load_many(self, keys, timeout=None) -> list:
+        """按 keys 的顺序返回行，不存在的为 None"""
+        keys = list(keys)
+        if not keys:
+            return []
+        futures, leader = self._enqueue(keys)
+        if leader:
+            try:
+                time.sleep(self.window)
+            finally:
+                self.dispatch()
+        return [_.result(timeout) for _ in futures]
+
+    def load(self, key, timeout=None):
+        return self.load_many([key], timeout)[0]
+
+    async def aload_many(self, keys) -> list:
+        """load_many() 的协程版本：收集窗口内让出事件循环，查询在线程池中执行"""
+        keys = list(keys)
+        if not keys:
+            return []
+        futures, leader = self._enqueue(keys)
+        if leader:
+            try:
+                await asyncio.sleep(self.window)
+            finally:  # 被取消时也要查询，否则等待同一批次的请求永远不会完成
+                dispatched = asyncio.get_running_loop().run_in_executor(None, self.dispatch)
+            await dispatched
+        return [await asyncio.wrap_future(_) for _ in futures]
+
+    async def aload(self, key):
+        return (await self.aload_many([key]))[0]
+
+    def __repr__(self):
+        return f'<BatchLoader {self.table}.{self.key} window={self.window}>'
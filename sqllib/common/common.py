@@ -6,9 +6,19 @@
 @Date-Time  : 2020/2/23 16:43
 
 """
+import json
 import logging
+import re
+import sqlite3
 import sys
 
+from .error import SqlKeyNameError
+
+try:  # 可选的更快的 JSON 编解码
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger("SQL")  # 创建实例
 formatter = logging.Formatter("[%(asctime)s] < %(funcName)s: %(lineno)d > [%(levelname)s] %(message)s")
 # 终端日志
@@ -48,8 +58,77 @@ def sql_join(data: (tuple, list)) -> tuple:
     )
 
 
+def index_name(table, columns) -> str:
+    """默认的索引名：idx_<表>_<列>_<列>"""
+    return f'idx_{table}_' + '_'.join(columns)
+
+
+def create_index_sql(table, columns, name=None, unique=False) -> str:
+    """ 生成 CREATE INDEX 语句，SQLite 与 MySQL 通用
+
+    :param columns: 列名或列名列表；可以带排序方向，如 'age DESC'
+    """
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    cols = ', '.join(f'`{_.split()[0]}`' + ''.join(f' {_x}' for _x in _.split()[1:]) for _ in columns)
+    name = name or index_name(table, [_.split()[0] for _ in columns])
+    return f'CREATE {"UNIQUE " if unique else ""}INDEX `{name}` ON `{table}` ({cols})'
+
+
 class SQLiteJson:
-    """SQLite的JSON数据类型支持"""
+    """SQLite的JSON数据类型支持
+
+    1. SQLiteAPI(db, json_columns=True): 该连接写入的 dict / list 参数序列化为 JSON 文本(SQLiteBase.ADAPTERS，
+       不注册全局的 dict / list 适配器)；以 PARSE_DECLTYPES 打开连接，声明类型为 JSON 的列读出时自动解析。
+       PARSE_DECLTYPES 同时启用 sqlite3 内置的 DATE / TIMESTAMP 转换器，这两种声明类型的列读出为 date / datetime，
+       内容不是 ISO 格式时读取会抛出 ValueError。
+    2. register(): 注册 JSON 声明类型的转换器；转换器只作用于以 PARSE_DECLTYPES 打开的连接。
+    3. 安装了 orjson 时使用 orjson 编解码，否则使用标准库 json。
+    4. extract() / path(): 生成 json_extract 表达式，把过滤条件交给 SQLite 执行。
+    """
+
+    DECLTYPE = 'JSON'
+    _PATH = re.compile(r'[A-Za-z_]\w*(\.[A-Za-z_]\w*|\[\d+\])*')
+    _registered = False
+
+    if orjson is not None:
+        @staticmethod
+        def dumps(value) -> str:
+            return orjson.dumps(value).decode()
+
+        loads = staticmethod(orjson.loads)
+    else:
+        @staticmethod
+        def dumps(value) -> str:
+            return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+        loads = staticmethod(json.loads)
+
+    @classmethod
+    def register(cls):
+        """注册 JSON 声明类型的 sqlite3 转换器(重复调用无副作用)"""
+        if cls._registered:
+            return
+        sqlite3.register_converter(cls.DECLTYPE, cls.loads)
+        cls._registered = True
+
+    @classmethod
+    def adapters(cls) -> dict:
+        """dict / list 参数的适配器，用于 SQLiteBase.ADAPTERS"""
+        return {dict: cls.dumps, list: cls.dumps}
+
+    @classmethod
+    def path(cls, path: str) -> str:
+        """'a.b[0]' -> '$.a.b[0]'；只允许标识符与数组下标，防止拼接注入"""
+        if path.startswith('$'):
+            path = path.lstrip('$').lstrip('.')
+        if not cls._PATH.fullmatch(path):
+            raise SqlKeyNameError(f'不支持的 JSON 路径: {path}')
+        return f'$.{path}'
+
+    @classmethod
+    def extract(cls, column: str, path: str) -> str:
+        """json_extract(`column`, '$.path')"""
+        return f"json_extract(`{column}`, '{cls.path(path)}')"
 
 
 if __name__ == '__main__':
@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : convert.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 20:10
+
+按声明类型的结果集转换
+
+SQLite 把 DATETIME / JSON / DECIMAL 原样存为文本，MySQL 则返回 datetime / Decimal / str(JSON)；
+ConverterPlan 由一张表的列信息构建一次(缓存在 API 实例上)，读取时只对需要转换的列循环调用转换函数，
+让两种后端返回一致的 Python 类型：
+
+    DATETIME / TIMESTAMP -> datetime      DATE -> date
+    DECIMAL / NUMERIC    -> Decimal       JSON -> dict / list
+    BLOB / BINARY        -> bytes
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from .common import SQLiteJson
+
+__all__ = ['ConverterPlan', 'converter_for']
+
+_DATETIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f')
+
+
+def to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):  # SQLite 中以时间戳保存
+        return datetime.fromtimestamp(value)
+    if isinstance(value, bytes):
+        value = value.decode()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        for _f in _DATETIME_FORMATS:  # strptime 接受 '2021-1-9 17:28:16' 这样不补零的写法
+            try:
+                return datetime.strptime(value, _f)
+            except ValueError:
+                pass
+        return value
+
+
+def to_date(value):
+    if isinstance(value, date):
+        return value
+    _v = to_datetime(value)
+    return _v.date() if isinstance(_v, datetime) else _v
+
+
+def to_decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def to_json(value):
+    return SQLiteJson.loads(value) if isinstance(value, (str, bytes, bytearray)) else value
+
+
+def to_bytes(value):
+    return value if isinstance(value, bytes) else bytes(value) if isinstance(value, (bytearray, memoryview)) \
+        else value.encode() if isinstance(value, str) else value
+
+
+def converter_for(declared: str):
+    """声明类型 -> 转换函数；不需要转换时返回 None"""
+    declared = (declared or '').upper()
+    if declared.startswith(('DATETIME', 'TIMESTAMP')):
+        return to_datetime
+    if declared.startswith('DATE'):
+        return to_date
+    if declared.startswith(('DECIMAL', 'NUMERIC')):
+        return to_decimal
+    if declared.startswith('JSON'):
+        return to_json
+    if 'BLOB' in declared or 'BINARY' in declared:
+        return to_bytes
+    return None
+
+
+class ConverterPlan:
+    """一张表的转换计划：{列名: 转换函数}，按结果集的列描述绑定为 [(位置, 转换函数)]"""
+
+    def __init__(self, column_types: dict):
+        self.converters = {name: _c for name, _c in ((n, converter_for(t)) for n, t in column_types.items())
+                           if _c is not None}
+        self._bound = {}
+
+    def bind(self, names) -> list:
+        """结果集列名 -> [(位置, 列名, 转换函数)]，按列名组合缓存"""
+        names = tuple(names)
+        if names not in self._bound:
+            self._bound[names] = [(index, name, self.converters[name]) for index, name in enumerate(names)
+                                  if name in self.converters]
+        return self._bound[names]
+
+    def apply(self, rows, names):
+        """转换一批结果(元组或字典)，names 为 cursor.description 中的列名"""
+        slots = self.bind(names)
+        if not slots or not rows:
+            return rows
+        if isinstance(rows[0], dict):
+            for row in rows:
+                for _, name, _conv in slots:
+                    if row[name] is not None:
+                        row[name] = _conv(row[name])
+            return rows
+        result = []
+        for row in rows:
+            row = list(row)
+            for index, _, _conv in slots:
+                if row[index] is not None:
+                    row[index] = _conv(row[index])
+            result.append(tuple(row))
+        return result
@@ -51,5 +51,26 @@ class SqlWriteError(SqllibError):
     pass
 
 
+class SqlBufferedWriteError(SqlWriteError):
+    """后台批量写入失败，携带出错的表与整批数据"""
+
+    def __init__(self, msg, table=None, rows=None):
+        super().__init__(msg)
+        self.table = table
+        self.rows = rows
+
+
 class SqlModuleError(SqllibError):
     pass
+
+
+class SqlShardError(SqllibError):
+    """分片路由错误：缺少分片键、分片函数返回无效编号等"""
+
+
+class SqlCircuitOpenError(SqllibError):
+    """熔断器打开期间拒绝访问数据库"""
+
+
+class SqlTimeoutError(SqllibError):
+    """语句执行超过 timeout，已被中断"""
@@ -0,0 +1,212 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : explain.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 23:10
+
+执行计划分析与索引建议
+
+    plan = api.explain('SELECT * FROM user WHERE name=?', ('a',))   # 也可以传入 query() / Statement
+    plan.full_scans         # ['user']
+    plan.temp_btree         # 是否需要临时B树(排序 / 分组 / 去重)
+    plan.steps              # [{'table', 'index', 'access', 'full_scan', 'temp_btree', 'detail'}, ...]
+
+    advisor = api.index_advisor()
+    with advisor.watch():   # 记录期间执行的所有查询(也可以 advisor.record(sql, args))
+        ...
+    advisor.suggestions()   # [{'table', 'columns', 'count', 'sql': 'CREATE INDEX ...', 'example'}, ...]
+
+SQLite 使用 EXPLAIN QUERY PLAN，MySQL 使用 EXPLAIN FORMAT=JSON，结果统一为上面的 steps 结构。
+"""
+import json
+import re
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .common import create_index_sql
+from .error import SqlModuleError
+
+__all__ = ['QueryPlan', 'IndexAdvisor', 'explain']
+
+_RE_SQLITE_STEP = re.compile(r'^(SCAN|SEARCH)\s+(?:TABLE\s+)?(\S+)(?:\s+AS\s+\S+)?'
+                             r'(?:\s+USING\s+(?:(?:COVERING\s+)?INDEX\s+(\S+)|(INTEGER PRIMARY KEY|PRIMARY KEY)))?')
+_RE_TABLES = re.compile(r'\b(?:FROM|JOIN)\s+[`"\[]?(\w+)[`"\]]?(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|RIGHT\b|'
+                        r'INNER\b|OUTER\b|CROSS\b|NATURAL\b|USING\b|GROUP\b|ORDER\b|HAVING\b|LIMIT\b|UNION\b)(\w+))?',
+                        re.I)
+_RE_PREDICATE = re.compile(r'(?:[`"\[]?(\w+)[`"\]]?\.)?[`"\[]?(\w+)[`"\]]?\s*(=|<>|!=|<=|>=|<|>|\bIN\b|\bLIKE\b|'
+                           r'\bBETWEEN\b|\bIS\b)', re.I)
+_RE_ORDER = re.compile(r'\bORDER\s+BY\s+(.+?)(?:\bLIMIT\b|\bOFFSET\b|$)', re.I | re.S)
+_EQUALITY = {'=', 'IN', 'IS'}
+
+
+def _step(table=None, index=None, access='', full_scan=False, temp_btree=False, detail=''):
+    return {'table': table, 'index': index, 'access': access, 'full_scan': full_scan, 'temp_btree': temp_btree,
+            'detail': detail}
+
+
+def parse_sqlite(rows) -> list:
+    """EXPLAIN QUERY PLAN 的 (id, parent, notused, detail) -> steps"""
+    steps = []
+    for row in rows:
+        detail = row[-1]
+        _m = _RE_SQLITE_STEP.match(detail)
+        if detail.startswith('USE TEMP B-TREE'):
+            steps.append(_step(access='temp_btree', temp_btree=True, detail=detail))
+        elif _m and _m.group(2) != 'CONSTANT':
+            op, table, index, pk = _m.groups()
+            access = 'search' if op == 'SEARCH' else 'index_scan' if index else 'scan'
+            steps.append(_step(table, index or (pk and 'PRIMARY'), access, access == 'scan', detail=detail))
+        else:
+            steps.append(_step(access='other', detail=detail))
+    return steps
+
+
+def parse_mysql(doc) -> list:
+    """EXPLAIN FORMAT=JSON 的文档 -> steps；access_type=ALL 为全表扫描，filesort / 临时表视为 temp_btree"""
+    steps = []
+
+    def _walk(node):
+        if isinstance(node, dict):
+            if 'table_name' in node and 'access_type' in node:
+                access = node['access_type']
+                steps.append(_step(node['table_name'], node.get('key'), access.lower(), access == 'ALL',
+                                   detail=f"{node['table_name']}: {access}"
+                                          f"{' key=' + node['key'] if node.get('key') else ''}"))
+            for key, value in node.items():
+                if key in ('using_temporary_table', 'using_filesort') and value is True:
+                    steps.append(_step(access='temp_btree', temp_btree=True, detail=key))
+                else:
+                    _walk(value)
+        elif isinstance(node, list):
+            for _ in node:
+                _walk(_)
+
+    _walk(doc)
+    return steps
+
+
+class QueryPlan:
+    """统一格式的执行计划"""
+
+    def __init__(self, sql, steps, raw=None):
+        self.sql = sql
+        self.steps = steps
+        self.raw = raw
+
+    @property
+    def full_scans(self) -> list:
+        """全表扫描的表(SQL中的名字或别名)"""
+        return [_['table'] for _ in self.steps if _['full_scan']]
+
+    @property
+    def temp_btree(self) -> bool:
+        return any(_['temp_btree'] for _ in self.steps)
+
+    @property
+    def ok(self) -> bool:
+        """没有全表扫描，也不需要临时B树"""
+        return not self.full_scans and not self.temp_btree
+
+    def __repr__(self):
+        return f'<QueryPlan full_scans={self.full_scans} temp_btree={self.temp_btree} {self.sql!r}>'
+
+
+def _statement(sql, args, params):
+    """SQL文本 / Query / Statement -> (SQL, 参数)"""
+    if hasattr(sql, 'compile'):
+        sql = sql.compile()
+    if hasattr(sql, 'bind'):
+        return sql.sql, sql.bind(**params)
+    return sql, args
+
+
+def explain(api, sql, args=None, **params) -> QueryPlan:
+    """获取 api 上 sql 的执行计划"""
+    sql, args = _statement(sql, args, params)
+    if api.DIALECT == 'sqlite':
+        rows = api.read_db('EXPLAIN QUERY PLAN ' + sql, args)
+        return QueryPlan(sql, parse_sqlite(rows), rows)
+    if api.DIALECT == 'mysql':
+        doc = api.read_db('EXPLAIN FORMAT=JSON ' + sql, args)[0][0]
+        doc = json.loads(doc.decode() if isinstance(doc, bytes) else doc)
+        return QueryPlan(sql, parse_mysql(doc), doc)
+    raise SqlModuleError(f'{type(api).__name__} 不支持 explain()')
+
+
+def _candidate_columns(sql, aliases, columns, order_by):
+    """SQL 中作用于某张表的谓词列：等值条件在前，范围条件在后，需要排序时追加 ORDER BY 的列"""
+    equal, ranged = [], []
+    for qualifier, column, op in _RE_PREDICATE.findall(sql):
+        if (qualifier and qualifier not in aliases) or column not in columns:
+            continue
+        (equal if op.upper() in _EQUALITY else ranged).append(column)
+    result = list(OrderedDict.fromkeys(equal + ranged))
+    if order_by:
+        _m = _RE_ORDER.search(sql)
+        for _item in (_m.group(1).split(',') if _m else ()):
+            _c = _item.split()[0].strip('`"[]').split('.')[-1] if _item.split() else ''
+            if _c in columns and _c not in result:
+                result.append(_c)
+    return result
+
+
+class IndexAdvisor:
+    """ 汇总记录的查询，对全表扫描与需要临时B树排序的表给出 CREATE INDEX 建议
+
+    :param api: SQLiteAPI / MySqlAPI
+    """
+
+    def __init__(self, api):
+        self.api = api
+        self._queries = OrderedDict()  # SQL -> [参数, 次数]
+
+    def record(self, sql, args=None, **params):
+        """记录一条查询(只记录 SELECT / WITH)；相同的SQL文本只计数"""
+        sql, args = _statement(sql, args, params)
+        if not re.match(r'^\s*(SELECT|WITH)\b', sql, re.I):
+            return
+        if sql in self._queries:
+            self._queries[sql][1] += 1
+        else:
+            self._queries[sql] = [args, 1]
+
+    @contextmanager
+    def watch(self):
+        """在此上下文中当前线程通过 api 执行的查询都会被记录；可以嵌套，不记录其他线程的查询"""
+        with self.api.observe_reads(self.record):
+            yield self
+
+    def plans(self) -> list:
+        """[(QueryPlan, 次数), ...]"""
+        return [(self.api.explain(sql, args), count) for sql, (args, count) in self._queries.items()]
+
+    def suggestions(self) -> list:
+        """按涉及的查询次数从多到少排列的索引建议"""
+        found = OrderedDict()
+        for plan, count in self.plans():
+            aliases = {}
+            for table, alias in _RE_TABLES.findall(plan.sql):
+                aliases.setdefault(table, {table}).add(alias or table)
+            sorting = plan.temp_btree
+            targets = set(plan.full_scans)
+            if sorting and not targets and len(aliases) == 1:
+                targets = set(aliases)  # 命中索引但仍需临时B树排序
+            for name in targets:
+                table = next((_t for _t, _a in aliases.items() if name in _a), name)
+                try:
+                    table_columns = set(self.api.columns_name(table))
+                except Exception:  # 子查询 / CTE 等不是真实的表
+                    continue
+                columns = _candidate_columns(plan.sql, aliases.get(table, {table}), table_columns, sorting)
+                if not columns:
+                    continue
+                key = (table, tuple(columns))
+                if key not in found:
+                    found[key] = {'table': table, 'columns': columns, 'count': 0,
+                                  'sql': create_index_sql(table, columns), 'example': plan.sql}
+                found[key]['count'] += count
+        return sorted(found.values(), key=lambda _: -_['count'])
+
+    def clear(self):
+        self._queries.clear()
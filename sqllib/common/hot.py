@@ -0,0 +1,239 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : hot.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 02:40
+
+热点表的进程内副本：整表按键装入字典，点查与批量查不访问数据库，后台线程定期刷新
+
+    cities = api.hot_table('city', 'code', refresh_interval=30, watermark_col='updated_at')
+    cities.get('SZ')                        # ('SZ', '深圳', ...)，不存在时返回 default
+    cities.get_many(['SZ', 'BJ', 'XX'])     # {'SZ': (...), 'BJ': (...)}
+    cities.close()
+
+    刷新方式：
+    1. watermark_col: 只拉取 水位列 >= 上次最大值 的行并覆盖，不能发现删除
+    2. cdc=True (SQLite，需先 enable_cdc(table))：按变更日志重新读取变化的键，能处理删除
+    3. 都不指定时每次全量重新装载
+
+    每次刷新都在副本上完成后整体替换，查询始终看到某一次刷新完成时的完整数据，不会看到刷新到一半的状态。
+    刷新在独立连接上进行(api.fork(read_only=True)；iter_db() 本身使用独立连接的 MySQL 不再 fork)；
+    出错时记录日志并继续使用旧数据，水位 / 变更位置不前进。
+"""
+import json
+import logging
+import threading
+import time
+
+from .error import SqlModuleError
+
+logger = logging.getLogger('sqllib.hot')
+
+__all__ = ['HotTable']
+
+
+class HotTable:
+    """ 内存中的热点表
+
+    :param api: BaseSQLAPI 实例
+    :param table: 表名
+    :param key: 键的列名；复合键为列名列表，此时键为元组
+    :param cols: 缓存的列，默认全部列
+    :param refresh_interval: 后台刷新间隔(秒)，None 或 0 不启动后台线程(可以手动 refresh())
+    :param watermark_col: 增量刷新的水位列
+    :param cdc: 按 SQLite 变更日志增量刷新
+    :param result_type: None 返回元组，dict 返回字典
+    """
+
+    BATCH_KEYS = 500  # CDC 刷新时每条 IN 查询的键数
+
+    def __init__(self, api, table, key, cols=None, refresh_interval=60, watermark_col=None, cdc=False,
+                 result_type=None):
+        if watermark_col and cdc:
+            raise SqlModuleError('watermark_col 与 cdc 只能选择一种增量方式')
+        self.api = api
+        self.table = api.get_real_table_name(table)
+        self.keys = [key] if isinstance(key, str) else list(key)
+        self.cols = list(cols or api.columns_name(self.table))
+        for _c in self.keys + ([watermark_col] if watermark_col else []):
+            if _c not in self.cols:
+                self.cols.append(_c)
+        self.refresh_interval = refresh_interval
+        self.watermark_col = watermark_col
+        self.cdc = cdc
+        self.result_type = result_type
+        self._key_index = [self.cols.index(_) for _ in self.keys]
+        self._rows = {}
+        self._watermark = None
+        self._position = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._reader = None
+        self._refresh_lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'errors': 0, 'loaded_at': None}
+        self.reload()
+        if refresh_interval:
+            self.start()
+
+    # 查询
+    def _key(self, row):
+        if len(self._key_index) == 1:
+            return row[self._key_index[0]]
+        return tuple(row[_] for _ in self._key_index)
+
+    def _row(self, row):
+        return dict(zip(self.cols, row)) if self.result_type is dict else row
+
+    def get(self, key, default=None):
+        row = self._rows.get(key)
+        if row is None:
+            self.stats['misses'] += 1
+            return default
+        self.stats['hits'] += 1
+        return self._row(row)
+
+    def get_many(self, keys) -> dict:
+        """{key: row}，不存在的键不出现在结果中"""
+        rows, keys = self._rows, list(keys)
+        result = {_k: self._row(rows[_k]) for _k in keys if _k in rows}
+        self.stats['hits'] += len(result)
+        self.stats['misses'] += len(keys) - len(result)
+        return result
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def keys(self):
+        return list(self._rows)
+
+    # 装载与刷新
+    def _source(self):
+        """后台线程使用独立的只读连接，其他线程使用 api 本身；iter_db() 自己使用独立连接的后端不需要 fork"""
+        if threading.current_thread() is not self._thread or (self.api.iter_db_isolated and not self.cdc):
+            return self.api
+        if self._reader is None:
+            self._reader = self.api.fork(read_only=True)
+        return self._reader
+
+    def _select(self):
+        return f'SELECT {", ".join(f"`{_}`" for _ in self.cols)} FROM `{self.table}`'
+
+    def reload(self):
+        """全量装载，完成后整体替换"""
+        src = self._source()
+        position = src.cdc_position() if self.cdc else 0  # 先取位置：装载期间的变更会在下次刷新时重放
+        rows, watermark = {}, None
+        index = self.cols.index(self.watermark_col) if self.watermark_col else None
+        for batch in src.iter_db(self._select(), batch_rows=5000):
+            for row in batch:
+                rows[self._key(row)] = row
+                if index is not None and row[index] is not None and (watermark is None or row[index] > watermark):
+                    watermark = row[index]
+        self._rows, self._watermark, self._position = rows, watermark, position
+        self.stats['loaded_at'] = time.time()
+        logger.debug(f'热点表 {self.table}: 装载 {len(rows)} 行')
+        return len(rows)
+
+    def _refresh_watermark(self, src):
+        if self._watermark is None:
+            return self.reload()
+        index = self.cols.index(self.watermark_col)
+        rows, watermark, changed = self._rows, self._watermark, 0
+        for batch in src.iter_db(self._select() + f' WHERE `{self.watermark_col}` >= {src.PLACEHOLDER}',
+                                 (self._watermark,), batch_rows=5000):
+            for row in batch:
+                key = self._key(row)
+                if rows.get(key) != row:  # 水位处的行每次都会读到，只有内容变化时才计数
+                    if rows is self._rows:  # 第一次变化时复制，完成后整体替换
+                        rows = dict(self._rows)
+                    rows[key] = row
+                    changed += 1
+                if row[index] is not None and row[index] > watermark:
+                    watermark = row[index]
+        self._rows, self._watermark = rows, watermark
+        return changed
+
+    def _refresh_cdc(self, src):
+        changed, position = set(), self._position
+        for change in src.changes(since=self._position, table=self.table):
+            key = change['key']
+            if len(self.keys) > 1 and isinstance(key, str):
+                key = tuple(json.loads(key))
+            changed.add(key)
+            position = change['seq']
+        changed = list(changed)
+        rows = dict(self._rows) if changed else self._rows  # 在副本上更新，完成后整体替换
+        for start in range(0, len(changed), self.BATCH_KEYS):
+            chunk = changed[start:start + self.BATCH_KEYS]
+            found = {}
+            if len(self.keys) == 1:
+                _where = f'`{self.keys[0]}` IN ({", ".join(src.PLACEHOLDER for _ in chunk)})'
+                args = chunk
+            else:
+                _one = '(' + ' AND '.join(f'`{_}` = {src.PLACEHOLDER}' for _ in self.keys) + ')'
+                _where = ' OR '.join(_one for _ in chunk)
+                args = [_v for _k in chunk for _v in _k]
+            for row in src.read_db(f'{self._select()} WHERE {_where}', args):
+                found[self._key(row)] = row
+            for key in chunk:
+                if key in found:
+                    rows[key] = found[key]
+                else:
+                    rows.pop(key, None)  # 已删除
+        self._rows, self._position = rows, position
+        return len(changed)
+
+    def refresh(self) -> int:
+        """刷新一次，返回变化(或重新装载)的行数"""
+        with self._refresh_lock:
+            src = self._source()
+            if self.watermark_col:
+                changed = self._refresh_watermark(src)
+            elif self.cdc:
+                changed = self._refresh_cdc(src)
+            else:
+                changed = self.reload()
+            self.stats['refreshes'] += 1
+            return changed
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.refresh_interval):
+                try:
+                    self.refresh()
+                except Exception as _e:
+                    self.stats['errors'] += 1
+                    logger.warning(f'热点表 {self.table} 刷新失败，继续使用旧数据: {_e}')
+        finally:
+            if self._reader is not None:  # 在创建它的线程中关闭
+                self._reader.close()
+                self._reader = None
+
+    def start(self):
+        """启动后台刷新线程"""
+        if getattr(self.api, 'is_memory', False):
+            raise SqlModuleError('内存数据库无法建立独立连接，不能后台刷新；'
+                                 '请使用 refresh_interval=None 并手动 refresh()')
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f'sqllib-hot-{self.table}', daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """停止后台刷新(后台线程退出时关闭独立连接)"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return f'<HotTable {self.table} rows={len(self._rows)}>'
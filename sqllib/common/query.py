@@ -0,0 +1,267 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : query.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 16:00
+
+可组合的查询构造器
+
+    q = api.query('user').select('id', 'name').where(age__gte=P('age'), city='SZ').order_by('-id').limit(10)
+    stmt = q.compile()              # 编译一次: SQL文本 + 参数位置
+    stmt.sql, stmt.bind(age=18)     # 'SELECT `id`, `name` FROM `user` WHERE `age` >= ? AND `city` = ? ...', (18, 'SZ')
+    q.all(age=20)                   # 复用已编译的语句，只替换参数
+
+where() 的键支持后缀：__gt, __gte, __lt, __lte, __ne, __like, __in, __not_in, __isnull
+where_json() 对 JSON 列中的路径过滤，按方言生成 json_extract / JSON_EXTRACT / JSON_VALUE
+"""
+import re
+
+from .common import SQLiteJson
+from .error import SqlModuleError
+
+__all__ = ['P', 'Query', 'Statement', 'Dialect', 'DIALECTS']
+
+_IDENT = re.compile(r'\w+(\.\w+)?')
+
+
+class Dialect:
+    """数据库方言：参数占位符与标识符引用"""
+
+    def __init__(self, name, placeholder, quote, json_extract):
+        self.name = name
+        self.placeholder = placeholder
+        self._quote = quote
+        self._json_extract = json_extract
+
+    def quote(self, name: str) -> str:
+        """标识符加引号；`a.b` 逐段处理；表达式(如 COUNT(*))原样返回"""
+        if not _IDENT.fullmatch(name):
+            return name
+        return '.'.join(self._quote % _ for _ in name.split('.'))
+
+    def json_extract(self, column: str, path: str) -> str:
+        """取 JSON 列中 path 处的标量值(字符串不带引号)"""
+        return self._json_extract % (self.quote(column), SQLiteJson.path(path))
+
+    def __repr__(self):
+        return f'<Dialect {self.name}>'
+
+
+DIALECTS = {
+    'sqlite': Dialect('sqlite', '?', '`%s`', "json_extract(%s, '%s')"),
+    'mysql': Dialect('mysql', '%s', '`%s`', "JSON_UNQUOTE(JSON_EXTRACT(%s, '%s'))"),
+    'mssql': Dialect('mssql', '%s', '[%s]', "JSON_VALUE(%s, '%s')"),
+}
+
+_OPERATORS = {'eq': '=', 'ne': '<>', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=', 'like': 'LIKE'}
+
+
+class P:
+    """命名参数占位，执行时通过关键字参数传值"""
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f'P({self.name!r})'
+
+
+class Statement:
+    """编译完成的语句：SQL文本与参数模板，可以反复绑定新参数执行"""
+    __slots__ = ('sql', 'args', '_slots', 'api', 'table')
+
+    def __init__(self, sql, args, api=None, table=None):
+        self.sql = sql
+        self.args = tuple(args)
+        self._slots = [(index, _.name) for index, _ in enumerate(self.args) if isinstance(_, P)]
+        self.api = api
+        self.table = table  # 结果按该表的声明类型转换(api.convert_types 为True时)
+
+    @property
+    def param_names(self) -> list:
+        return [name for _, name in self._slots]
+
+    def bind(self, **params) -> tuple:
+        """按位置生成参数元组"""
+        if not self._slots:
+            return self.args
+        args = list(self.args)
+        try:
+            for index, name in self._slots:
+                args[index] = params[name]
+        except KeyError as _e:
+            raise SqlModuleError(f'缺少查询参数 {_e}，需要 {self.param_names}')
+        return tuple(args)
+
+    def execute(self, result_type=None, **params):
+        """执行并返回全部结果"""
+        if self.table is not None and getattr(self.api, 'convert_types', False):
+            return self.api.read_db(self.sql, self.bind(**params), result_type=result_type, table=self.table)
+        return self.api.read_db(self.sql, self.bind(**params), result_type=result_type)
+
+    def iter(self, batch_rows=1000, result_type=None, **params):
+        """流式执行，每次产出一批"""
+        return self.api.iter_db(self.sql, self.bind(**params), batch_rows=batch_rows, result_type=result_type)
+
+    def __repr__(self):
+        return f'<Statement {self.sql!r} {self.args}>'
+
+
+class Query:
+    """ SELECT 查询构造器。各方法修改自身并返回 self，修改后会使已编译的语句失效。
+
+    :param api: BaseSQLAPI 实例(提供 DIALECT、get_real_table_name、read_db)
+    :param table: 表名，前缀规则与 select() 相同
+    """
+
+    def __init__(self, api, table, dialect=None):
+        self.api = api
+        self.dialect = DIALECTS[dialect or api.DIALECT]
+        self.table = api.get_real_table_name(table)
+        self._columns = []
+        self._joins = []
+        self._where = []
+        self._group_by = []
+        self._having = []
+        self._order_by = []
+        self._limit = None
+        self._offset = None
+        self._compiled = None
+
+    def _changed(self):
+        self._compiled = None
+        return self
+
+    def select(self, *cols):
+        """查询的列，默认 *"""
+        self._columns.extend(cols)
+        return self._changed()
+
+    def join(self, table, on, how='INNER', alias=None):
+        """JOIN table ON on，on 为原样拼接的条件"""
+        _t = self.dialect.quote(self.api.get_real_table_name(table))
+        self._joins.append(f'{how.upper()} JOIN {_t}{f" AS {alias}" if alias else ""} ON {on}')
+        return self._changed()
+
+    def where(self, *raw, **conditions):
+        """ 追加 AND 条件
+
+        :param raw: 原样拼接的条件字符串(不绑定参数)
+        :param conditions: 列名[__操作符]=值；值可以是 P('name')
+        """
+        self._where.extend((_, ()) for _ in raw)
+        for key, value in conditions.items():
+            self._where.append(self._condition(key, value))
+        return self._changed()
+
+    def where_json(self, column, path, value, op='eq'):
+        """ JSON 列的过滤条件，在数据库中执行 json_extract 而不是在 Python 中逐行解析
+
+            q.where_json('TEST_JSON', 'a', 1)             # json_extract(`TEST_JSON`, '$.a') = ?
+            q.where_json('TEST_JSON', 'b.c', 5, op='gt')
+
+        :param op: 与 where() 的后缀相同: eq, ne, gt, gte, lt, lte, like, in, not_in, isnull
+        """
+        self._where.append(self._condition(f'__{op}', value, self.dialect.json_extract(column, path)))
+        return self._changed()
+
+    def _condition(self, key, value, expr=None):
+        col, _, op = key.partition('__')
+        op = op or 'eq'
+        col = expr or self.dialect.quote(col)
+        ph = self.dialect.placeholder
+        if op in ('in', 'not_in'):
+            if isinstance(value, P):
+                raise SqlModuleError('IN 列表的长度在编译时确定，请传入具体的值列表')
+            value = list(value)
+            if not value:  # 空 IN 列表
+                return ('1 = 0' if op == 'in' else '1 = 1'), ()
+            return f'{col} {"NOT " if op == "not_in" else ""}IN ({", ".join(ph for _ in value)})', value
+        if op == 'isnull':
+            return f'{col} IS {"" if value else "NOT "}NULL', ()
+        if op not in _OPERATORS:
+            raise SqlModuleError(f'不支持的操作符 {op}，可选 {list(_OPERATORS) + ["in", "not_in", "isnull"]}')
+        if value is None and op in ('eq', 'ne'):
+            return f'{col} IS {"" if op == "eq" else "NOT "}NULL', ()
+        return f'{col} {_OPERATORS[op]} {ph}', (value,)
+
+    def group_by(self, *cols):
+        self._group_by.extend(cols)
+        return self._changed()
+
+    def having(self, *raw):
+        """原样拼接的 HAVING 条件"""
+        self._having.extend(raw)
+        return self._changed()
+
+    def order_by(self, *cols):
+        """'col' 升序，'-col' 降序"""
+        self._order_by.extend(cols)
+        return self._changed()
+
+    def limit(self, limit, offset=None):
+        self._limit = int(limit)
+        if offset is not None:
+            self._offset = int(offset)
+        return self._changed()
+
+    def offset(self, offset):
+        self._offset = int(offset)
+        return self._changed()
+
+    def compile(self) -> Statement:
+        """编译为 Statement，结果缓存在查询对象上"""
+        if self._compiled is not None:
+            return self._compiled
+        q = self.dialect.quote
+        args = []
+        cols = ', '.join(q(_) for _ in self._columns) or '*'
+        top = f'TOP {self._limit} ' if self.dialect.name == 'mssql' and self._limit is not None \
+            and not self._offset else ''
+        sql = f'SELECT {top}{cols} FROM {q(self.table)}'
+        if self._joins:
+            sql += ' ' + ' '.join(self._joins)
+        if self._where:
+            sql += ' WHERE ' + ' AND '.join(_c for _c, _ in self._where)
+            [args.extend(_a) for _, _a in self._where]
+        if self._group_by:
+            sql += ' GROUP BY ' + ', '.join(q(_) for _ in self._group_by)
+        if self._having:
+            sql += ' HAVING ' + ' AND '.join(self._having)
+        if self._order_by:
+            sql += ' ORDER BY ' + ', '.join(f'{q(_[1:])} DESC' if _.startswith('-') else f'{q(_)} ASC'
+                                            for _ in self._order_by)
+        if self.dialect.name == 'mssql':
+            if self._offset:  # OFFSET ... FETCH 需要 ORDER BY
+                sql += '' if self._order_by else ' ORDER BY (SELECT NULL)'
+                sql += f' OFFSET {self._offset} ROWS'
+                sql += f' FETCH NEXT {self._limit} ROWS ONLY' if self._limit is not None else ''
+        else:
+            if self._limit is not None:
+                sql += f' LIMIT {self._limit}'
+            if self._offset:
+                sql += f' OFFSET {self._offset}' if self._limit is not None else \
+                    f' LIMIT {-1 if self.dialect.name == "sqlite" else 18446744073709551615} OFFSET {self._offset}'
+        self._compiled = Statement(sql, args, api=self.api, table=self.table)
+        return self._compiled
+
+    @property
+    def sql(self) -> str:
+        return self.compile().sql
+
+    def all(self, result_type=None, **params):
+        """执行查询，params 为 P() 占位的取值"""
+        return self.compile().execute(result_type=result_type, **params)
+
+    def first(self, result_type=None, **params):
+        """返回第一行，没有结果时返回 None"""
+        rows = self.compile().execute(result_type=result_type, **params)
+        return rows[0] if rows else None
+
+    def iter(self, batch_rows=1000, result_type=None, **params):
+        return self.compile().iter(batch_rows=batch_rows, result_type=result_type, **params)
+
+    def __repr__(self):
+        return f'<Query {self.sql!r}>'
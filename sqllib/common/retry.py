@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : retry.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 22:10
+
+连接故障的重试与熔断
+
+    api = MySqlAPI(..., retry=RetryPolicy(max_attempts=5, base_delay=0.2),
+                   circuit_breaker=CircuitBreaker(failure_threshold=5, reset_timeout=10))
+    api.select(...)                 # 读：连接错误时重连，指数退避(带抖动)后重试
+    with api.idempotent():          # 写：只有明确标记为幂等的写入才会重试
+        api.update(...)
+
+    RetryPolicy: 只描述"重试几次、等多久"，是否可重试由后端判断(连接类错误)
+    CircuitBreaker: 连续 failure_threshold 次连接失败后打开，reset_timeout 秒内的请求直接抛出 SqlCircuitOpenError；
+                    之后放行一个试探请求(半开)，成功则关闭，失败则再次打开
+"""
+import random
+import threading
+import time
+
+from .error import SqlCircuitOpenError
+
+__all__ = ['RetryPolicy', 'CircuitBreaker']
+
+
+class RetryPolicy:
+    """ 重试策略
+
+    :param max_attempts: 总尝试次数(含第一次)
+    :param base_delay: 第一次重试前的基准等待(秒)，之后每次翻倍
+    :param max_delay: 单次等待的上限(秒)
+    :param jitter: 为True时等待时间在 [0, 退避时间] 内随机(full jitter)，避免大量客户端同时重连
+    :param retry_writes: 为True时所有写入都视为幂等并重试；默认只重试 idempotent() 中的写入
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.1, max_delay=5.0, jitter=True, retry_writes=False):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_writes = retry_writes
+
+    def delay(self, retry: int) -> float:
+        """第 retry 次重试(从1开始)前的等待时间"""
+        backoff = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        return random.uniform(0, backoff) if self.jitter else backoff
+
+    def __repr__(self):
+        return f'<RetryPolicy attempts={self.max_attempts} base={self.base_delay} max={self.max_delay}>'
+
+
+class CircuitBreaker:
+    """ 熔断器，线程安全
+
+    :param failure_threshold: 连续失败多少次后打开
+    :param reset_timeout: 打开后多少秒进入半开状态
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+        self.metrics = {'successes': 0, 'failures': 0, 'opened': 0, 'rejected': 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current()
+
+    def _current(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state, self._trial = self.HALF_OPEN, False
+        return self._state
+
+    def before(self):
+        """请求前调用：打开状态(或半开时已有试探请求)直接抛出 SqlCircuitOpenError"""
+        with self._lock:
+            state = self._current()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return
+            self.metrics['rejected'] += 1
+            raise SqlCircuitOpenError(f'熔断器已打开(连续失败 {self._failures} 次)，'
+                                      f'{max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)):.1f} 秒后重试')
+
+    def success(self):
+        with self._lock:
+            self.metrics['successes'] += 1
+            self._state, self._failures, self._trial = self.CLOSED, 0, False
+
+    def failure(self):
+        with self._lock:
+            self.metrics['failures'] += 1
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.metrics['opened'] += 1
+                self._state, self._opened_at, self._trial = self.OPEN, time.monotonic(), False
+
+    def reset(self):
+        with self._lock:
+            self._state, self._failures, self._trial = self.CLOSED, 0, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.metrics, state=self._current(), consecutive_failures=self._failures)
+
+    def __repr__(self):
+        return f'<CircuitBreaker {self.state}>'
@@ -0,0 +1,289 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : sharding.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 21:30
+
+水平分片：一张逻辑表按分片键分布在多个后端实例上
+
+    shards = [MySqlAPI(...), MySqlAPI(...), SQLiteAPI('s2.db', check_same_thread=False)]
+    api = ShardedAPI(shards, shard_key={'user': 'uid'})
+    api.insert('user', uid=(1, 2, 3), name=('a', 'b', 'c'))     # 按 uid 分组写入各分片
+    api.update('user', 'uid', 2, name='B')                     # 只在 uid=2 所在的分片执行
+    api.select('user', '*', ORDER='uid DESC', LIMIT=10)        # 各分片并发查询，合并、排序、截取
+
+    1. insert / update / delete 按分片键路由；条件不是分片键时广播到所有分片，返回影响行数之和
+    2. select 在所有分片并发执行：各分片取前 LIMIT+OFFSET 行，合并后按 ORDER 排序再截取
+    3. get_many() / batch_loader() 的键是分片键时每个键只查询其所在的分片，否则在所有分片查询后合并
+    4. 不支持 query() 与 aggregate()：跨分片的排序、分页与聚合(如 AVG)不能由各分片的结果直接合并，
+       请在各后端(api.backends)上分别执行后自行合并
+    5. 建表、删表、修改表结构广播到所有分片
+    6. 每个分片由一个专属线程访问(连接不会被多个线程同时使用)；
+       SQLite 分片需要以 check_same_thread=False 创建
+"""
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+from .base_sql import BaseSQLAPI
+from .error import SqlModuleError, SqlShardError
+
+__all__ = ['ShardedAPI', 'hash_shard']
+
+
+def hash_shard(value, shards: int) -> int:
+    """默认的分片函数：crc32(str(value)) % shards，跨进程、跨重启稳定"""
+    return zlib.crc32(str(value).encode()) % shards
+
+
+def _parse_order(order) -> list:
+    """'a DESC, `b`' -> [('a', True), ('b', False)]"""
+    result = []
+    for _item in (order or '').split(','):
+        _p = _item.split()
+        if _p:
+            result.append((_p[0].strip('`').split('.')[-1], len(_p) > 1 and _p[1].upper() == 'DESC'))
+    return result
+
+
+def _parse_limit(limit, offset):
+    """LIMIT 支持 10 或 MySQL 的 '5, 10'(offset, count) -> (limit, offset)"""
+    offset = int(offset or 0)
+    if limit is None:
+        return None, offset
+    if isinstance(limit, str) and ',' in limit:
+        _o, _l = limit.split(',')
+        return int(_l), int(_o)
+    return int(limit), offset
+
+
+class ShardedAPI(BaseSQLAPI):
+    """ 多个后端实例上的分片路由
+
+    :param backends: BaseSQLAPI 实例列表，顺序即分片编号，扩容后需要迁移数据
+    :param shard_key: 分片键的列名；或 {表名: 列名} 为每张表指定
+    :param shard_func: shard_func(value, len(backends)) -> 分片编号，默认 hash_shard
+    """
+
+    def __init__(self, backends, shard_key, shard_func=None):
+        if not backends:
+            raise SqlModuleError('ShardedAPI 至少需要一个后端')
+        self.backends = list(backends)
+        self.shard_key = shard_key
+        self.shard_func = shard_func or hash_shard
+        self.SQL_DB = getattr(self.backends[0], 'SQL_DB', None)
+        dialects = {_.DIALECT for _ in self.backends}
+        self.DIALECT = dialects.pop() if len(dialects) == 1 else None
+        self.PLACEHOLDER = self.backends[0].PLACEHOLDER
+        self._executors = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'sqllib-shard-{_i}')
+                           for _i in range(len(self.backends))]
+
+    # 路由
+    def key_of(self, table):
+        """表的分片键"""
+        if isinstance(self.shard_key, dict):
+            try:
+                return self.shard_key[table]
+            except KeyError:
+                raise SqlShardError(f'表 {table} 没有配置分片键，已配置 {list(self.shard_key)}')
+        return self.shard_key
+
+    def shard_index(self, value) -> int:
+        index = self.shard_func(value, len(self.backends))
+        if not 0 <= index < len(self.backends):
+            raise SqlShardError(f'分片函数返回了无效的编号 {index} (共 {len(self.backends)} 个分片)')
+        return index
+
+    def shard(self, value):
+        """分片键取值 value 所在的后端"""
+        return self.backends[self.shard_index(value)]
+
+    def _call(self, index, func, *args, **kwargs):
+        """在分片专属的线程中执行 func(backend, ...)"""
+        return self._executors[index].submit(func, self.backends[index], *args, **kwargs).result()
+
+    def _gather(self, func, *args, indexes=None, **kwargs) -> list:
+        """在多个分片上并发执行 func(backend, ...)，按分片顺序返回结果"""
+        indexes = range(len(self.backends)) if indexes is None else indexes
+        futures = [self._executors[_i].submit(func, self.backends[_i], *args, **kwargs) for _i in indexes]
+        return [_f.result() for _f in futures]
+
+    @staticmethod
+    def _sum(results):
+        return sum(_ or 0 for _ in results if isinstance(_, int))
+
+    # 写入
+    def _insert(self, table, ignore_repeat=False, **kwargs):
+        """按分片键把行分组，每个分片一次批量写入"""
+        key = self.key_of(table)
+        if key not in kwargs:
+            raise SqlShardError(f'INSERT {table} 缺少分片键 {key}')
+        values = kwargs[key]
+        if not isinstance(values, (list, tuple)):
+            return self._call(self.shard_index(values), _insert, table, ignore_repeat, kwargs)
+        groups = {}
+        for _row, _v in enumerate(values):
+            groups.setdefault(self.shard_index(_v), []).append(_row)
+        futures = [self._executors[_i].submit(_insert, self.backends[_i], table, ignore_repeat,
+                                              {k: [v[_r] for _r in rows] for k, v in kwargs.items()})
+                   for _i, rows in groups.items()]
+        return self._sum(_f.result() for _f in futures)
+
+    def _update(self, table, where_key, where_value, **kwargs):
+        key = self.key_of(table)
+        if key in kwargs:
+            raise SqlShardError(f'不能通过 UPDATE 修改分片键 {key}，请删除后重新插入')
+        if where_key == key:
+            return self._call(self.shard_index(where_value), _update, table, where_key, where_value, kwargs)
+        return self._sum(self._gather(_update, table, where_key, where_value, kwargs))
+
+    def _delete(self, table, where_key, where_value, **kwargs):
+        if where_key == self.key_of(table):
+            return self._call(self.shard_index(where_value), _delete, table, where_key, where_value, kwargs)
+        return self._sum(self._gather(_delete, table, where_key, where_value, kwargs))
+
+    # 查询
+    def _select(self, table, cols, result_type=None, **kwargs):
+        """ 各分片并发查询后合并
+
+        ORDER 中的列必须出现在查询结果中(列名或别名)。
+        """
+        opts = {k.upper(): v for k, v in kwargs.items()}
+        limit, offset = _parse_limit(opts.pop('LIMIT', None), opts.pop('OFFSET', None))
+        order = _parse_order(opts.get('ORDER'))
+        if limit is not None:
+            opts['LIMIT'] = limit + offset  # 每个分片都可能贡献全部的前 LIMIT+OFFSET 行
+        _type = dict if order else result_type
+        rows = list(chain.from_iterable(self._gather(_select, table, cols, _type, opts)))
+        if order:
+            missing = [_c for _c, _ in order if rows and _c not in rows[0]]
+            if missing:
+                raise SqlShardError(f'ORDER 的列 {missing} 不在查询结果中，无法跨分片排序')
+            for col, desc in reversed(order):  # 稳定排序，从次要键到主要键；NULL 视为最小
+                rows.sort(key=lambda _r: (_r[col] is not None, _r[col]), reverse=desc)
+        rows = rows[offset:] if limit is None else rows[offset:offset + limit]
+        if order and result_type is not dict:
+            rows = [tuple(_.values()) for _ in rows]
+        return rows
+
+    def query(self, table):
+        raise SqlModuleError('ShardedAPI 不支持 query()，跨分片的 ORDER BY / LIMIT 请使用 select()')
+
+    def aggregate(self, table, *args, **kwargs):
+        raise SqlModuleError('ShardedAPI 不支持 aggregate()，请在各分片(api.backends)上分别聚合后合并')
+
+    def get_many(self, table, key, values, cols=None, result_type=None, workers=4) -> dict:
+        """按键批量读取：key 是分片键时每个键只查询其所在的分片，否则在所有分片查询全部键后合并"""
+        values = list(dict.fromkeys(values))
+        if not values:
+            return {}
+        if key == (self.shard_key.get(table) if isinstance(self.shard_key, dict) else self.shard_key):
+            groups = {}
+            for _v in values:
+                groups.setdefault(self.shard_index(_v), []).append(_v)
+            futures = [self._executors[_i].submit(_get_many, self.backends[_i], table, key, _keys, cols, result_type,
+                                                  workers) for _i, _keys in groups.items()]
+            results = [_f.result() for _f in futures]
+        else:
+            results = self._gather(_get_many, table, key, values, cols, result_type, workers)
+        merged = {}
+        for _r in results:
+            merged.update(_r)
+        return merged
+
+    def _read_db(self, command, args=None, result_type=None, table=None):
+        """在所有分片执行查询，按分片顺序拼接结果"""
+        self._notify_read(command, args)
+        _kw = {} if table is None else {'table': table}
+        return list(chain.from_iterable(
+            self._gather(lambda _b: _b.read_db(command, args, result_type=result_type, **_kw))))
+
+    def _iter_db(self, command, args=None, batch_rows=1000, result_type=None):
+        """依次流式读取每个分片；游标在分片专属的线程中步进"""
+        for _i in range(len(self.backends)):
+            _it = self._call(_i, lambda _b: iter(_b.iter_db(command, args, batch_rows, result_type)))
+            while True:
+                rows = self._call(_i, lambda _b: next(_it, None))
+                if rows is None:
+                    break
+                yield rows
+
+    # 写入(原始SQL)：广播
+    def _write_db(self, command, args=None):
+        return self._sum(self._gather(lambda _b: _b.write_db(command, args)))
+
+    def _write_affair(self, command, args):
+        return self._sum(self._gather(lambda _b: _b.write_rows(command, args)))
+
+    # 表结构：广播到所有分片
+    def create_table(self, table_name, cmd: (str, tuple), exists_ok=False, table_args='', *args):
+        """在每个分片上建表(各自处理方言兼容)，返回各分片的结果"""
+        return self._gather(lambda _b: _b.create_table(table_name, cmd, exists_ok, table_args))
+
+    def _create_table(self, table_name, cmd, exists_ok, table_args, *args):
+        return self.create_table(table_name, cmd, exists_ok, table_args)
+
+    def create_table_compatible(self, cmd):
+        return cmd
+
+    def _drop(self, option, name):
+        if option.upper() == 'TABLE':
+            return self._gather(lambda _b: _b.drop_table(name))
+        return self._gather(lambda _b: _b.drop_db(name))
+
+    def _alter(self, table, command: str):
+        return self._gather(lambda _b: _b.alter_table(table, command))
+
+    # 元数据：各分片的表结构相同，取第一个分片
+    def get_real_table_name(self, name):
+        return name  # 前缀由各后端自己处理
+
+    def tables_name(self):
+        return self._call(0, lambda _b: _b.tables_name())
+
+    def show_tables(self, *args, **kwargs):
+        return self._call(0, lambda _b: _b.show_tables(*args, **kwargs))
+
+    def show_dbs(self, *args, **kwargs):
+        return self._call(0, lambda _b: _b.show_dbs(*args, **kwargs))
+
+    def columns_name(self, table):
+        return self._call(0, lambda _b: _b.columns_name(table))
+
+    def columns_info(self, table) -> list:
+        return self._call(0, lambda _b: _b.columns_info(table))
+
+    def range_key(self, table):
+        return None  # 主键区间在各分片中重叠，不能按区间切分
+
+    def fork(self, read_only=False):
+        return type(self)([self._call(_i, lambda _b: _b.fork(read_only)) for _i in range(len(self.backends))],
+                          self.shard_key, self.shard_func)
+
+    def close(self):
+        try:
+            self._gather(lambda _b: _b.close())
+        finally:
+            for _e in self._executors:
+                _e.shutdown(wait=False)
+
+
+def _insert(backend, table, ignore_repeat, values):
+    return backend.insert(table, ignore_repeat=ignore_repeat, **values)
+
+
+def _update(backend, table, where_key, where_value, values):
+    return backend.update(table, where_key, where_value, **values)
+
+
+def _delete(backend, table, where_key, where_value, values):
+    return backend.delete(table, where_key, where_value, **values)
+
+
+def _get_many(backend, table, key, values, cols, result_type, workers):
+    return backend.get_many(table, key, values, cols=cols, result_type=result_type, workers=workers)
+
+
+def _select(backend, table, cols, result_type, opts):
+    return backend.select(table, cols, result_type=result_type, **opts)
@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : sync.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 01:40
+
+按高水位列的增量同步：不依赖 binlog，只拉取水位之后的行并在目标库 upsert
+
+    incremental_sync(mysql_api, sqlite_api, 'orders', watermark_col='updated_at', key='id')
+    # 第一次为全量复制，之后只复制 updated_at >= 上次水位 的行
+
+    1. 水位保存在目标库的 sqllib_sync_state 表中(以 源表->目标表 为名)，每写入一批更新一次，中断后从最近的批次继续
+    2. 源表按 (水位列, 键) 排序，通过 iter_db() 流式读取(MySQL 为服务端游标)
+    3. 使用 >= 上次水位 而不是 >：与上次最后一行水位相同、但提交较晚的行不会丢失；重复的行由 upsert 覆盖
+    4. 目标表需要以 key 为主键或唯一索引；源表的删除不会同步(可以改为软删除标记并同步该列)
+    5. 水位列为 NULL 的行只在第一次(全量)同步时复制
+"""
+import logging
+from datetime import datetime
+
+from .error import SqlModuleError
+from .transfer import translate_schema
+
+logger = logging.getLogger('sqllib.sync')
+
+__all__ = ['incremental_sync', 'upsert_sql', 'sync_state', 'STATE_TABLE']
+
+STATE_TABLE = 'sqllib_sync_state'
+
+
+def upsert_sql(api, table, cols, keys) -> str:
+    """ 按 keys 冲突时更新其余列的插入语句，参数顺序与 cols 相同
+
+    SQLite: ON CONFLICT DO UPDATE (3.24+)；MySQL: ON DUPLICATE KEY UPDATE；MSSQL: MERGE
+    """
+    table = api.get_real_table_name(table)
+    values = [_ for _ in cols if _ not in keys] or list(keys)
+    ph = ', '.join(api.PLACEHOLDER for _ in cols)
+    if api.DIALECT == 'sqlite':
+        return (f'INSERT INTO `{table}` ({", ".join(f"`{_}`" for _ in cols)}) VALUES ({ph}) '
+                f'ON CONFLICT ({", ".join(f"`{_}`" for _ in keys)}) DO UPDATE SET '
+                + ', '.join(f'`{_}` = excluded.`{_}`' for _ in values))
+    if api.DIALECT == 'mysql':
+        return (f'INSERT INTO `{table}` ({", ".join(f"`{_}`" for _ in cols)}) VALUES ({ph}) '
+                f'ON DUPLICATE KEY UPDATE ' + ', '.join(f'`{_}` = VALUES(`{_}`)' for _ in values))
+    if api.DIALECT == 'mssql':
+        return (f'MERGE INTO [{table}] AS d USING (VALUES ({ph})) AS s ({", ".join(f"[{_}]" for _ in cols)}) '
+                f'ON {" AND ".join(f"d.[{_}] = s.[{_}]" for _ in keys)} '
+                f'WHEN MATCHED THEN UPDATE SET {", ".join(f"[{_}] = s.[{_}]" for _ in values)} '
+                f'WHEN NOT MATCHED THEN INSERT ({", ".join(f"[{_}]" for _ in cols)}) '
+                f'VALUES ({", ".join(f"s.[{_}]" for _ in cols)});')
+    raise SqlModuleError(f'{type(api).__name__} 不支持 upsert')
+
+
+def _state_table(dst):
+    dst.create_table(STATE_TABLE, '`name` VARCHAR(255) NOT NULL PRIMARY KEY, `watermark` VARCHAR(64), '
+                                  '`rows` BIGINT, `synced_at` VARCHAR(32)', exists_ok=True)
+    return dst.get_real_table_name(STATE_TABLE)
+
+
+def sync_state(dst, name) -> dict:
+    """目标库中保存的同步状态 {'name', 'watermark', 'rows', 'synced_at'}，没有时返回 None"""
+    rows = dst.read_db(f'SELECT `name`, `watermark`, `rows`, `synced_at` FROM `{_state_table(dst)}` '
+                       f'WHERE `name` = {dst.PLACEHOLDER}', (name,), result_type=dict)
+    return rows[0] if rows else None
+
+
+def incremental_sync(src, dst, table, watermark_col='updated_at', key='id', batch_rows=5000, dst_table=None,
+                     create=True, cols=None) -> int:
+    """ 把 src.table 中水位之后的行 upsert 到 dst，见模块说明
+
+    :param watermark_col: 单调递增的列，通常是更新时间或自增版本号
+    :param key: 主键列名或列名列表
+    :param dst_table: 目标表名，默认与源表同名
+    :param create: 目标表不存在时按源表结构创建
+    :param cols: 同步的列，默认全部列(必须包含水位列与键)
+    :return: 本次同步的行数
+    """
+    table = src.get_real_table_name(table)
+    dst_table = dst.get_real_table_name(dst_table or table)
+    keys = [key] if isinstance(key, str) else list(key)
+    cols = list(cols or src.columns_name(table))
+    missing = [_ for _ in [watermark_col, *keys] if _ not in cols]
+    if missing:
+        raise SqlModuleError(f'同步的列中缺少 {missing}')
+    if create:
+        dst.create_table(dst_table, translate_schema(src, table), exists_ok=True)
+
+    name = f'{table}->{dst_table}'
+    state = sync_state(dst, name)
+    watermark = state['watermark'] if state else None
+    total = (state['rows'] or 0) if state else 0
+    save = upsert_sql(dst, STATE_TABLE, ['name', 'watermark', 'rows', 'synced_at'], ['name'])
+    upsert = upsert_sql(dst, dst_table, cols, keys)
+
+    ph = src.PLACEHOLDER
+    select = (f'SELECT {", ".join(f"`{_}`" for _ in cols)} FROM `{table}`'
+              + (f' WHERE `{watermark_col}` >= {ph}' if watermark is not None else '')
+              + f' ORDER BY `{watermark_col}`, {", ".join(f"`{_}`" for _ in keys)}')
+    index = cols.index(watermark_col)
+    synced = 0
+    for rows in src.iter_db(select, None if watermark is None else (watermark,), batch_rows=batch_rows):
+        dst.write_rows(upsert, rows)
+        synced += len(rows)
+        last = next((_r[index] for _r in reversed(rows) if _r[index] is not None), None)
+        if last is not None:
+            watermark = str(last)
+        dst.write_db(save, (name, watermark, total + synced, datetime.now().isoformat(' ', 'seconds')))
+    logger.debug(f'增量同步 {name}: {synced} rows, watermark={watermark}')
+    return synced
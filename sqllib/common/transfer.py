@@ -0,0 +1,352 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : transfer.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 10:20
+
+数据表的导入导出
+
+    export_table(): 按主键区间切分，多连接并发读取，流式写入 CSV / JSONL
+    import_file():  惰性解析 CSV / JSONL，按列类型转换后分批事务写入，支持断点续传
+    copy_table():   在两个后端之间复制数据表，读写分别在两个线程上流水线执行
+"""
+import base64
+import csv
+import json
+import logging
+import os
+import queue
+import threading
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from .error import SqlKeyNameError, SqlModuleError, SqllibError
+
+logger = logging.getLogger('sqllib.transfer')
+
+__all__ = ['export_table', 'import_file', 'copy_table', 'FORMATS']
+
+FORMATS = ('csv', 'jsonl')
+CSV_NULL = '\\N'  # CSV 中 NULL 的写法(同 MySQL LOAD DATA)，与空字符串区分
+
+
+def _strip_quote(name: str) -> str:
+    """`col` -> col"""
+    return name.strip().strip('`[]"')
+
+
+def _to_text(value):
+    """把数据库返回的值转换为可写入文件的基础类型"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode()
+    if isinstance(value, (datetime, date, time, timedelta, Decimal)):
+        return str(value)
+    return value
+
+
+def split_ranges(api, table, key, chunk_rows):
+    """按整数主键把表切分为 [start, end) 区间
+
+    区间宽度按 (最大值 - 最小值) / 行数 估算，保证主键稀疏时每个区间仍约有 chunk_rows 行。
+    """
+    _min, _max, _count = api.read_db(f'SELECT MIN({key}), MAX({key}), COUNT(*) FROM `{table}`')[0]
+    if not _count:
+        return []
+    span = _max - _min + 1
+    width = max(chunk_rows, -(-span * chunk_rows // _count))  # 向上取整
+    logger.debug(f'{table}: {key} in [{_min}, {_max}], {_count} rows, range width {width}')
+    return [(start, min(start + width, _max + 1)) for start in range(_min, _max + 1, width)]
+
+
+def _read_range(api, table, cols, key, _range, read_only=True):
+    """在独立连接中读取一个区间"""
+    worker = api.fork(read_only=read_only)
+    try:
+        ph = api.PLACEHOLDER
+        return worker.read_db(f'SELECT {", ".join(cols)} FROM `{table}` '
+                              f'WHERE {key} >= {ph} AND {key} < {ph} ORDER BY {key}', _range)
+    finally:
+        worker.close()
+
+
+def _iter_chunks(api, table, cols, chunk_rows, workers):
+    """按主键区间顺序产出数据块"""
+    key = api.range_key(table)
+    if key is None:
+        logger.info(f'{table} 没有可切分的整数主键，退回单连接流式读取')
+        yield from api.iter_db(f'SELECT {", ".join(cols)} FROM `{table}`', batch_rows=chunk_rows)
+        return
+
+    ranges = split_ranges(api, table, key, chunk_rows)
+    if getattr(api, 'is_memory', False):  # 内存数据库只有当前这一个连接
+        workers = 1
+    if workers <= 1:
+        ph = api.PLACEHOLDER
+        for _range in ranges:
+            yield api.read_db(f'SELECT {", ".join(cols)} FROM `{table}` '
+                              f'WHERE {key} >= {ph} AND {key} < {ph} ORDER BY {key}', _range)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sqllib-export') as pool:
+        pending = []
+        for _range in ranges:  # 滑动窗口：最多 workers 个区间在途，保证顺序与内存上限
+            pending.append(pool.submit(_read_range, api, table, cols, key, _range))
+            if len(pending) > workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def export_table(api, table, path, format='csv', chunk_rows=10000, workers=1, cols=None):
+    """导出数据表，详见 BaseSQLAPI.export_table()"""
+    if format not in FORMATS:
+        raise SqlModuleError(f'不支持的导出格式: {format}，可选 {FORMATS}')
+    table = api.get_real_table_name(table)
+    cols = list(cols) if cols else [f'`{_}`' for _ in api.columns_name(table)]
+    names = [_strip_quote(_) for _ in cols]
+
+    total = 0
+    with open(path, 'w', encoding='utf8', newline='') as fp:
+        if format == 'csv':
+            writer = csv.writer(fp)
+            writer.writerow(names)
+        for rows in _iter_chunks(api, table, cols, chunk_rows, workers):
+            if format == 'csv':
+                writer.writerows([[CSV_NULL if _v is None else _to_text(_v) for _v in row] for row in rows])
+            else:
+                fp.writelines(json.dumps(dict(zip(names, map(_to_text, row))), ensure_ascii=False) + '\n'
+                              for row in rows)
+            total += len(rows)
+    logger.debug(f'导出 {table} -> {path}: {total} rows')
+    return total
+
+
+def _from_text(declared: str):
+    """根据列的声明类型返回一个文本 -> Python 值的转换函数"""
+    declared = declared.upper()
+    if 'INT' in declared:
+        _conv = int
+    elif any(_ in declared for _ in ('DOUBLE', 'FLOAT', 'REAL')):
+        _conv = float
+    elif any(_ in declared for _ in ('DECIMAL', 'NUMERIC')):
+        def _conv(value):
+            return Decimal(str(value))
+    elif any(_ in declared for _ in ('BLOB', 'BINARY')):
+        _conv = base64.b64decode
+    elif 'JSON' in declared:
+        def _conv(value):
+            return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    else:  # 文本与日期时间，数据库均可直接接受字符串
+        return lambda value: value
+
+    def _convert(value):
+        if value is None or value == '':  # 数值等类型的空字段(旧版导出的 CSV 以空字段表示 NULL)
+            return None
+        return _conv(value)
+    return _convert
+
+
+def _iter_records(path, format, columns):
+    """惰性读取文件，产出 (columns, 记录迭代器)"""
+    fp = open(path, encoding='utf8', newline='')
+    if format == 'csv':
+        reader = csv.reader(fp)
+        header = next(reader, [])
+        columns = list(columns or header)
+        missing = [_ for _ in columns if _ not in header]
+        if missing:
+            fp.close()
+            raise SqlKeyNameError(f'{missing} NOT in the header of {path}; (ALL Columns {header})')
+        index = [header.index(_) for _ in columns]
+        records = ([None if row[_] == CSV_NULL else row[_] for _ in index] for row in reader)
+    else:
+        lines = (json.loads(_) for _ in fp if _.strip())
+        first = next(lines, None)
+        if first is None:
+            columns, records = list(columns or []), iter(())
+        else:
+            columns = list(columns or first.keys())
+            records = ([_.get(c) for c in columns] for _ in _chain_first(first, lines))
+    return fp, columns, records
+
+
+def _chain_first(first, rest):
+    yield first
+    yield from rest
+
+
+def _read_checkpoint(checkpoint, path):
+    """已导入的行数；检查点记录的不是 path 时抛出 SqlModuleError"""
+    if checkpoint and os.path.exists(checkpoint):
+        with open(checkpoint, encoding='utf8') as fp:
+            state = json.load(fp)
+        if os.path.abspath(state.get('file', '')) != os.path.abspath(path):
+            raise SqlModuleError(f'检查点 {checkpoint} 属于文件 {state.get("file")}，不是 {path}；'
+                                 f'确认无误后删除检查点重新导入')
+        return int(state['rows'])
+    return 0
+
+
+def _write_checkpoint(checkpoint, path, done):
+    """先写临时文件再替换，避免中断时留下损坏的检查点"""
+    _tmp = f'{checkpoint}.tmp'
+    with open(_tmp, 'w', encoding='utf8') as fp:
+        json.dump({'file': os.path.abspath(path), 'rows': done}, fp)
+    os.replace(_tmp, checkpoint)
+
+
+def import_file(api, table, path, format='csv', columns=None, batch_rows=5000, progress=None, checkpoint=None):
+    """导入文件，详见 BaseSQLAPI.import_file()"""
+    if format not in FORMATS:
+        raise SqlModuleError(f'不支持的导入格式: {format}，可选 {FORMATS}')
+    table = api.get_real_table_name(table)
+    types = api.column_types(table)
+
+    fp, columns, records = _iter_records(path, format, columns)
+    try:
+        unknown = [_ for _ in columns if _ not in types]
+        if unknown:
+            raise SqlKeyNameError(f'{unknown} NOT in this Table: {table}; (ALL Columns {list(types)})')
+        plan = [_from_text(types[_]) for _ in columns]
+        ph = api.PLACEHOLDER
+        command = (f'INSERT INTO `{table}` ( {", ".join(f"`{_}`" for _ in columns)} ) '
+                   f'VALUES ( {", ".join(ph for _ in columns)} )')
+
+        done = _read_checkpoint(checkpoint, path)
+        if done:
+            logger.info(f'从检查点 {checkpoint} 恢复，跳过已导入的 {done} 行')
+            for _ in islice(records, done):
+                pass
+        while True:
+            batch = [[_c(_v) for _c, _v in zip(plan, record)] for record in islice(records, batch_rows)]
+            if not batch:
+                break
+            api.write_rows(command, batch)  # 每批一个事务
+            done += len(batch)
+            if checkpoint:
+                _write_checkpoint(checkpoint, path, done)
+            if progress is not None:
+                progress(done)
+    finally:
+        fp.close()
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    logger.debug(f'导入 {path} -> {table}: {done} rows')
+    return done
+
+
+# SQLite 的类型亲和性 -> MySQL 类型；其余类型名两边通用
+_MYSQL_TYPES = {'': 'LONGTEXT', 'TEXT': 'LONGTEXT', 'INTEGER': 'BIGINT', 'REAL': 'DOUBLE',
+                'BLOB': 'LONGBLOB', 'NUMERIC': 'DECIMAL(65, 10)'}
+# 主键 / 索引列：MySQL 的 TEXT / BLOB 列不能不带前缀长度建索引(错误 1170)
+_MYSQL_KEY_TYPES = {'': 'VARCHAR(255)', 'TEXT': 'VARCHAR(255)', 'BLOB': 'VARBINARY(255)'}
+
+
+def _key_columns(src, table) -> set:
+    """源表主键与索引中的列"""
+    try:
+        indexes = src.list_indexes(table)
+    except SqllibError:
+        return set()
+    return {_c for _i in indexes for _c in _i['columns']}
+
+
+def translate_schema(src, table) -> str:
+    """由源表的列信息生成 MySQL 风格的字段定义，交给目标库的 create_table_compatible() 转换"""
+    info = src.columns_info(table)
+    pks = [_['name'] for _ in info if _['pk']]
+    keys = set(pks) | _key_columns(src, table)
+
+    def _type(col):
+        _t = col['type'].upper()
+        if col['name'] in keys and _t in _MYSQL_KEY_TYPES:
+            return _MYSQL_KEY_TYPES[_t]
+        return _MYSQL_TYPES.get(_t, col['type'])
+
+    _cols = [f"`{_['name']}` {_type(_)}{' NOT NULL' if _['notnull'] else ''}" for _ in info]
+    if pks:
+        _cols.append(f'PRIMARY KEY ({", ".join(f"`{_}`" for _ in pks)})')
+    return ', '.join(_cols)
+
+
+_DONE = object()
+
+
+def copy_table(src, dst, table, batch_rows=5000, dst_table=None, create=True, queue_size=4):
+    """ 在两个后端(MySqlAPI / SQLiteAPI)之间复制一张数据表。
+
+    读线程通过 iter_db()(MySQL 为服务端游标)流式读取源表，经有界队列交给当前线程，
+    以 write_rows()(executemany，MySQL 会合并为多行 INSERT)分批事务写入目标表；
+    内存中最多保留 queue_size + 2 批数据。
+
+    :param src: 源 API
+    :param dst: 目标 API
+    :param table: 源表名
+    :param batch_rows: 每批行数
+    :param dst_table: 目标表名，默认与源表同名(目标库的前缀规则仍然生效)
+    :param create: 目标表不存在时按源表结构创建
+    :param queue_size: 读写之间缓冲的批数
+    :return: 复制的行数
+    """
+    table = src.get_real_table_name(table)
+    dst_table = dst.get_real_table_name(dst_table or table)
+    cols = src.columns_name(table)
+    if create:
+        dst.create_table(dst_table, translate_schema(src, table), exists_ok=True)
+
+    select = f'SELECT {", ".join(f"`{_}`" for _ in cols)} FROM `{table}`'
+    insert = (f'INSERT INTO `{dst_table}` ( {", ".join(f"`{_}`" for _ in cols)} ) '
+              f'VALUES ( {", ".join(dst.PLACEHOLDER for _ in cols)} )')
+
+    if getattr(src, 'is_memory', False):  # 内存数据库的连接不能跨线程，退回串行
+        total = 0
+        for rows in src.iter_db(select, batch_rows=batch_rows):
+            dst.write_rows(insert, rows)
+            total += len(rows)
+        return total
+
+    batches = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def _reader():
+        _src = None
+        try:
+            # iter_db() 自己使用独立连接的后端(MySQL)直接调用，否则先建立本线程的连接(SQLite)
+            _src = src if src.iter_db_isolated else src.fork(read_only=True)
+            for _rows in _src.iter_db(select, batch_rows=batch_rows):
+                if stop.is_set():
+                    break
+                batches.put(_rows)
+        except Exception as _e:
+            errors.append(_e)
+        finally:
+            if _src is not None and _src is not src:
+                _src.close()
+            batches.put(_DONE)
+
+    thread = threading.Thread(target=_reader, name='sqllib-copy-reader', daemon=True)
+    thread.start()
+    total = 0
+    try:
+        while True:
+            rows = batches.get()
+            if rows is _DONE:
+                break
+            dst.write_rows(insert, rows)
+            total += len(rows)
+    finally:
+        stop.set()
+        while thread.is_alive():  # 写入出错时排空队列，让读线程退出
+            try:
+                batches.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        thread.join()
+    if errors:
+        raise errors[0]
+    logger.debug(f'复制 {table} -> {dst_table}: {total} rows')
+    return total
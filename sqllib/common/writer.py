@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : writer.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 14:05
+
+后台批量写入
+
+    BufferedWriter: 调用方把行放入有界队列后立即返回，后台线程按行数或时间间隔分批写入。
+"""
+import logging
+import queue
+import threading
+import time
+
+from .error import SqlBufferedWriteError, SqlModuleError
+
+logger = logging.getLogger('sqllib.writer')
+
+__all__ = ['BufferedWriter']
+
+_FLUSH = object()
+_CLOSE = object()
+
+
+class BufferedWriter:
+    """ 包装任意 BaseSQLAPI 的后台写入器。
+
+        with BufferedWriter(api, 'table', ['a', 'b'], batch_rows=500, interval=0.5) as writer:
+            writer.write((1, 'x'))
+            writer.write({'a': 2, 'b': 'y'})
+
+    后台线程通过 api.fork() 持有独立连接；内存 SQLite 无法 fork，此时直接使用 api 本身，
+    需要在创建连接时传入 check_same_thread=False。
+
+    :param api: BaseSQLAPI 实例
+    :param table: 表名
+    :param columns: 写入的字段，write() 的元组按此顺序
+    :param batch_rows: 攒够多少行写一次
+    :param interval: 第一行入队后最多等待多少秒写入
+    :param max_queue: 队列容量，队满时 write() 阻塞(背压)
+    :param on_error: 写入失败时调用 on_error(SqlBufferedWriteError)；
+                     未设置时记录日志，并在下一次 flush() / close() 时抛出
+    """
+
+    def __init__(self, api, table, columns, batch_rows=1000, interval=1.0, max_queue=10000, on_error=None):
+        self.api = api
+        self.table = api.get_real_table_name(table)
+        self.columns = list(columns)
+        self.batch_rows = batch_rows
+        self.interval = interval
+        self.on_error = on_error
+        self.command = (f'INSERT INTO `{self.table}` ( {", ".join(f"`{_}`" for _ in self.columns)} ) '
+                        f'VALUES ( {", ".join(api.PLACEHOLDER for _ in self.columns)} )')
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._errors = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f'sqllib-writer-{self.table}', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, row, timeout=None):
+        """放入一行：元组(按 columns 顺序)或字典。队满时阻塞，超过 timeout 抛出 queue.Full"""
+        if self._closed:
+            raise SqlModuleError('BufferedWriter 已关闭')
+        if isinstance(row, dict):
+            row = tuple(row.get(_) for _ in self.columns)
+        elif len(row) != len(self.columns):
+            raise SqlModuleError(f'行长度 {len(row)} 与字段数 {len(self.columns)} 不一致: {row}')
+        self._put(row, timeout=timeout)
+
+    def write_many(self, rows, timeout=None):
+        """逐行放入多行"""
+        for row in rows:
+            self.write(row, timeout=timeout)
+
+    def flush(self):
+        """阻塞直到此前放入的所有行都已写入(或失败)；后台线程已退出时抛出 SqlBufferedWriteError"""
+        if self._closed:
+            return self._raise_errors()
+        self._put(_FLUSH)
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                self._check_alive()
+                self._queue.all_tasks_done.wait(0.1)
+        self._raise_errors()
+
+    def close(self):
+        """写入剩余数据，停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+        self._thread.join()
+        self._raise_errors()
+
+    @property
+    def pending(self) -> int:
+        """队列中等待写入的行数(近似值)"""
+        return self._queue.qsize()
+
+    def _raise_errors(self):
+        if self._errors:
+            _e, self._errors = self._errors[0], []
+            raise _e
+
+    def _check_alive(self):
+        if not self._thread.is_alive():
+            self._raise_errors()
+            raise SqlBufferedWriteError(f'{self.table} 的后台写入线程已退出', table=self.table, rows=[])
+
+    def _put(self, item, timeout=None):
+        """放入队列；等待期间后台线程退出时抛出 SqlBufferedWriteError，而不是一直阻塞"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._check_alive()
+            wait = 0.1 if deadline is None else max(0.0, min(0.1, deadline - time.monotonic()))
+            try:
+                return self._queue.put(item, timeout=wait)
+            except queue.Full:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+
+    def _report(self, error, cause):
+        """交给 on_error；回调本身出错只记录日志，不影响后台线程"""
+        error.__cause__ = cause
+        if self.on_error is None:
+            logger.error(error)
+            self._errors.append(error)
+            return
+        try:
+            self.on_error(error)
+        except Exception:
+            logger.exception(f'BufferedWriter({self.table}) 的 on_error 回调出错')
+
+    def _connect(self, rows):
+        """后台线程的连接；无法 fork 时(内存 SQLite)使用 api 本身，连接失败时报告这一批并返回 None"""
+        try:
+            return self.api.fork(), True
+        except SqlModuleError:
+            return self.api, False
+        except Exception as _e:
+            self._report(SqlBufferedWriteError(f'后台写入 {self.table} 时无法建立连接({len(rows)} 行): {_e}',
+                                               table=self.table, rows=rows), _e)
+            return None, False
+
+    def _write(self, api, rows):
+        try:
+            api.write_rows(self.command, rows)
+        except Exception as _e:
+            self._report(SqlBufferedWriteError(f'后台写入 {self.table} 失败({len(rows)} 行): {_e}',
+                                               table=self.table, rows=rows), _e)
+
+    def _run(self):
+        api, forked = None, False
+        batch, deadline = [], None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None  # 到达时间间隔
+                if item is not None and item is not _FLUSH and item is not _CLOSE:
+                    batch.append(item)
+                    deadline = deadline or time.monotonic() + self.interval
+                    if len(batch) < self.batch_rows:
+                        continue
+                try:
+                    if batch and api is None:
+                        api, forked = self._connect(batch)  # 连接失败时下一批再试
+                    if batch and api is not None:
+                        self._write(api, batch)
+                except Exception as _e:  # 先记录错误，再标记任务完成，flush() 返回时一定能看到
+                    self._errors.append(SqlBufferedWriteError(f'{self.table} 的后台写入线程异常退出: {_e}',
+                                                              table=self.table, rows=batch))
+                    raise
+                finally:
+                    for _ in range(len(batch) + (item is _FLUSH or item is _CLOSE)):
+                        self._queue.task_done()
+                    batch, deadline = [], None
+                if item is _CLOSE:
+                    break
+        except Exception:
+            logger.exception(f'BufferedWriter({self.table}) 的后台线程异常退出')
+        finally:
+            if forked:
+                api.close()
+            while True:  # 剩余的行不会再被写入，标记完成以免 join() 永久等待
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._queue.task_done()
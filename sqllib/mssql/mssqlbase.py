@@ -3,15 +3,27 @@
 """MSSQL API"""
 
 import sys
+import math
 import logging
+from contextlib import contextmanager
 
 import pymssql
 
+from sqllib.common import batch
+from sqllib.common.error import SqlTimeoutError
+from sqllib.common.query import Query
+
 logger = logging.getLogger('sqllib.mssql')
 
 
 class MsSqlBase:
-    """SQLServer API"""
+    """SQLServer API
+
+    所有语句共用 __init__ 中建立的连接，执行后只关闭游标；连接由 close() 关闭。
+    """
+    PLACEHOLDER = '%s'
+    DIALECT = 'mssql'
+    MAX_IN_PARAMS = 2000  # 每条语句最多 2100 个参数
 
     def __init__(self, host, port, user, password, db):
         self.db = db
@@ -46,8 +58,6 @@ class MsSqlBase:
                 sys.exc_info()
                 raise pymssql.OperationalError(
                     f'操作数据库时出现问题，数据库已回滚至操作前——\n{sys.exc_info()}\n\n{command}')
-            finally:
-                _sql.close()
 
     def _write_affair(self, command, args):
         _sql = self._sql
@@ -61,23 +71,50 @@ class MsSqlBase:
             sys.exc_info()
             raise pymssql.OperationalError(
                 "_write_rows() 操作数据库出错，已回滚 \n" + str(sys.exc_info()))
-        finally:
-            _sql.close()
-            cur.close()
 
     def _read_db(self, command, args=None, result_type=None):
         _sql = self._sql
         with _sql.cursor(result_type) as cur:
             cur.execute(command, args)
-            results = cur.fetchall()
-            _sql.close()
-            return results
+            return cur.fetchall()
+
+    def get_real_table_name(self, name):
+        return name
 
-    def read_db(self, command, args=None, result_type=None):
-        return self._read_db(command, args=args, result_type=result_type)
+    def query(self, table) -> Query:
+        """可组合的查询构造器，标识符使用 [] 引用"""
+        return Query(self, table)
 
-    def write_db(self, command, args=None):
-        return self._write_db(command, args=args)
+    def get_many(self, table, key, values, cols=None, result_type=None) -> dict:
+        """按键批量读取，返回 {键: 行}，见 common.batch.get_many"""
+        return batch.get_many(self, table, key, values, cols, result_type)
+
+    @contextmanager
+    def time_limit(self, seconds):
+        """使用连接的 query_timeout(整秒，向上取整)；超时抛出 SqlTimeoutError"""
+        _conn = self._sql._conn
+        outer = _conn.query_timeout
+        _conn.query_timeout = max(1, math.ceil(seconds))
+        try:
+            yield self
+        except pymssql.OperationalError as _e:
+            if '20003' in str(_e) or 'timed out' in str(_e).lower():
+                raise SqlTimeoutError(f'语句执行超过 {seconds} 秒: {_e}') from _e
+            raise
+        finally:
+            _conn.query_timeout = outer
+
+    def read_db(self, command, args=None, result_type=None, timeout=None):
+        if timeout is None:
+            return self._read_db(command, args=args, result_type=result_type)
+        with self.time_limit(timeout):
+            return self._read_db(command, args=args, result_type=result_type)
+
+    def write_db(self, command, args=None, timeout=None):
+        if timeout is None:
+            return self._write_db(command, args=args)
+        with self.time_limit(timeout):
+            return self._write_db(command, args=args)
 
     def show_tables(self) -> tuple:
         return list(zip(*self._read_db('SELECT name FROM [sysobjects] WHERE [xtype]=\'u\'')))[0]
@@ -9,6 +9,8 @@
 """
 
 from .mysqlbase import MyMySqlAPI, MySqlAPI
+from .prepared import MySqlPreparedAPI
+from .spool import WriteSpool
 
 
 class Test(MyMySqlAPI):
@@ -41,15 +41,39 @@
 
 """
 
+import copy
 import logging
+import re
 import sys
+import threading
+import time
+from contextlib import contextmanager
+
 import pymysql
 from sqllib.common.base_sql import BaseSQL, BaseSQLAPI
+from sqllib.common.common import create_index_sql
 from sqllib.common.error import *
 # from sqllib.common.common import sql_join
 from dbutils.pooled_db import PooledDB
 from warnings import filterwarnings
 
+from .replica import ReplicaRouter, is_connection_error, is_replica_read
+from .spool import WriteSpool
+
+_RE_SELECT = re.compile(r'^\s*SELECT\b', re.I)
+# 语句被中断：KILL QUERY、超过 MAX_EXECUTION_TIME、MariaDB max_statement_time
+_INTERRUPTED = {1317, 3024, 1969}
+
+
+def _is_interrupted(err) -> bool:
+    if isinstance(err, pymysql.err.MySQLError):
+        return bool(err.args) and err.args[0] in _INTERRUPTED
+    return getattr(err, 'errno', None) in _INTERRUPTED  # mysql-connector
+
+# ALGORITHM / LOCK 不被支持：ER_ALTER_OPERATION_NOT_SUPPORTED(_REASON)
+_NOT_ONLINE = {1845, 1846}
+_ONLINE = 'ALGORITHM=INPLACE, LOCK=NONE'
+
 logger = logging.getLogger("mysql")  # 创建实例
 formatter = logging.Formatter("[%(asctime)s] < %(funcName)s: %(lineno)d > [%(levelname)s] %(message)s")
 # 终端日志
@@ -103,7 +127,24 @@ class MyBaseSQL(BaseSQL):
     :param str db:      数据库的DataBase
     :param str charset: 数据库的字符集
     :param str prefix:  表前缀
+    :param bool convert_types: 为True时 select() / query() 的结果按声明类型转换(JSON 列解析为 dict 等)
+    :param list replicas: 从库列表，元素为 'host'、(host, port) 或覆盖连接参数的 dict；读请求路由到从库 (见 replica.py)
+    :param str read_policy: 从库选择策略 'round_robin' | 'least_latency'
+    :param float sticky_seconds: 一个线程写入后，这段时间内它的读请求仍走主库(读到自己的写)；0 关闭
+    :param float health_interval: 从库健康检查的间隔(秒)
+    :param RetryPolicy retry: 连接错误(gone away / lost connection)时重连并按指数退避重试；
+                              读请求总是可重试，写请求需要 retry_writes=True 或在 idempotent() 中执行
+    :param CircuitBreaker circuit_breaker: 连续连接失败后熔断，期间直接抛出 SqlCircuitOpenError
+    :param spool: 本地写入队列的路径或 WriteSpool；主库不可用时 insert() / update() 写入队列，恢复后按表顺序重放；
+                  至少一次投递，同一写入可能执行两次，写入应是幂等的(INSERT IGNORE + 自然键) (见 spool.py)
+    :param spool_replay_interval: 启用 spool 时，后台线程每隔多少秒重放积压；默认 None 不启动，
+                                  积压只在同一张表的下一次写入或手动 replay_spool() 时重放
     """
+    PLACEHOLDER = '%s'
+    DIALECT = 'mysql'
+    MAX_IN_PARAMS = 1000
+    MAX_IN_BYTES = 1 << 20  # 远小于 max_allowed_packet 的默认值(5.7 为 4M)
+    iter_db_isolated = True  # _iter_db() 总是在独立连接上使用服务端游标
 
     def __init__(self, host, port, user, passwd, db, charset,
                  use_unicode=None, pool=False, **kwargs):
@@ -117,17 +158,68 @@ class MyBaseSQL(BaseSQL):
         self.use_unicode = use_unicode
         # 表前缀
         self.TABLE_PREFIX = kwargs.pop('prefix', '')
-        self._sql = pymysql.connect(host=self.SQL_HOST,
-                                    port=self.SQL_PORT,
-                                    user=self.SQL_USER,
-                                    password=self.SQL_PASSWD,  # 可以用 passwd为别名
-                                    database=self.SQL_DB,  # 可以用 db    为别名；
-                                    charset=self.SQL_CHARSET,
-                                    use_unicode=use_unicode,
-                                    **kwargs
-                                    )
+        self.convert_types = kwargs.pop('convert_types', False)
+        replicas = kwargs.pop('replicas', None)
+        read_policy = kwargs.pop('read_policy', 'round_robin')
+        health_interval = kwargs.pop('health_interval', 30)
+        self.sticky_seconds = kwargs.pop('sticky_seconds', 0)
+        self.retry_policy = kwargs.pop('retry', None)
+        self.circuit_breaker = kwargs.pop('circuit_breaker', None)
+        self.retry_metrics = {'connection_errors': 0, 'retries': 0, 'reconnects': 0, 'exhausted': 0}
+        spool = kwargs.pop('spool', None)
+        self.spool = spool if spool is None or isinstance(spool, WriteSpool) else WriteSpool(spool)
+        replay_interval = kwargs.pop('spool_replay_interval', None)
+        self._connect_kwargs = kwargs
+        self._sql = self._connect()
+        self._local = threading.local()  # 每个线程的 on_primary() 深度与最后写入时间
+        self._router = ReplicaRouter(self._replica_specs(replicas), read_policy, health_interval) \
+            if replicas else None
         self.pooled_sql = None
         self.pooling_sql() if pool else None
+        self._spool_stop = threading.Event()
+        self._spool_thread = None
+        if self.spool is not None and replay_interval:
+            self._spool_thread = threading.Thread(target=self._spool_replayer, args=(replay_interval,),
+                                                  name='sqllib-spool-replay', daemon=True)
+            self._spool_thread.start()
+
+    def _connect(self, **override):
+        """按实例保存的参数建立一个新的 pymysql 连接；override 覆盖其中的参数(用于连接从库)"""
+        kwargs = dict(host=self.SQL_HOST,
+                      port=self.SQL_PORT,
+                      user=self.SQL_USER,
+                      password=self.SQL_PASSWD,  # 可以用 passwd为别名
+                      database=self.SQL_DB,  # 可以用 db    为别名；
+                      charset=self.SQL_CHARSET,
+                      use_unicode=self.use_unicode,
+                      **self._connect_kwargs
+                      )
+        kwargs.update(override)
+        return pymysql.connect(**kwargs)
+
+    def _replica_specs(self, replicas) -> list:
+        """从库配置 -> [(名称, 连接工厂)]，未给出的参数与主库相同"""
+        specs = []
+        for _r in replicas or ():
+            if isinstance(_r, str):
+                _r = {'host': _r}
+            elif isinstance(_r, (tuple, list)):
+                _r = dict(zip(('host', 'port'), _r))
+            _r = {'password' if k == 'passwd' else 'database' if k == 'db' else k: v for k, v in _r.items()}
+            specs.append((f"{_r.get('host', self.SQL_HOST)}:{_r.get('port', self.SQL_PORT)}",
+                          lambda _o=_r: self._connect(**_o)))
+        return specs
+
+    def fork(self, read_only=False):
+        """返回持有独立连接的浅拷贝: 启用连接池时从池中取连接，否则新建连接。
+
+        新实例的 close() 只会关闭(归还)它自己的连接。
+        """
+        _clone = copy.copy(self)
+        _clone._sql = self.pooled_sql.connection() if self.pooled_sql is not None else self._connect()
+        _clone._router = self._router.fork() if self._router is not None else None
+        _clone._spool_thread = None  # 后台重放线程属于原实例，副本的 close() 不停止它
+        return _clone
 
     def set_use_db(self, db_name):
         """设置当前数据库"""
@@ -174,59 +266,339 @@ class MyBaseSQL(BaseSQL):
         self.TABLE_PREFIX = prefix
 
     def close(self):
-        """关闭数据库连接"""
+        """关闭数据库连接(并停止后台重放)"""
+        if getattr(self, '_spool_thread', None) is not None:
+            self._spool_stop.set()
+            self._spool_thread.join()
         self._sql.close()
+        if self._router is not None:
+            self._router.close()
+
+    # 读写分离
+    @contextmanager
+    def on_primary(self):
+        """在此上下文中(当前线程)的读请求都在主库执行，用于事务内的读或需要强一致的读"""
+        self._local.primary = getattr(self._local, 'primary', 0) + 1
+        try:
+            yield self
+        finally:
+            self._local.primary -= 1
+
+    def _route_read(self, command):
+        """为读请求选择从库，应在主库执行时返回 None"""
+        if self._router is None or getattr(self._local, 'primary', 0) or not is_replica_read(command):
+            return None
+        if self.sticky_seconds and time.monotonic() - getattr(self._local, 'last_write', -1e9) < self.sticky_seconds:
+            return None
+        return self._router.choose()
+
+    def _wrote(self):
+        self._local.last_write = time.monotonic()
+
+    @property
+    def concurrent_reads(self) -> bool:
+        """启用连接池且没有从库时，每次读取从池中取得独立连接，可以多线程同时读取"""
+        return self.pooled_sql is not None and self._router is None
+
+    def replica_stats(self) -> list:
+        """各从库的健康状态、延迟与读请求数"""
+        return self._router.stats() if self._router is not None else []
+
+    # 重试与熔断
+    @contextmanager
+    def idempotent(self):
+        """在此上下文中(当前线程)的写入被视为幂等，连接错误时按 retry 策略重试"""
+        self._local.idempotent = getattr(self._local, 'idempotent', 0) + 1
+        try:
+            yield self
+        finally:
+            self._local.idempotent -= 1
 
-    def _write_db(self, command, args=None):
-        """执行数据库写入操作
+    def _primary(self):
+        """主库连接：启用连接池时从池中取"""
+        return self.pooled_sql.connection() if self.pooled_sql is not None else self._sql
 
-        :type args: str, list or tuple
-        """
+    def _reconnect(self):
+        """重建主库连接；连接池在取连接时自行检查(ping)，不需要处理"""
         if self.pooled_sql is not None:
-            _sql = self.pooled_sql.connection()
+            return
+        try:
+            self._sql.ping(reconnect=True)
+            self.retry_metrics['reconnects'] += 1
+        except Exception as _e:
+            logger.warning(f'重新连接 {self.SQL_HOST}:{self.SQL_PORT} 失败: {_e}')
+
+    def _retrying(self, func, *args, write=False):
+        """执行 func(*args)；连接类错误时记录到熔断器，并在允许时重连、退避后重试"""
+        policy, breaker = self.retry_policy, self.circuit_breaker
+        if policy is None and breaker is None:
+            return func(*args)
+        retryable = policy is not None and (not write or policy.retry_writes
+                                            or getattr(self._local, 'idempotent', 0))
+        attempts = policy.max_attempts if retryable else 1
+        for attempt in range(1, attempts + 1):
+            if breaker is not None:
+                breaker.before()
+            try:
+                result = func(*args)
+            except Exception as _e:
+                if not (is_connection_error(_e) or is_connection_error(_e.__context__)):
+                    if breaker is not None:
+                        breaker.success()  # SQL 本身的错误，服务器是可达的
+                    raise
+                self.retry_metrics['connection_errors'] += 1
+                if breaker is not None:
+                    breaker.failure()
+                if attempt >= attempts:
+                    if retryable:
+                        self.retry_metrics['exhausted'] += 1
+                    raise
+                self.retry_metrics['retries'] += 1
+                logger.warning(f'连接错误，第 {attempt} 次重试: {_e}')
+                time.sleep(policy.delay(attempt))
+                self._reconnect()
+            else:
+                if breaker is not None:
+                    breaker.success()
+                return result
+
+    # 本地写入队列
+    @staticmethod
+    def _unavailable(err) -> bool:
+        """数据库不可用(连接错误或熔断)，而不是语句本身的错误"""
+        return isinstance(err, SqlCircuitOpenError) or is_connection_error(err) or is_connection_error(err.__context__)
+
+    def _spool_write(self, table, command, args, many=False):
+        """insert() / update() 的写入：启用 spool 时，数据库不可用或该表仍有积压则写入队列并返回 0
+
+        连接错误无法区分语句是否已在服务端提交，入队的写入可能已经生效，重放时会再执行一次(至少一次)
+        """
+        func = self._write_affair if many else self._write_db
+        spool = self.spool
+        if spool is None:
+            return func(command, args)
+        table = self.get_real_table_name(table)
+        if spool.due() and spool.has_backlog(table):
+            self.replay_spool(table)
+        if not spool.due() or spool.has_backlog(table):
+            spool.append(table, command, args, many)
+            return 0
+        try:
+            return func(command, args)
+        except Exception as _e:
+            if not self._unavailable(_e):
+                raise
+            spool.backoff()
+            spool.append(table, command, args, many)
+            logger.warning(f'数据库不可用，写入本地队列 {spool.path}: {_e}')
+            return 0
+
+    def _replay(self, entries, merge=True) -> int:
+        """按顺序重放 [(seq, command, args, many)]，merge 时相邻的同一语句合并执行；返回成功的条数"""
+        groups = []
+        for seq, command, args, many in entries:
+            if merge and groups and not many and not groups[-1][1] and groups[-1][0] == command:
+                groups[-1][2].append((seq, args))
+            else:
+                groups.append((command, many, [(seq, args)]))
+        replayed = 0
+        for command, many, group in groups:
+            try:
+                if many:
+                    self._write_affair(command, group[0][1])
+                elif len(group) == 1:
+                    self._write_db(command, group[0][1])
+                else:
+                    self._write_affair(command, [_a for _, _a in group])
+            except Exception as _e:
+                if self._unavailable(_e):
+                    raise
+                if len(group) > 1:  # 找出出错的一条
+                    replayed += self._replay([(_s, command, _a, False) for _s, _a in group], merge=False)
+                    continue
+                self.spool.fail(group[0][0], _e)
+                logger.warning(f'本地队列中的语句 {group[0][0]} 重放失败，已跳过: {_e}')
+                continue
+            self.spool.remove([_s for _s, _ in group])
+            replayed += len(group)
+        return replayed
+
+    def _spool_replayer(self, interval):
+        """后台重放线程：有积压且已过退避时间时重放全部表"""
+        while not self._spool_stop.wait(interval):
+            if self.spool.has_backlog() and self.spool.due():
+                try:
+                    self.replay_spool()
+                except Exception as _e:
+                    logger.warning(f'后台重放本地队列失败: {_e}')
+
+    def replay_spool(self, table=None, batch_rows=500) -> int:
+        """ 把本地队列中的写入按表、按入队顺序重放到数据库，返回重放的语句数
+
+        数据库仍不可用时停止并在 spool.retry_interval 秒内不再尝试；其他线程正在重放时直接返回 0。
+        """
+        spool = self.spool
+        if spool is None or not spool.replay_lock.acquire(blocking=False):
+            return 0
+        replayed = 0
+        try:
+            for _table in [self.get_real_table_name(table)] if table else spool.tables():
+                while True:
+                    entries = spool.peek(_table, batch_rows)
+                    if not entries:
+                        break
+                    replayed += self._replay(entries)
+        except Exception as _e:
+            if not self._unavailable(_e):
+                raise
+            spool.backoff()
+            logger.warning(f'重放本地队列时数据库仍不可用，已重放 {replayed} 条: {_e}')
         else:
-            _sql = self._sql
-
-        cur = _sql.cursor()  # 使用cursor()方法获取操作游标
+            spool.recovered()
+        finally:
+            spool.replay_lock.release()
+        if replayed:
+            logger.info(f'本地队列已重放 {replayed} 条')
+        return replayed
+
+    # 超时
+    @contextmanager
+    def time_limit(self, seconds):
+        """ 本线程在此上下文中执行的语句超时后被中断，抛出 SqlTimeoutError
+
+        SELECT 附加 MAX_EXECUTION_TIME 提示由服务器中断；所有语句到期后还会在新连接上 KILL QUERY，
+        被中断的连接仍可继续使用。可以嵌套，以较早的截止时间为准。
+        """
+        outer = getattr(self._local, 'deadline', None)
+        deadline = time.monotonic() + seconds
+        self._local.deadline = deadline if outer is None else min(deadline, outer)
         try:
-            _c = cur.execute(command, args)
-            _sql.commit()  # 提交数据库
-            return _c
-        except Exception:
-            _sql.rollback()
-            sys.exc_info()
-            raise SqlWriteError(f'操作数据库时出现问题，数据库已回滚至操作前——\n{sys.exc_info()}\n\n{command}')
+            yield self
         finally:
-            cur.close()
+            self._local.deadline = outer
+
+    @contextmanager
+    def _guard(self, _sql):
+        """在 time_limit() 中执行语句：到期时 KILL QUERY，把中断错误转换为 SqlTimeoutError；产出剩余秒数"""
+        deadline = getattr(self._local, 'deadline', None)
+        if deadline is None:
+            yield None
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise SqlTimeoutError('已超过 time_limit() 的截止时间，语句未执行')
+        state = {'done': False, 'killed': False, 'lock': threading.Lock()}
+        timer = threading.Timer(remaining, self._kill_query, (self._kill_target(_sql), state))  # 执行前取得线程ID
+        timer.daemon = True
+        timer.start()
+        try:
+            yield remaining
+        except Exception as _e:
+            if state['killed'] or _is_interrupted(_e) or _is_interrupted(_e.__context__):
+                raise SqlTimeoutError(f'语句执行超过截止时间，已中断: {_e}') from _e
+            raise
+        finally:
+            with state['lock']:  # 之后不会再对这个连接发出 KILL
+                state['done'] = True
+            timer.cancel()
+
+    def _kill_target(self, _sql) -> tuple:
+        """ KILL QUERY 需要的 (host, port, user, password, thread_id)
+
+        连接池的连接(PooledDedicatedDBConnection -> SteadyDBConnection)没有这些属性，逐层解包到 pymysql 连接；
+        取不到的连接参数使用实例的配置(SQL_HOST 等)
+        """
+        raw = _sql
+        while not hasattr(raw, 'thread_id') and getattr(raw, '_con', None) is not None:
+            raw = raw._con
+        return (getattr(raw, 'host', self.SQL_HOST), getattr(raw, 'port', self.SQL_PORT),
+                getattr(raw, 'user', self.SQL_USER), getattr(raw, 'password', self.SQL_PASSWD), int(raw.thread_id()))
+
+    @staticmethod
+    def _kill_query(target, state):
+        """在新连接上中断 target 所指线程正在执行的语句"""
+        host, port, user, password, thread_id = target
+        with state['lock']:
+            if state['done']:
+                return
+            try:
+                _killer = pymysql.connect(host=host, port=port, user=user, password=password, connect_timeout=5)
+                try:
+                    with _killer.cursor() as cur:
+                        cur.execute(f'KILL QUERY {thread_id}')
+                    state['killed'] = True
+                finally:
+                    _killer.close()
+            except Exception as _e:
+                logger.warning(f'KILL QUERY 失败: {_e}')
+
+    def retry_stats(self) -> dict:
+        """重试计数与熔断器状态"""
+        return dict(self.retry_metrics,
+                    circuit_breaker=self.circuit_breaker.stats() if self.circuit_breaker is not None else None)
+
+    def _write_db(self, command, args=None):
+        """执行数据库写入操作
+
+        :type args: str, list or tuple
+        """
+        return self._retrying(self._write_once, command, args, write=True)
+
+    def _write_once(self, command, args=None):
+        _sql = self._primary()
+        with self._guard(_sql):
+            cur = _sql.cursor()  # 使用cursor()方法获取操作游标
+            try:
+                _c = cur.execute(command, args)
+                _sql.commit()  # 提交数据库
+                self._wrote()
+                return _c
+            except Exception:
+                _sql.rollback()
+                sys.exc_info()
+                raise SqlWriteError(f'操作数据库时出现问题，数据库已回滚至操作前——\n{sys.exc_info()}\n\n{command}')
+            finally:
+                cur.close()
 
     # 写入事务
     def _write_affair(self, command, args):
         """向数据库写入多行"""
-        if self.pooled_sql is not None:
-            _sql = self.pooled_sql.connection()
-        else:
-            _sql = self._sql
-
-        try:
-            with _sql.cursor() as cur:  # with 语句自动关闭游标
-                _c = cur.executemany(command, args)
-                _sql.commit()
-            return _c
-        except Exception:
-            _sql.rollback()
-            sys.exc_info()
-            raise SqlWriteError("_write_rows() 操作数据库出错，已回滚 \n" + str(sys.exc_info()))
-
-    def _read_db(self, command, args=None, result_type=None):
+        return self._retrying(self._write_affair_once, command, args, write=True)
+
+    def _write_affair_once(self, command, args):
+        _sql = self._primary()
+        with self._guard(_sql):
+            try:
+                with _sql.cursor() as cur:  # with 语句自动关闭游标
+                    _c = cur.executemany(command, args)
+                    _sql.commit()
+                self._wrote()
+                return _c
+            except Exception:
+                _sql.rollback()
+                sys.exc_info()
+                raise SqlWriteError("_write_rows() 操作数据库出错，已回滚 \n" + str(sys.exc_info()))
+
+    def _read_db(self, command, args=None, result_type=None, table=None):
         """执行数据库读取数据， 返回结果
 
         :param result_type: 返回的结果集类型{dict, None, tuple, 'SSCursor', 'SSDictCursor'}
+        :param table: 给出时按该表的声明类型转换结果(JSON 列解析为 dict 等)
         """
-        if self.pooled_sql is not None:
-            _sql = self.pooled_sql.connection()
-        else:
-            _sql = self._sql
-
+        self._notify_read(command, args)
+        replica = self._route_read(command)
+        if replica is not None:
+            try:
+                return self._fetch(replica.connection(), command, args, result_type, table)
+            except pymysql.err.MySQLError as _e:
+                if not is_connection_error(_e):
+                    raise
+                self._router.mark_down(replica)  # 从库不可用，本次改在主库执行
+
+        return self._retrying(lambda: self._fetch(self._primary(), command, args, result_type, table))
+
+    def _fetch(self, _sql, command, args=None, result_type=None, table=None):
+        """在给定连接上执行查询"""
         ret_ = {dict: pymysql.cursors.DictCursor,
                 None: pymysql.cursors.Cursor,
                 tuple: pymysql.cursors.Cursor,
@@ -234,12 +606,36 @@ class MyBaseSQL(BaseSQL):
                 'SSCursor': pymysql.cursors.SSCursor,
                 'SSDictCursor': pymysql.cursors.SSDictCursor
                 }
-        cur = _sql.cursor(ret_[result_type])
-        cur.execute(command, args)
-        results = cur.fetchall()
-        cur.close()
+        with self._guard(_sql) as remaining:
+            if remaining is not None:  # 由服务器在截止时间中断 SELECT
+                command = _RE_SELECT.sub(f'SELECT /*+ MAX_EXECUTION_TIME({max(1, int(remaining * 1000))}) */',
+                                         command, count=1)
+            cur = _sql.cursor(ret_[result_type])
+            cur.execute(command, args)
+            results, description = cur.fetchall(), cur.description
+            cur.close()
+        if table is not None:
+            results = self.convert_rows(table, description, list(results))
         return results
 
+    def _iter_db(self, command, args=None, batch_rows=1000, result_type=None):
+        """使用服务端游标(SSCursor)流式读取，每次产出不超过 batch_rows 行
+
+        流式读取期间连接被游标独占，因此总是使用一个独立的连接。
+        """
+        _conn = self.fork()
+        cur = _conn._sql.cursor(pymysql.cursors.SSDictCursor if result_type is dict else pymysql.cursors.SSCursor)
+        try:
+            cur.execute(command, args)
+            while True:
+                rows = cur.fetchmany(batch_rows)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cur.close()
+            _conn.close()
+
     # 查表中键的所有信息 - > list
     def _columns(self, table, result_type=None):
         """返回table中列（字段）的所有信息
@@ -259,6 +655,100 @@ class MyBaseSQL(BaseSQL):
         table = self.get_real_table_name(table)
         return [_c[0].decode() if isinstance(_c[0], bytes) else _c[0] for _c in self._columns(table)]
 
+    def columns_info(self, table) -> list:
+        """统一格式的列信息"""
+        def _s(_v):
+            return _v.decode() if isinstance(_v, bytes) else _v
+        return [{'name': _s(_['Field']), 'type': _s(_['Type']), 'notnull': _s(_['Null']) == 'NO',
+                 'pk': _s(_['Key']) == 'PRI'}
+                for _ in self._columns(table, result_type=dict)]
+
+    def range_key(self, table):
+        """单列整数主键"""
+        pks = [_ for _ in self.columns_info(table) if _['pk']]
+        if len(pks) == 1 and 'int' in pks[0]['type'].lower():
+            return pks[0]['name']
+        return None
+
+    # 索引
+    def _online_ddl(self, command, online=True):
+        """ 以 ALGORITHM=INPLACE, LOCK=NONE 执行DDL(不阻塞并发读写)；服务器不支持时退回默认方式
+
+        :param command: 不带 ALGORITHM / LOCK 的 ALTER TABLE / CREATE INDEX / DROP INDEX 语句
+        """
+        if online:
+            _sep = ', ' if command.lstrip().upper().startswith('ALTER') else ' '
+            try:
+                return self._write_db(command + _sep + _ONLINE.replace(', ', _sep))
+            except SqlWriteError as _e:
+                _err = _e.__context__
+                if not (isinstance(_err, pymysql.err.MySQLError) and _err.args and _err.args[0] in _NOT_ONLINE):
+                    raise
+                logger.warning(f'不支持在线执行，使用默认方式: {_err.args[1] if len(_err.args) > 1 else _err}')
+        return self._write_db(command)
+
+    def list_indexes(self, table) -> list:
+        """ 表上的索引(SHOW INDEX，在主库读取)
+
+        额外的字段：type 为 BTREE / FULLTEXT / SPATIAL 等，definition 为 ALTER TABLE ... ADD 之后的索引定义；
+        函数索引的 columns 中为 None
+        """
+        table = self.get_real_table_name(table)
+        with self.on_primary():
+            rows = self._read_db(f'SHOW INDEX FROM `{table}`', result_type=dict)
+        indexes, parts = {}, {}
+        for _r in rows:
+            _r = {k: v.decode() if isinstance(v, bytes) else v for k, v in _r.items()}
+            name, column = _r['Key_name'], _r['Column_name']
+            _i = indexes.setdefault(name, {'name': name, 'columns': [], 'unique': not int(_r['Non_unique']),
+                                           'primary': name == 'PRIMARY', 'type': _r['Index_type'],
+                                           'visible': _r.get('Visible', 'YES') == 'YES'})
+            _i['columns'].append(column)
+            if column is None:  # 函数索引(8.0.13+)
+                part = f"({_r.get('Expression')})"
+            else:
+                part = (f'`{column}`' + (f"({_r['Sub_part']})" if _r.get('Sub_part') else '')
+                        + (' DESC' if _r.get('Collation') == 'D' else ''))
+            parts.setdefault(name, []).append(part)
+        for name, _i in indexes.items():
+            kind = ('PRIMARY KEY' if _i['primary'] else 'UNIQUE INDEX' if _i['unique']
+                    else f"{_i['type']} INDEX" if _i['type'] in ('FULLTEXT', 'SPATIAL') else 'INDEX')
+            _i['definition'] = (f"{kind}{'' if _i['primary'] else f' `{name}`'} ({', '.join(parts[name])})"
+                                + ('' if _i.pop('visible') else ' INVISIBLE'))
+            _i['sql'] = None if _i['primary'] else f"ALTER TABLE `{table}` ADD {_i['definition']}"
+        return list(indexes.values())
+
+    def create_index(self, table, columns, name=None, unique=False, online=True):
+        """ 创建索引，online 时使用 ALGORITHM=INPLACE, LOCK=NONE，建索引期间表仍可读写
+
+        :param columns: 列名或列名列表，可以带排序方向，如 ['city', 'age DESC']
+        :param name: 索引名，默认 idx_<表>_<列>
+        """
+        return self._online_ddl(create_index_sql(self.get_real_table_name(table), columns, name, unique), online)
+
+    def drop_index(self, index_name, table, online=True):
+        """删除一个索引"""
+        return self._online_ddl(f'DROP INDEX `{index_name}` ON `{self.get_real_table_name(table)}`', online)
+
+    def rebuild_index(self, table, name=None, online=True):
+        """ 重建索引
+
+        name 为空(或 PRIMARY)时 ALTER TABLE ... FORCE 在线重建整张表及其全部索引；
+        否则在一条 ALTER TABLE 中删除并重新添加该索引
+        """
+        table = self.get_real_table_name(table)
+        if name is None or name == 'PRIMARY':
+            return self._online_ddl(f'ALTER TABLE `{table}` FORCE', online)
+        index = next((_ for _ in self.list_indexes(table) if _['name'] == name), None)
+        if index is None:
+            raise SqlKeyNameError(f'表 {table} 上没有索引 {name}')
+        return self._online_ddl(f"ALTER TABLE `{table}` DROP INDEX `{name}`, ADD {index['definition']}", online)
+
+    def _restore_indexes(self, table, indexes):
+        """在一条 ALTER TABLE 中添加全部索引，只需扫描一次表"""
+        return self._online_ddl(f'ALTER TABLE `{self.get_real_table_name(table)}` '
+                                + ', '.join(f"ADD {_['definition']}" for _ in indexes))
+
     # 获取数据库的表名
     def tables_name(self) -> list:
         """由于链接时已经指定数据库，无需再次指定。返回数据库中所有表的名字。"""
@@ -298,12 +788,12 @@ class MyBaseSQL(BaseSQL):
         # print( _c)
         if not isinstance(list(kwargs.values())[0], (str, int, type(None), float)):
             arg = self.zip_data_for_insert(tuple(kwargs.values()))
-            return self._write_affair(_c, arg)
+            return self._spool_write(table, _c, arg, many=True)
         else:
             for x in kwargs.values():
                 if isinstance(x, (list, tuple)):
                     raise InsertZipError("INSERT一条数据时，出现列表列或元组！确保数据统一")
-            return self._write_db(_c, list(kwargs.values()))  # 提交
+            return self._spool_write(table, _c, list(kwargs.values()))  # 提交
 
     def _insert_rows(self, table_name, args, k=None, ignore_repeat=False):
         """插入
@@ -313,7 +803,7 @@ class MyBaseSQL(BaseSQL):
         :param ignore_repeat:
         :return:
         """
-        _a = [_.values() for _ in args]
+        _a = [tuple(_.values()) for _ in args]
         if k is None:
             if not isinstance(args[0], dict):
                 raise ValueError(f'既没有k, 也不是dict')
@@ -323,7 +813,7 @@ class MyBaseSQL(BaseSQL):
         _c += ", ".join([_ for _ in k]) + " ) "
         _c += "VALUES ( "
         _c += ", ".join([f" %s " for _ in args[0].values()]) + ");"
-        return self._write_affair(_c, _a)
+        return self._spool_write(table_name, _c, _a, many=True)
 
     # 检索表
     def _select(self, table, columns_name: tuple and list, result_type=None, **kwargs):
@@ -341,14 +831,12 @@ class MyBaseSQL(BaseSQL):
         command = f"SELECT  "
         command += ' , '.join(columns_name) + " "
         command += f'FROM `{self.get_real_table_name(table)}` '
-        for key, value in kwargs.items():
-            key = key.upper()
-            if key in ['WHERE', 'LIMIT', 'OFFSET']:
-                command += f' {key}  {value}'
-            if key == 'ORDER':
-                command += f' {key} BY {value}'
+        kwargs = {key.upper(): value for key, value in kwargs.items()}
+        for key in ('WHERE', 'ORDER', 'LIMIT', 'OFFSET'):  # 子句按语法顺序拼接，与传参顺序无关
+            if key in kwargs:
+                command += f' {key} BY {kwargs[key]}' if key == 'ORDER' else f' {key}  {kwargs[key]}'
         # print(command, )
-        return self._read_db(command, result_type=result_type)
+        return self._read_db(command, result_type=result_type, table=table if self.convert_types else None)
 
     # 更新表
     def _update(self, table, where_key, where_value, **kwargs):
@@ -360,13 +848,17 @@ class MyBaseSQL(BaseSQL):
         :param kwargs: 更新的键 = 更新的值， 注意大小写，数字键要加 - ``
         :return: 0 成功。
         """
-        self.key_and_table_is_exists(f'{self.get_real_table_name(table)}', where_key, **kwargs)  # 判断 表 & 键 的存在性！
+        try:
+            self.key_and_table_is_exists(f'{self.get_real_table_name(table)}', where_key, **kwargs)  # 判断 表 & 键 的存在性！
+        except Exception as _e:
+            if self.spool is None or not self._unavailable(_e):
+                raise  # 数据库不可用时跳过检查，语句写入本地队列
         _update_data = ' , '.join([f" `{k}`=%({k})s  " for k, v in kwargs.items()])  # 构造更新内容
         command = (f"UPDATE `{self.get_real_table_name(table)}` SET  "
                    f"{_update_data}"
                    f" WHERE {where_key}='{where_value}' ;"  # 构造WHERE语句
                    )
-        return self._write_db(command, kwargs)  # 执行SQL语句
+        return self._spool_write(table, command, kwargs)  # 执行SQL语句
 
     # 删除表或者数据库
     def _drop(self, option, name):
@@ -414,17 +906,17 @@ class MyBaseSQL(BaseSQL):
               ");")
         return self._write_db(_c)
 
-    def write_db(self, command, *args):
+    def write_db(self, command, *args, timeout=None):
         """write_db的外部访问"""
-        return self._write_db(command, *args)
+        return self._limited(timeout, self._write_db, command, *args)
 
-    def write_rows(self, c, *args):
+    def write_rows(self, c, *args, timeout=None):
         """write_rows的外部访问"""
-        return self._write_affair(c, *args)
+        return self._limited(timeout, self._write_affair, c, *args)
 
-    def read_db(self, command, args=None, result_type=None):
+    def read_db(self, command, args=None, result_type=None, table=None, timeout=None):
         """读取数据库的外部访问"""
-        return self._read_db(command, args, result_type)
+        return self._limited(timeout, self._read_db, command, args, result_type, table=table)
 
     def show_tables(self):
         """列出当前数据库的数据表"""
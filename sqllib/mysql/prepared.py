@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : prepared.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 15:10
+
+MySQL 服务端预处理语句(二进制协议)
+
+PyMySQL 在客户端拼接参数，每次都把完整的SQL文本交给服务器解析；
+MySqlPreparedAPI 改用 mysql-connector-python 的预处理游标：
+    1. 同一条SQL在一个连接上只 PREPARE 一次，之后只发送参数(COM_STMT_EXECUTE)
+    2. 结果集以二进制行返回
+    3. 每个连接维护一个以SQL文本为键的 LRU 预处理语句缓存
+    4. 重试 / 熔断、time_limit()、写后读主库与 spool 与 MySqlAPI 相同(执行路径只替换了最内层的语句执行)
+
+依赖(可选): pip install mysql-connector-python  或  pip install sqllib[prepared]
+"""
+import copy
+import re
+import sys
+from collections import OrderedDict
+
+from sqllib.common.error import *
+from .mysqlbase import MySqlAPI, logger
+
+try:
+    import mysql.connector as connector
+except ImportError:
+    connector = None
+
+__all__ = ['MySqlPreparedAPI']
+
+_RE_NAMED = re.compile(r'%\((\w+)\)s')
+
+
+class MySqlPreparedAPI(MySqlAPI):
+    """使用服务端预处理语句的 MySqlAPI
+
+    用法与 MySqlAPI 一致，额外参数：
+    :param stmt_cache_size: 每个连接缓存的预处理语句数量，超出时关闭最久未使用的语句
+
+    注意：预处理语句与连接绑定，因此不支持 DBUtils 连接池与读写分离；并发访问请使用 fork() 获取独立连接。
+    """
+
+    def __init__(self, host, port, user, passwd, db, charset='utf8', stmt_cache_size=128, **kwargs):
+        if connector is None:
+            raise SqlModuleError('MySqlPreparedAPI 需要安装 mysql-connector-python')
+        if kwargs.get('replicas'):
+            raise SqlModuleError('MySqlPreparedAPI 不支持读写分离(replicas)')
+        self.stmt_cache_size = stmt_cache_size
+        self._stmt_cache = OrderedDict()
+        super().__init__(host, port, user, passwd, db, charset, **kwargs)
+
+    def _connect(self, **override):
+        """建立 mysql-connector 连接；override 覆盖其中的参数"""
+        kwargs = dict(host=self.SQL_HOST,
+                      port=self.SQL_PORT,
+                      user=self.SQL_USER,
+                      password=self.SQL_PASSWD,
+                      database=self.SQL_DB,
+                      charset=self.SQL_CHARSET,
+                      **self._connect_kwargs
+                      )
+        if self.use_unicode is not None:
+            kwargs['use_unicode'] = self.use_unicode
+        kwargs.update(override)
+        return connector.connect(**kwargs)
+
+    def pooling_sql(self, *args, **kwargs):
+        raise SqlModuleError('预处理语句与连接绑定，MySqlPreparedAPI 不支持连接池；请使用 fork() 获取独立连接')
+
+    def fork(self, read_only=False):
+        """新建连接的浅拷贝，拥有独立的预处理语句缓存"""
+        _clone = copy.copy(self)
+        _clone._sql = self._connect()
+        _clone._stmt_cache = OrderedDict()
+        return _clone
+
+    def set_use_db(self, db_name):
+        """设置当前数据库"""
+        self._sql.database = db_name
+
+    def set_charset(self, charset):
+        """设置数据库链接字符集"""
+        return self._sql.set_charset_collation(charset)
+
+    def _clear_stmt_cache(self):
+        for _, cur in self._stmt_cache.values():
+            try:
+                cur.close()
+            except Exception:
+                pass
+        self._stmt_cache.clear()
+
+    def close(self):
+        """关闭缓存的预处理语句与连接"""
+        self._clear_stmt_cache()
+        self._sql.close()
+
+    def _reconnect(self):
+        """重连后服务端的预处理语句随旧会话失效，清空缓存"""
+        self._clear_stmt_cache()
+        try:
+            self._sql.ping(reconnect=True)
+            self.retry_metrics['reconnects'] += 1
+        except Exception as _e:
+            logger.warning(f'重新连接 {self.SQL_HOST}:{self.SQL_PORT} 失败: {_e}')
+
+    def _kill_target(self, _sql) -> tuple:
+        """mysql-connector 连接的线程ID为 connection_id"""
+        return self.SQL_HOST, self.SQL_PORT, self.SQL_USER, self.SQL_PASSWD, int(_sql.connection_id)
+
+    @property
+    def stmt_cache_info(self) -> list:
+        """当前连接缓存的SQL文本"""
+        return [_[0] for _ in self._stmt_cache]
+
+    def _prepared(self, command, args=None, dictionary=False):
+        """ 取出(或新建) command 对应的预处理游标
+
+        mysql-connector 只在传入的SQL与上一次是同一个对象时才跳过 PREPARE，
+        所以缓存中保存首次传入的SQL对象，之后总是用它执行。
+
+        :return: (游标, 用于执行的SQL对象, 位置参数)
+        """
+        if isinstance(args, dict):  # %(name)s -> %s，在这里转换，保证缓存命中
+            args = tuple(args[_] for _ in _RE_NAMED.findall(command))
+            command = _RE_NAMED.sub('%s', command)
+        elif args is not None and not isinstance(args, (tuple, list)):
+            args = (args,)
+
+        key = (command, dictionary)
+        if key in self._stmt_cache:
+            self._stmt_cache.move_to_end(key)
+        else:
+            self._stmt_cache[key] = (command, self._sql.cursor(prepared=True, dictionary=dictionary))
+            if len(self._stmt_cache) > self.stmt_cache_size:
+                _, (_, _old) = self._stmt_cache.popitem(last=False)
+                _old.close()
+        _op, cur = self._stmt_cache[key]
+        return cur, _op, args or ()
+
+    # 以下替换 MySqlAPI 最内层的语句执行，_write_db / _write_affair / _read_db 的重试、超时与 spool 仍然生效
+    def _write_once(self, command, args=None):
+        """执行一条预处理写入"""
+        with self._guard(self._sql):
+            cur, _op, args = self._prepared(command, args)
+            try:
+                cur.execute(_op, args)
+                self._sql.commit()
+                self._wrote()
+                return cur.rowcount
+            except Exception:
+                self._sql.rollback()
+                raise SqlWriteError(f'操作数据库时出现问题，数据库已回滚至操作前——\n{sys.exc_info()}\n\n{command}')
+
+    def _write_affair_once(self, command, args):
+        """同一条预处理语句执行多组参数，作为一个事务提交"""
+        with self._guard(self._sql):
+            cur, _op, _ = self._prepared(command)
+            try:
+                cur.executemany(_op, args)
+                self._sql.commit()
+                self._wrote()
+                return cur.rowcount
+            except Exception:
+                self._sql.rollback()
+                raise SqlWriteError("_write_rows() 操作数据库出错，已回滚 \n" + str(sys.exc_info()))
+
+    def _fetch(self, _sql, command, args=None, result_type=None, table=None):
+        """执行预处理查询
+
+        :param result_type: dict 返回字典，其余返回元组
+        :param table: 给出时按该表的声明类型转换结果
+        """
+        logger.debug(f'SQL: {command}')
+        # 不附加 MAX_EXECUTION_TIME：毫秒数每次不同，会让语句缓存失效；超时只靠 KILL QUERY 中断
+        with self._guard(_sql):
+            cur, _op, args = self._prepared(command, args, dictionary=result_type is dict)
+            cur.execute(_op, args)
+            results = cur.fetchall()
+        if table is not None:
+            results = self.convert_rows(table, cur.description, results)
+        return results
+
+    def _iter_db(self, command, args=None, batch_rows=1000, result_type=None):
+        """在独立连接上流式读取"""
+        _conn = self.fork()
+        try:
+            cur, _op, args = _conn._prepared(command, args, dictionary=result_type is dict)
+            cur.execute(_op, args)
+            while True:
+                rows = cur.fetchmany(batch_rows)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            _conn.close()
@@ -0,0 +1,215 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : replica.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 20:50
+
+MySQL 读写分离：一主多从的读路由
+
+    api = MySqlAPI('primary', 3306, 'user', 'pw', 'db',
+                   replicas=['replica-1', ('replica-2', 3307), {'host': 'replica-3', 'user': 'ro'}],
+                   read_policy='least_latency', sticky_seconds=1)
+    api.select('user', '*')                 # 从库
+    api.insert('user', name='a')            # 主库；sticky_seconds 内本线程的读也走主库(读到自己的写)
+    with api.on_primary():                  # 事务内 / 需要强一致的读
+        api.read_db('SELECT ... FOR UPDATE')
+
+    1. read_policy: 'round_robin' 轮询；'least_latency' 选择 ping 延迟(指数平均)最低的从库
+    2. 健康检查：距上次检查超过 health_interval 秒时由一个线程在锁外 ping 一次，其他线程按当前状态选择；
+       连接错误的从库下线 down_seconds 秒，期间读请求落到其他从库，全部不可用时回到主库
+    3. 非 SELECT / SHOW 语句、SELECT ... FOR UPDATE / LOCK IN SHARE MODE、主语句不是 SELECT 的 WITH 总是在主库执行
+    4. 每个从库在每个线程上持有一个独立连接(惰性建立)，并发读取不会共用同一个连接；close() 关闭所有线程的连接
+"""
+import itertools
+import logging
+import re
+import threading
+import time
+
+import pymysql
+
+__all__ = ['Replica', 'ReplicaRouter', 'is_connection_error']
+
+logger = logging.getLogger('mysql.replica')
+
+# 客户端连接类错误：无法连接、server has gone away、查询中连接丢失、连接断开
+CONNECTION_ERRORS = {2003, 2006, 2013, 2055}
+
+_RE_READ = re.compile(r'^\s*(\(\s*)?(SELECT|SHOW|WITH|DESC|DESCRIBE|EXPLAIN)\b', re.I)
+_RE_TOKEN = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|--[^\n]*|/\*.*?\*/|[()]|\w+", re.S)
+_MAIN_VERBS = {'SELECT', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE', 'TABLE', 'VALUES'}
+_RE_LOCKING = re.compile(r'\bFOR\s+UPDATE\b|\bLOCK\s+IN\s+SHARE\s+MODE\b|\bFOR\s+SHARE\b', re.I)
+
+
+def is_connection_error(err) -> bool:
+    """连接层面的错误(可以换一个连接重试)，而不是SQL本身的错误；支持 PyMySQL 与 mysql-connector 的错误"""
+    if isinstance(err, pymysql.err.InterfaceError):
+        return True
+    if isinstance(err, pymysql.err.OperationalError):
+        return bool(err.args) and err.args[0] in CONNECTION_ERRORS
+    # mysql-connector 是可选依赖，按模块名识别，错误号在 errno 中(2003 为 InterfaceError，2013 / 2055 为 OperationalError)
+    return type(err).__module__.startswith('mysql.connector') and getattr(err, 'errno', None) in CONNECTION_ERRORS
+
+
+def _with_main_verb(command) -> str:
+    """WITH 语句的主语句：跳过字符串、注释与括号内的 CTE 定义后，第一个顶层的 SELECT / UPDATE / DELETE 等"""
+    depth = 0
+    for token in _RE_TOKEN.findall(command):
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0 and token.upper() in _MAIN_VERBS:
+            return token.upper()
+    return ''
+
+
+def is_replica_read(command) -> bool:
+    """可以在从库执行的只读语句"""
+    match = _RE_READ.match(command)
+    if not match or _RE_LOCKING.search(command):
+        return False
+    return match.group(2).upper() != 'WITH' or _with_main_verb(command) == 'SELECT'
+
+
+class Replica:
+    """一个从库：每个线程惰性建立的连接、延迟与健康状态"""
+
+    def __init__(self, name, connect):
+        self.name = name
+        self._connect = connect
+        self._local = threading.local()
+        self._conns = []  # 所有线程的连接，close() 时关闭
+        self._lock = threading.Lock()
+        self._generation = 0  # 下线 / close() 后递增，各线程下次使用时重建连接
+        self.latency = None  # ping 延迟的指数平均(秒)
+        self.down_until = 0.0
+        self.failures = 0
+        self.reads = 0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def connection(self):
+        """本线程的连接"""
+        _l = self._local
+        conn = getattr(_l, 'conn', None)
+        if conn is not None and _l.generation != self._generation:
+            self._discard(conn)
+            conn = None
+        if conn is None:
+            conn = self._connect()
+            _l.conn, _l.generation = conn, self._generation
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            if conn in self._conns:
+                self._conns.remove(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def ping(self) -> bool:
+        """检查连接并更新延迟，失败返回 False"""
+        start = time.monotonic()
+        try:
+            self.connection().ping(reconnect=True)
+        except Exception as _e:
+            logger.warning(f'从库 {self.name} 健康检查失败: {_e}')
+            return False
+        _l = time.monotonic() - start
+        self.latency = _l if self.latency is None else self.latency * 0.7 + _l * 0.3
+        return True
+
+    def mark_down(self, seconds):
+        """下线；各线程的连接在下次使用时重建(不关闭其他线程可能正在使用的连接)"""
+        self.failures += 1
+        self.down_until = time.monotonic() + seconds
+        self._generation += 1
+
+    def close(self):
+        """关闭所有线程的连接"""
+        with self._lock:
+            conns, self._conns = self._conns, []
+            self._generation += 1
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def __repr__(self):
+        return f'<Replica {self.name} {"up" if self.healthy else "down"} latency={self.latency}>'
+
+
+class ReplicaRouter:
+    """ 从库选择与健康检查
+
+    :param replicas: [(name, connect), ...]，connect 为无参的连接工厂
+    :param policy: 'round_robin' | 'least_latency'
+    :param health_interval: 两次健康检查的最小间隔(秒)
+    :param down_seconds: 出错的从库下线时长(秒)
+    """
+
+    POLICIES = ('round_robin', 'least_latency')
+
+    def __init__(self, replicas, policy='round_robin', health_interval=30, down_seconds=30):
+        if policy not in self.POLICIES:
+            raise ValueError(f'read_policy 可选 {self.POLICIES}，而不是 {policy!r}')
+        self._specs = list(replicas)
+        self.replicas = [Replica(name, connect) for name, connect in self._specs]
+        self.policy = policy
+        self.health_interval = health_interval
+        self.down_seconds = down_seconds
+        self._counter = itertools.count()
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def fork(self):
+        """相同配置、不共享连接的路由器"""
+        return type(self)(self._specs, self.policy, self.health_interval, self.down_seconds)
+
+    def check(self):
+        """ping 所有(未下线的)从库，失败的下线"""
+        self._checked = time.monotonic()
+        for replica in self.replicas:
+            if replica.healthy and not replica.ping():
+                replica.mark_down(self.down_seconds)
+
+    def choose(self):
+        """选择一个健康的从库，没有时返回 None"""
+        with self._lock:  # 只由一个线程执行到期的健康检查
+            due = self._checked is None or time.monotonic() - self._checked >= self.health_interval
+            if due:
+                self._checked = time.monotonic()
+        if due:
+            self.check()  # 网络操作在锁外进行，不阻塞其他线程选择从库
+        with self._lock:
+            healthy = [_ for _ in self.replicas if _.healthy]
+            if not healthy:
+                return None
+            if self.policy == 'least_latency':
+                replica = min(healthy, key=lambda _: float('inf') if _.latency is None else _.latency)
+            else:
+                replica = healthy[next(self._counter) % len(healthy)]
+            replica.reads += 1
+            return replica
+
+    def mark_down(self, replica):
+        logger.warning(f'从库 {replica.name} 连接错误，下线 {self.down_seconds} 秒')
+        replica.mark_down(self.down_seconds)
+
+    def stats(self) -> list:
+        """[{'name', 'healthy', 'latency', 'reads', 'failures'}, ...]"""
+        return [{'name': _.name, 'healthy': _.healthy, 'latency': _.latency, 'reads': _.reads,
+                 'failures': _.failures} for _ in self.replicas]
+
+    def close(self):
+        for replica in self.replicas:
+            replica.close()
@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : spool.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 03:40
+
+主库不可用时的本地写入队列(spool)
+
+    api = MySqlAPI(..., spool='/var/lib/app/mysql.spool')     # 或 spool=WriteSpool(path, retry_interval=5)
+    api.insert('log', ts=..., msg=...)    # 连接错误或熔断时写入本地队列并返回 0，不抛出 SqlWriteError
+    api.replay_spool()                    # 手动重放；之后对同一张表的 insert / update 也会先尝试重放
+    MySqlAPI(..., spool=..., spool_replay_interval=10)     # 另起后台线程，每 10 秒重放一次积压
+
+    重放只在三种情况下发生：对同一张表的下一次 insert() / update()、手动 replay_spool()、
+    spool_replay_interval 的后台线程。不启用后台线程时，之后不再写入的表的积压会一直留在队列中，
+    直到调用 replay_spool()。
+
+    1. 只接管 insert() / update()；write_db() 等其他写入仍直接抛出错误
+    2. 队列是本地 SQLite 文件(WAL)，进程重启后仍在；参数以 pickle 保存，文件只应由本进程读写
+    3. 同一张表按入队顺序重放：该表有积压时新的写入也进入队列，排在积压之后
+    4. 重放时相邻的同一语句合并为一次 executemany；一批中出现 SQL 错误(如主键冲突)时逐条重放，
+       出错的一条标记为失败(failed() 查看)并跳过，不阻塞之后的写入
+    5. 投递语义是至少一次(at-least-once)，同一条写入可能执行两次：
+       - 连接错误可能发生在服务端已经提交之后(如 COMMIT 的应答丢失)，此时语句已生效，仍会入队并在恢复后再次执行；
+       - 重放的语句提交后才从队列删除，提交与删除之间进程退出会导致该批再次重放。
+       启用 spool 的表应让重复执行无害：insert(..., ignore_repeat=True)(INSERT IGNORE)配合主键 / 唯一键等自然键，
+       update() 写入绝对值而不是增量；自增主键且没有唯一约束的表会出现重复行
+    6. 两次尝试之间至少间隔 retry_interval 秒，期间的写入直接入队，不再等待连接超时
+"""
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger('sqllib.spool')
+
+__all__ = ['WriteSpool']
+
+
+class WriteSpool:
+    """ 持久化的写入队列
+
+    :param path: SQLite 文件路径
+    :param retry_interval: 数据库不可用后，多少秒内不再尝试连接
+    """
+
+    def __init__(self, path, retry_interval=5.0):
+        self.path = str(path)
+        self.retry_interval = retry_interval
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS spool (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                           'tbl TEXT NOT NULL, command TEXT NOT NULL, args BLOB, many INT NOT NULL, '
+                           'error TEXT, created REAL NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS spool_tbl ON spool (tbl, seq)')
+        self._lock = threading.Lock()
+        self._backlog = set(self.tables())  # 有待重放语句的表，insert() / update() 据此判断，不查询文件
+        self.replay_lock = threading.Lock()  # 同一时间只有一个线程重放
+        self._next_try = 0.0
+        self.stats = {'spooled': 0, 'replayed': 0, 'failed': 0}
+
+    def _execute(self, command, args=()):
+        with self._lock:
+            return self._conn.execute(command, args).fetchall()
+
+    def _sync_backlog(self):
+        """按文件内容重建 _backlog；调用时需持有 _lock"""
+        self._backlog = {_[0] for _ in self._conn.execute('SELECT DISTINCT tbl FROM spool WHERE error IS NULL')}
+
+    def append(self, table, command, args, many=False):
+        """写入一条语句；many=True 时 args 为多行参数(executemany)"""
+        with self._lock:
+            self._conn.execute('INSERT INTO spool (tbl, command, args, many, created) VALUES (?, ?, ?, ?, ?)',
+                               (table, command, pickle.dumps(args), int(many), time.time()))
+            self._backlog.add(table)
+        self.stats['spooled'] += 1
+
+    def has_backlog(self, table=None) -> bool:
+        """table(为 None 时任意表)是否有待重放的语句；只读内存，不访问队列文件"""
+        return bool(self._backlog) if table is None else table in self._backlog
+
+    def pending(self, table=None) -> int:
+        """待重放的语句数"""
+        if table is None:
+            return self._execute('SELECT COUNT(*) FROM spool WHERE error IS NULL')[0][0]
+        return self._execute('SELECT COUNT(*) FROM spool WHERE tbl = ? AND error IS NULL', (table,))[0][0]
+
+    def tables(self) -> list:
+        """有积压的表，按最早入队的顺序"""
+        return [_[0] for _ in self._execute('SELECT tbl FROM spool WHERE error IS NULL GROUP BY tbl ORDER BY MIN(seq)')]
+
+    def peek(self, table, limit=500) -> list:
+        """table 最早的 limit 条语句 [(seq, command, args, many)]"""
+        rows = self._execute('SELECT seq, command, args, many FROM spool WHERE tbl = ? AND error IS NULL '
+                             'ORDER BY seq LIMIT ?', (table, int(limit)))
+        return [(seq, command, pickle.loads(args), bool(many)) for seq, command, args, many in rows]
+
+    def remove(self, seqs):
+        """删除已重放的语句"""
+        with self._lock:
+            self._conn.executemany('DELETE FROM spool WHERE seq = ?', [(_,) for _ in seqs])
+            self._sync_backlog()
+        self.stats['replayed'] += len(seqs)
+
+    def fail(self, seq, error):
+        """标记重放失败的语句，之后不再重放"""
+        with self._lock:
+            self._conn.execute('UPDATE spool SET error = ? WHERE seq = ?', (str(error), seq))
+            self._sync_backlog()
+        self.stats['failed'] += 1
+
+    def failed(self) -> list:
+        """重放失败的语句 [{'seq', 'table', 'command', 'args', 'error', 'created'}]"""
+        rows = self._execute('SELECT seq, tbl, command, args, error, created FROM spool WHERE error IS NOT NULL '
+                             'ORDER BY seq')
+        return [{'seq': seq, 'table': tbl, 'command': command, 'args': pickle.loads(args), 'error': error,
+                 'created': created} for seq, tbl, command, args, error, created in rows]
+
+    def discard(self, seqs=None):
+        """删除失败的语句(seqs 为 None 时全部)"""
+        if seqs is None:
+            self._execute('DELETE FROM spool WHERE error IS NOT NULL')
+        else:
+            with self._lock:
+                self._conn.executemany('DELETE FROM spool WHERE seq = ? AND error IS NOT NULL',
+                                       [(_,) for _ in seqs])
+
+    # 数据库可用状态
+    def due(self) -> bool:
+        """是否可以尝试访问数据库"""
+        return time.monotonic() >= self._next_try
+
+    def backoff(self):
+        """数据库不可用，retry_interval 秒内不再尝试"""
+        self._next_try = time.monotonic() + self.retry_interval
+
+    def recovered(self):
+        self._next_try = 0.0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        return self.pending()
+
+    def __repr__(self):
+        return f'<WriteSpool {self.path} pending={self.pending()}>'
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_aggregate.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 00:45
+
+UNITTEST for 聚合下推
+"""
+import unittest
+
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.aggregate import aggregate, columnar
+from sqllib.common.error import *
+from sqllib.common.query import Query
+
+
+class _FakeAPI:
+    """记录生成的SQL，不执行"""
+
+    def __init__(self, dialect):
+        self.DIALECT = dialect
+        self.executed = []
+
+    @staticmethod
+    def get_real_table_name(name):
+        return name
+
+    def query(self, table):
+        return Query(self, table)
+
+    def read_db(self, command, args=None, result_type=None):
+        self.executed.append((command, args))
+        return []
+
+
+class TESTAggregate(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.sql = SQLiteAPI(':memory:', prefix='A_')
+        cls.sql.create_table('orders', 'id INTEGER PRIMARY KEY, city TEXT, uid INT, amount INT, status TEXT')
+        cls.sql.write_rows('INSERT INTO A_orders (city, uid, amount, status) VALUES (?, ?, ?, ?)',
+                           [('SZ', 1, 10, 'paid'), ('SZ', 1, 20, 'paid'), ('SZ', 2, 30, 'paid'),
+                            ('BJ', 3, 5, 'paid'), ('BJ', 3, 100, 'refund')])
+
+    def test_01_grouped(self):
+        result = self.sql.aggregate('orders', group_by=['city'], where={'status': 'paid'}, order_by='-s',
+                                    metrics={'n': 'COUNT(*)', 's': ('sum', 'amount'), 'avg': ('avg', 'amount'),
+                                             'users': ('count_distinct', 'uid'), 'hi': ('max', 'amount')})
+        self.assertEqual({'city': ['SZ', 'BJ'], 'n': [3, 1], 's': [60, 5], 'avg': [20.0, 5.0], 'users': [2, 1],
+                          'hi': [30, 5]}, result)
+
+    def test_02_total_and_empty(self):
+        self.assertEqual({'count': [5]}, self.sql.aggregate('orders'))
+        self.assertEqual({'city': [], 'n': []}, self.sql.aggregate('orders', 'city', {'n': ('count', None)},
+                                                                   where='amount > 1000'))
+        result = self.sql.aggregate('orders', 'city', {'n': ('count', '*')}, having='COUNT(*) > 2', limit=1)
+        self.assertEqual({'city': ['SZ'], 'n': [3]}, result)
+
+    def test_03_dialects(self):
+        mysql, mssql = _FakeAPI('mysql'), _FakeAPI('mssql')
+        for api in (mysql, mssql):
+            aggregate(api, 'orders', ['city'], {'avg': ('avg', 'amount'), 'sd': ('stddev', 'amount')},
+                      where={'amount__gt': 1}, limit=5)
+        self.assertEqual(('SELECT `city`, AVG(`amount`) AS `avg`, STDDEV_SAMP(`amount`) AS `sd` FROM `orders` '
+                          'WHERE `amount` > %s GROUP BY `city` LIMIT 5', (1,)), mysql.executed[0])
+        self.assertEqual(('SELECT TOP 5 [city], AVG(CAST([amount] AS FLOAT)) AS [avg], STDEV([amount]) AS [sd] '
+                          'FROM [orders] WHERE [amount] > %s GROUP BY [city]', (1,)), mssql.executed[0])
+        with self.assertRaises(SqlModuleError):
+            self.sql.aggregate('orders', metrics={'sd': ('stddev', 'amount')})
+
+    def test_04_columnar(self):
+        self.assertEqual({'a': [1, 3], 'b': [2, 4]}, columnar(['a', 'b'], [(1, 2), (3, 4)]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_batch.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 03:20
+
+UNITTEST for 按键批量读取
+"""
+import asyncio
+import sqlite3
+import threading
+import unittest
+import unittest.mock
+
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.batch import BatchLoader, chunked, get_many
+from sqllib.common.query import Query
+
+
+class _FakeAPI:
+    """记录每条语句的参数与执行线程，按参数返回 {'id': v, 'v': v * 10}"""
+
+    def __init__(self, dialect, max_params, max_bytes=None, concurrent=False):
+        self.DIALECT = dialect
+        self.MAX_IN_PARAMS = max_params
+        self.MAX_IN_BYTES = max_bytes
+        self.concurrent_reads = concurrent
+        self.executed = []
+
+    @staticmethod
+    def get_real_table_name(name):
+        return name
+
+    def query(self, table):
+        return Query(self, table)
+
+    def get_many(self, table, key, values, cols=None, result_type=None):
+        return get_many(self, table, key, values, cols, result_type)
+
+    def read_db(self, command, args=None, result_type=None):
+        self.executed.append((command, args, threading.current_thread().name))
+        return [{'id': _, 'v': _ * 10} for _ in args if _ % 2 == 0]
+
+
+class TESTBatch(unittest.TestCase):
+
+    def test_01_chunked(self):
+        self.assertEqual([[1, 2], [3, 4], [5]], list(chunked(range(1, 6), 2)))
+        self.assertEqual([], list(chunked([], 2)))
+        # 字面量长度：'aaaa' 按 8 字节估算
+        self.assertEqual([['aaaa', 'aaaa'], ['aaaa']], list(chunked(['aaaa'] * 3, 100, max_bytes=16)))
+        self.assertEqual([['x' * 50], ['y']], list(chunked(['x' * 50, 'y'], 100, max_bytes=10)))  # 单个超长的值单独成批
+
+    def test_02_sqlite(self):
+        sql = SQLiteAPI(':memory:', prefix='B_')
+        sql.create_table('user', 'id INTEGER PRIMARY KEY, name TEXT, age INT')
+        sql.write_rows('INSERT INTO B_user VALUES (?, ?, ?)', [(_, f'u{_}', _ % 50) for _ in range(3000)])
+        self.assertGreaterEqual(sql.MAX_IN_PARAMS, 999)
+        keys = list(range(0, 6000, 2))
+        rows = sql.get_many('user', 'id', keys + keys[:10], cols=['name'])
+        self.assertEqual(1500, len(rows))
+        self.assertEqual(('u42', 42), (rows[42][1], rows[42][0]))  # key 自动加在最前
+        self.assertNotIn(3002, rows)
+        self.assertEqual({'id': 7, 'name': 'u7', 'age': 7}, sql.get_many('user', 'id', [7], result_type=dict)[7])
+        self.assertEqual((5, 'u5', 5), sql.get_many('user', 'id', iter([5]))[5])
+        self.assertEqual({}, sql.get_many('user', 'id', []))
+        sql.close()
+
+    def test_03_chunks_per_backend(self):
+        for dialect, limit in (('mssql', 2000), ('mysql', 1000)):
+            api = _FakeAPI(dialect, limit)
+            rows = get_many(api, 't', 'id', range(4500))
+            self.assertEqual([limit, limit, 4500 - 2 * limit] if limit == 2000 else [1000] * 4 + [500],
+                             [len(_[1]) for _ in api.executed])
+            self.assertEqual(2250, len(rows))
+            self.assertEqual((10, 100), rows[10])
+        api = _FakeAPI('mysql', 1000, max_bytes=1000)
+        get_many(api, 't', 'id', range(1000))
+        self.assertGreater(len(api.executed), 1)
+        self.assertIn('[id] IN (%s', _FakeAPI('mssql', 10).query('t').where(id__in=[1]).sql)
+
+    def test_04_concurrent(self):
+        api = _FakeAPI('mysql', 10, concurrent=True)
+        rows = get_many(api, 't', 'id', range(100), workers=4)
+        self.assertEqual(10, len(api.executed))
+        self.assertEqual(50, len(rows))
+        self.assertTrue(all(_[2].startswith('sqllib-get-many') for _ in api.executed))
+        api = _FakeAPI('mysql', 10)  # 不支持并发时在调用线程中依次执行
+        get_many(api, 't', 'id', range(100), workers=4)
+        self.assertEqual({threading.current_thread().name}, {_[2] for _ in api.executed})
+
+
+class TESTBatchLoader(unittest.TestCase):
+
+    def test_01_threads(self):
+        api = _FakeAPI('mysql', 1000)
+        loader = BatchLoader(api, 't', 'id', window=0.05)
+        barrier, results = threading.Barrier(8), {}
+
+        def _worker(n):
+            barrier.wait()
+            results[n] = loader.load(n % 4)
+
+        threads = [threading.Thread(target=_worker, args=(_,)) for _ in range(8)]
+        [_.start() for _ in threads]
+        [_.join() for _ in threads]
+        self.assertEqual(1, len(api.executed))  # 8 个请求、4 个不同的键合并为一次查询
+        self.assertEqual([0, 1, 2, 3], sorted(api.executed[0][1]))
+        self.assertEqual((2, 20), results[6])
+        self.assertIsNone(results[5])
+        self.assertEqual({'loads': 8, 'keys': 4, 'batches': 1}, loader.stats)
+
+    def test_02_sqlite_and_asyncio(self):
+        sql = SQLiteAPI(':memory:', prefix='L_', check_same_thread=False)  # aload() 在线程池中查询
+        sql.create_table('user', 'id INTEGER PRIMARY KEY, name TEXT')
+        sql.insert('user', id=[1, 2, 3], name=['a', 'b', 'c'])
+        users = sql.batch_loader('user', 'id', cols=['name'], window=0.01)
+        self.assertEqual([(1, 'a'), None, (3, 'c')], users.load_many([1, 9, 3]))
+        self.assertEqual([], users.load_many([]))
+
+        async def _main():
+            return await asyncio.gather(*(users.aload(_) for _ in (1, 2, 2, 4)))
+
+        self.assertEqual([(1, 'a'), (2, 'b'), (2, 'b'), None], asyncio.run(_main()))
+        self.assertEqual(2, users.stats['batches'])
+        sql.close()
+
+    def test_03_error(self):
+        sql = SQLiteAPI(':memory:')
+        loader = sql.batch_loader('nope', 'id', window=0)
+        with self.assertRaises(sqlite3.OperationalError):
+            loader.load(1)
+        self.assertEqual({}, loader._pending)  # 出错后可以继续使用
+        sql.close()
+
+    def test_04_cancel_leader(self):
+        api = _FakeAPI('mysql', 1000)
+        loader = BatchLoader(api, 't', 'id', window=0.2)
+
+        async def _main():
+            leader = asyncio.ensure_future(loader.aload(2))
+            await asyncio.sleep(0.01)  # leader 进入收集窗口
+            follower = asyncio.ensure_future(loader.aload(4))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            follower_row = await asyncio.wait_for(follower, 2)
+            return leader.cancelled(), follower_row, await asyncio.wait_for(loader.aload(6), 2)
+
+        self.assertEqual((True, (4, 40), (6, 60)), asyncio.run(_main()))
+        self.assertFalse(loader._collecting)
+        self.assertEqual([2, 4], sorted(api.executed[0][1]))
+        self.assertNotEqual(threading.current_thread().name, api.executed[0][2])  # 查询不在事件循环线程中执行
+
+    def test_05_interrupt_leader(self):
+        api = _FakeAPI('mysql', 1000)
+        loader = BatchLoader(api, 't', 'id', window=0)
+        with unittest.mock.patch('sqllib.common.batch.time.sleep', side_effect=KeyboardInterrupt):
+            self.assertRaises(KeyboardInterrupt, loader.load, 2)
+        self.assertEqual((2, 20), loader.load(2))  # 中断后仍可使用
+        self.assertEqual(2, len(api.executed))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_cdc.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 01:20
+
+UNITTEST for SQLite 变更捕获
+"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.error import *
+
+
+class TESTCDC(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.sql = SQLiteAPI(':memory:', prefix='D_')
+        self.sql.create_table('user', 'id INTEGER PRIMARY KEY, name TEXT')
+        self.sql.create_table('pair', 'a INT, b INT, v TEXT, PRIMARY KEY (a, b)')
+
+    def test_01_changes(self):
+        self.assertEqual([], list(self.sql.changes()))
+        self.sql.enable_cdc('user')
+        pos = self.sql.cdc_position()
+        self.sql.insert('user', id=[1, 2], name=['a', 'b'])
+        self.sql.update('user', 'id', 1, name='A')
+        self.sql.delete('user', 'id', 2)
+        self.assertEqual([('I', 1), ('I', 2), ('U', 1), ('D', 2)],
+                         [(_['op'], _['key']) for _ in self.sql.changes(since=pos)])
+        seqs = [_['seq'] for _ in self.sql.changes(batch_rows=1)]  # 分批读取不丢不重
+        self.assertEqual(sorted(set(seqs)), seqs)
+        self.assertEqual(4, len(seqs))
+        self.sql.prune_changes(seqs[1])
+        self.assertEqual(seqs[2:], [_['seq'] for _ in self.sql.changes()])
+
+    def test_02_data_and_key_change(self):
+        self.sql.enable_cdc('pair', with_data=True)
+        self.sql.write_db('INSERT INTO D_pair VALUES (1, 2, "x")')
+        self.sql.write_db('UPDATE D_pair SET b=3 WHERE a=1')
+        changes = list(self.sql.changes(table='pair'))
+        self.assertEqual(('I', '[1,2]', {'a': 1, 'b': 2, 'v': 'x'}), (changes[0]['op'], changes[0]['key'],
+                                                                     changes[0]['data']))
+        self.assertEqual([('D', '[1,2]'), ('U', '[1,3]')], [(_['op'], _['key']) for _ in changes[1:]])
+        self.assertEqual([], list(self.sql.changes(table='user')))
+
+    def test_03_notify(self):
+        seen = []
+        self.sql.enable_cdc('user', notify=lambda *_: seen.append(_))
+        self.sql.insert('user', id=7, name='n')
+        self.sql.delete('user', 'id', 7)
+        self.assertEqual([('D_user', 'I', 7), ('D_user', 'D', 7)], seen)
+        self.sql.enable_cdc('user')  # 重新安装，取消回调
+        self.sql.insert('user', id=8, name='m')
+        self.assertEqual(2, len(seen))
+        self.assertEqual(3, len(list(self.sql.changes())))
+
+    def test_04_disable(self):
+        self.sql.enable_cdc('user', notify=print)
+        self.sql.disable_cdc('user')
+        self.sql.insert('user', id=1, name='a')
+        self.assertEqual([], list(self.sql.changes()))
+        with self.assertRaises(SqlKeyNameError):
+            self.sql.enable_cdc('nope')
+
+    def test_05_other_connection(self):
+        workdir = Path(tempfile.mkdtemp())
+        try:
+            sql = SQLiteAPI(str(workdir / 'cdc.db'))
+            sql.create_table('t', 'k TEXT PRIMARY KEY, v INT')
+            sql.enable_cdc('t')
+            other = sql.fork()
+            other.insert('t', k='x', v=1)  # 其他连接的写入同样被记录
+            self.assertEqual([('I', 'x')], [(_['op'], _['key']) for _ in sql.changes()])
+            other.close()
+            sql.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_convert.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 20:30
+
+UNITTEST for 按声明类型的结果集转换
+"""
+import unittest
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.convert import ConverterPlan, converter_for
+
+
+class TESTConvert(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.sql = SQLiteAPI(':memory:', prefix='C_', convert_types=True)
+        cls.sql.create_table('t', 'id INTEGER PRIMARY KEY, ts DATETIME, d DATE, price DECIMAL(10,2), '
+                                  'info JSON, raw BLOB, name TEXT')
+        cls.sql.write_db("INSERT INTO C_t (ts, d, price, info, raw, name) VALUES "
+                         "('2021-1-9 17:28:16', '2021-01-09', '1.10', '{\"a\": [1, 2]}', X'0102', 'x'), "
+                         "(NULL, NULL, NULL, NULL, NULL, 'y')")
+
+    def test_01_converter_for(self):
+        self.assertIsNone(converter_for('TEXT'))
+        self.assertIsNone(converter_for('int(11)'))
+        self.assertIsNotNone(converter_for('datetime'))
+        self.assertIsNotNone(converter_for('varbinary(16)'))
+        plan = ConverterPlan({'a': 'INT', 'b': 'DECIMAL(8,2)'})
+        self.assertEqual([(1, 'b', converter_for('DECIMAL'))], plan.bind(('a', 'b')))
+        self.assertIs(plan.bind(('a', 'b')), plan.bind(['a', 'b']))  # 绑定结果按列名组合缓存
+
+    def test_02_select(self):
+        row = self.sql.select('t', '*', WHERE='id=1')[0]
+        self.assertEqual((1, datetime(2021, 1, 9, 17, 28, 16), date(2021, 1, 9), Decimal('1.10'),
+                          {'a': [1, 2]}, b'\x01\x02', 'x'), row)
+        self.assertEqual((2, None, None, None, None, None, 'y'), self.sql.select('t', '*', WHERE='id=2')[0])
+
+    def test_03_dict_and_alias(self):
+        row = self.sql.select('t', 'price', 'ts AS created', result_type=dict, WHERE='id=1')[0]
+        self.assertEqual(Decimal('1.10'), row['price'])
+        self.assertEqual('2021-1-9 17:28:16', row['created'])  # 别名不在表的列中，不转换
+
+    def test_04_query_and_read_db(self):
+        self.assertEqual({'a': [1, 2]}, self.sql.query('t').select('info').where(id=1).first()[0])
+        self.assertEqual('{"a": [1, 2]}', self.sql.read_db('SELECT info FROM C_t WHERE id=1')[0][0])
+        self.assertEqual({'a': [1, 2]}, self.sql.read_db('SELECT info FROM C_t WHERE id=1', table='t')[0][0])
+
+    def test_05_plan_cache(self):
+        self.assertIs(self.sql.converter_plan('t'), self.sql.converter_plan('C_t'))
+        self.sql.alter_table('t', 'ADD COLUMN amount NUMERIC')
+        self.sql.write_db("UPDATE C_t SET amount='3' WHERE id=1")
+        self.assertEqual(Decimal('3'), self.sql.select('t', 'amount', WHERE='id=1')[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_explain.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 23:30
+
+UNITTEST for 执行计划分析与索引建议
+"""
+import threading
+import unittest
+
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.explain import parse_mysql
+
+
+class TESTExplain(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.sql = SQLiteAPI(':memory:', prefix='E_')
+        cls.sql.create_table('user', 'id INTEGER PRIMARY KEY, name TEXT, age INT, city TEXT')
+        cls.sql.create_table('orders', 'id INTEGER PRIMARY KEY, uid INT, amount REAL')
+
+    def test_01_sqlite_plan(self):
+        plan = self.sql.explain('SELECT * FROM E_user WHERE name=?', ('a',))
+        self.assertEqual(['E_user'], plan.full_scans)
+        self.assertFalse(plan.ok)
+        plan = self.sql.explain(self.sql.query('user').where(id=1))
+        self.assertTrue(plan.ok)
+        self.assertEqual(('search', 'PRIMARY'), (plan.steps[0]['access'], plan.steps[0]['index']))
+        self.assertTrue(self.sql.explain('SELECT city FROM E_user GROUP BY city').temp_btree)
+
+    def test_02_create_index(self):
+        self.sql.create_index('user', ['city', 'age DESC'])
+        plan = self.sql.explain('SELECT * FROM E_user WHERE city=? ORDER BY age DESC', ('x',))
+        self.assertTrue(plan.ok)
+        self.assertEqual('idx_E_user_city_age', plan.steps[0]['index'])
+        self.sql.drop_index('idx_E_user_city_age')
+        self.assertFalse(self.sql.explain('SELECT * FROM E_user WHERE city=?', ('x',)).ok)
+
+    def test_03_advisor(self):
+        advisor = self.sql.index_advisor()
+        with advisor.watch():
+            self.sql.select('user', '*', WHERE="name='a'")
+            self.sql.select('user', '*', WHERE="name='b'")
+            self.sql.read_db('SELECT u.name FROM E_user AS u JOIN E_orders o ON o.uid = u.id WHERE u.city=?', ('x',))
+            self.sql.select('user', 'id', WHERE='id=1')
+        self.sql.select('user', '*', WHERE="age=1")  # watch() 之外不记录
+        suggestions = advisor.suggestions()
+        self.assertEqual([('E_user', ['name'], 2), ('E_orders', ['uid'], 1)],
+                         [(_['table'], _['columns'], _['count']) for _ in suggestions])
+        self.assertEqual('CREATE INDEX `idx_E_user_name` ON `E_user` (`name`)', suggestions[0]['sql'])
+        self.sql.write_db(suggestions[0]['sql'])
+        self.assertEqual([('E_orders', ['uid'], 1)], [(_['table'], _['columns'], _['count'])
+                                                      for _ in advisor.suggestions()])
+
+    def test_04_parse_mysql(self):
+        doc = {'query_block': {'select_id': 1, 'ordering_operation': {
+            'using_filesort': True, 'nested_loop': [
+                {'table': {'table_name': 'u', 'access_type': 'ALL', 'rows_examined_per_scan': 100}},
+                {'table': {'table_name': 'o', 'access_type': 'ref', 'key': 'idx_uid'}}]}}}
+        steps = parse_mysql(doc)
+        self.assertEqual([True, False], [_['full_scan'] for _ in steps if _['table']])
+        self.assertEqual('idx_uid', steps[-1]['index'])
+        self.assertTrue(any(_['temp_btree'] for _ in steps))
+
+    def test_05_nested_watch(self):
+        sql = SQLiteAPI(':memory:', check_same_thread=False)
+        sql.create_table('t', 'id INTEGER PRIMARY KEY, v TEXT')
+        outer, inner = sql.index_advisor(), sql.index_advisor()
+        with outer.watch():
+            sql.read_db('SELECT 1')
+            with inner.watch():
+                sql.read_db('SELECT 2')
+                _t = threading.Thread(target=sql.read_db, args=('SELECT 3',))  # 其他线程的查询不记录
+                _t.start()
+                _t.join()
+            sql.read_db('SELECT 4')  # 内层退出后外层仍在记录
+        sql.read_db('SELECT 5')
+        self.assertEqual(['SELECT 1', 'SELECT 2', 'SELECT 4'], list(outer._queries))
+        self.assertEqual(['SELECT 2'], list(inner._queries))
+        self.assertEqual((), sql._read_observers)
+        self.assertNotIn('_read_db', vars(sql))
+        sql.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_hot.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 03:00
+
+UNITTEST for 热点表的进程内副本
+"""
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.error import *
+
+
+class TESTHotTable(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.sql = SQLiteAPI(':memory:', prefix='H_')
+        self.sql.create_table('city', 'code TEXT PRIMARY KEY, name TEXT, ver INT')
+        self.sql.insert('city', code=['SZ', 'BJ'], name=['深圳', '北京'], ver=[1, 1])
+
+    def test_01_lookup(self):
+        hot = self.sql.hot_table('city', 'code', refresh_interval=None, result_type=dict)
+        self.assertEqual({'code': 'SZ', 'name': '深圳', 'ver': 1}, hot.get('SZ'))
+        self.assertEqual('?', hot.get('XX', '?'))
+        self.assertEqual(['BJ'], list(hot.get_many(['BJ', 'XX'])))
+        self.assertEqual((2, 'SZ' in hot), (len(hot), True))
+        self.assertEqual({'hits': 2, 'misses': 2}, {k: hot.stats[k] for k in ('hits', 'misses')})
+
+    def test_02_full_reload(self):
+        hot = self.sql.hot_table('city', 'code', refresh_interval=None, cols=['name'])
+        self.assertEqual(['name', 'code'], hot.cols)  # 键总是被缓存
+        self.sql.delete('city', 'code', 'BJ')
+        self.assertEqual(1, hot.refresh())
+        self.assertIsNone(hot.get('BJ'))
+
+    def test_03_watermark(self):
+        hot = self.sql.hot_table('city', 'code', refresh_interval=None, watermark_col='ver')
+        self.sql.update('city', 'code', 'SZ', name='Shenzhen', ver=2)
+        self.sql.insert('city', code='GZ', name='广州', ver=2)
+        self.assertEqual(2, hot.refresh())  # 装载时的水位为 1，BJ 被再次读到但没有变化
+        before = hot._rows
+        self.assertEqual(0, hot.refresh())  # 之后只拉取 ver >= 2 的行，都没有变化
+        self.assertIs(before, hot._rows)  # 没有变化时不复制
+        self.assertEqual('Shenzhen', hot.get('SZ')[1])
+        self.assertEqual(3, len(hot))
+        with self.assertRaises(SqlModuleError):
+            self.sql.hot_table('city', 'code', watermark_col='ver', cdc=True)
+
+    def test_04_cdc(self):
+        self.sql.create_table('pair', 'a INT, b INT, v TEXT, PRIMARY KEY (a, b)')
+        self.sql.enable_cdc('pair')
+        self.sql.insert('pair', a=[1, 1], b=[1, 2], v=['x', 'y'])
+        hot = self.sql.hot_table('pair', ['a', 'b'], refresh_interval=None, cdc=True)
+        self.assertEqual('x', hot.get((1, 1))[2])
+        self.sql.write_db('UPDATE H_pair SET v="X" WHERE a=1 AND b=1')
+        self.sql.write_db('DELETE FROM H_pair WHERE b=2')
+        self.sql.insert('pair', a=2, b=1, v='z')
+        self.assertEqual(3, hot.refresh())
+        self.assertEqual({(1, 1): (1, 1, 'X'), (2, 1): (2, 1, 'z')}, hot.get_many([(1, 1), (1, 2), (2, 1)]))
+        self.assertEqual(0, hot.refresh())
+
+    def test_05_copy_on_write(self):
+        self.sql.enable_cdc('city')
+        hot = self.sql.hot_table('city', 'code', refresh_interval=None, cdc=True)
+        before = hot._rows
+        self.sql.update('city', 'code', 'SZ', name='Shenzhen')
+        self.sql.delete('city', 'code', 'BJ')
+        real_read = self.sql.read_db
+
+        def _broken(command, *args, **kwargs):
+            if command.startswith('SELECT `code`'):
+                raise RuntimeError('boom')
+            return real_read(command, *args, **kwargs)
+
+        self.sql.read_db = _broken
+        self.assertRaises(RuntimeError, hot.refresh)  # 失败的刷新不改变旧数据与变更位置
+        del self.sql.read_db
+        self.assertEqual({'SZ': ('SZ', '深圳', 1), 'BJ': ('BJ', '北京', 1)}, hot.get_many(['SZ', 'BJ']))
+        self.assertEqual(2, hot.refresh())
+        self.assertIsNot(before, hot._rows)  # 旧的字典保持不变，持有它的读者不受影响
+        self.assertEqual(('SZ', '深圳', 1), before['SZ'])
+        self.assertEqual((('SZ', 'Shenzhen', 1), None), (hot.get('SZ'), hot.get('BJ')))
+
+    def test_06_background(self):
+        with self.assertRaises(SqlModuleError):
+            self.sql.hot_table('city', 'code', refresh_interval=1)
+        workdir = Path(tempfile.mkdtemp())
+        try:
+            sql = SQLiteAPI(str(workdir / 'hot.db'))
+            sql.create_table('t', 'k INTEGER PRIMARY KEY, v TEXT')
+            sql.insert('t', k=1, v='a')
+            with sql.hot_table('t', 'k', refresh_interval=0.05) as hot:
+                sql.insert('t', k=2, v='b')
+                deadline = time.monotonic() + 5
+                while hot.get(2) is None and time.monotonic() < deadline:
+                    time.sleep(0.02)
+                self.assertEqual((2, 'b'), hot.get(2))
+            self.assertFalse(hot._thread.is_alive())
+            self.assertIsNone(hot._reader)
+            sql.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
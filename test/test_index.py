@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_index.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 23:40
+
+UNITTEST for 索引管理与批量导入时的延迟建索引
+"""
+import threading
+import unittest
+
+import pymysql
+
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.base_sql import BaseSQLAPI
+from sqllib.common.error import *
+from sqllib.mysql.mysqlbase import MyBaseSQL
+
+
+class TESTSQLiteIndex(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.sql = SQLiteAPI(':memory:', prefix='I_')
+        self.sql.create_table('user', 'id INTEGER PRIMARY KEY, name TEXT UNIQUE, city TEXT, age INT')
+        self.sql.create_index('user', ['city', 'age DESC'])
+        self.sql.create_index('user', 'age', name='idx_age')
+
+    def test_01_list_indexes(self):
+        indexes = {_['name']: _ for _ in self.sql.list_indexes('user')}
+        self.assertEqual(['city', 'age'], indexes['idx_I_user_city_age']['columns'])
+        self.assertIn('DESC', indexes['idx_I_user_city_age']['sql'])
+        auto = [_ for _ in indexes.values() if _['unique']]
+        self.assertEqual(1, len(auto))
+        self.assertEqual(['name'], auto[0]['columns'])
+        self.assertIsNone(auto[0]['sql'])  # UNIQUE 约束的索引不能单独删除
+        self.assertEqual(['idx_I_user_city_age', 'idx_age'], [_ for _ in indexes if _.startswith('idx')])
+
+    def test_02_rebuild(self):
+        self.sql.rebuild_index('user')
+        self.sql.rebuild_index('user', 'idx_age')
+        self.assertEqual(3, len(self.sql.list_indexes('user')))
+
+    def test_03_deferred(self):
+        with self.sql.deferred_indexes('user') as deferred:
+            self.assertEqual({'idx_I_user_city_age', 'idx_age'}, {_['name'] for _ in deferred})
+            self.assertEqual(1, len(self.sql.list_indexes('user')))
+            self.sql.insert('user', name=[f'n{_}' for _ in range(100)], city=['x'] * 100, age=list(range(100)))
+        self.assertEqual(3, len(self.sql.list_indexes('user')))
+        self.assertIn('idx_age', self.sql.explain('SELECT * FROM I_user WHERE age=?', (1,)).steps[0]['index'])
+
+    def test_04_deferred_restores_on_error(self):
+        with self.assertRaises(ZeroDivisionError):
+            with self.sql.deferred_indexes('user'):
+                1 / 0
+        self.assertEqual(3, len(self.sql.list_indexes('user')))
+
+
+class _FakeMySQL:
+    """只带索引管理需要的属性；SHOW INDEX 返回固定的行，记录执行的DDL"""
+    _online_ddl = MyBaseSQL._online_ddl
+    list_indexes = MyBaseSQL.list_indexes
+    create_index = MyBaseSQL.create_index
+    drop_index = MyBaseSQL.drop_index
+    rebuild_index = MyBaseSQL.rebuild_index
+    _restore_indexes = MyBaseSQL._restore_indexes
+    deferred_indexes = BaseSQLAPI.deferred_indexes
+    on_primary = MyBaseSQL.on_primary
+
+    def __init__(self, online=True):
+        self.online = online
+        self.executed = []
+        self._local = threading.local()
+
+    @staticmethod
+    def get_real_table_name(name):
+        return name
+
+    def _read_db(self, command, args=None, result_type=None):
+        def _row(key, seq, column, non_unique=1, sub_part=None, collation='A', index_type='BTREE'):
+            return {'Key_name': key, 'Seq_in_index': seq, 'Column_name': column, 'Non_unique': non_unique,
+                    'Sub_part': sub_part, 'Collation': collation, 'Index_type': index_type, 'Visible': 'YES'}
+        return [_row('PRIMARY', 1, 'id', 0), _row('uk_name', 1, 'name', 0),
+                _row('idx_city_age', 1, 'city', sub_part=10), _row('idx_city_age', 2, 'age', collation='D'),
+                _row('ft_bio', 1, 'bio', index_type='FULLTEXT')]
+
+    def _write_db(self, command, args=None):
+        try:
+            if not self.online and 'ALGORITHM' in command:
+                raise pymysql.err.OperationalError(1846, 'ALGORITHM=INPLACE is not supported')
+        except Exception:
+            raise SqlWriteError(command)
+        self.executed.append(command)
+        return 0
+
+
+class TESTMySQLIndex(unittest.TestCase):
+
+    def test_01_list_indexes(self):
+        indexes = {_['name']: _ for _ in _FakeMySQL().list_indexes('user')}
+        self.assertTrue(indexes['PRIMARY']['primary'])
+        self.assertIsNone(indexes['PRIMARY']['sql'])
+        self.assertTrue(indexes['uk_name']['unique'])
+        self.assertEqual(['city', 'age'], indexes['idx_city_age']['columns'])
+        self.assertEqual('INDEX `idx_city_age` (`city`(10), `age` DESC)', indexes['idx_city_age']['definition'])
+        self.assertEqual('FULLTEXT INDEX `ft_bio` (`bio`)', indexes['ft_bio']['definition'])
+
+    def test_02_online(self):
+        api = _FakeMySQL()
+        api.create_index('user', 'city')
+        api.drop_index('idx_user_city', 'user')
+        api.rebuild_index('user')
+        self.assertEqual(['CREATE INDEX `idx_user_city` ON `user` (`city`) ALGORITHM=INPLACE LOCK=NONE',
+                          'DROP INDEX `idx_user_city` ON `user` ALGORITHM=INPLACE LOCK=NONE',
+                          'ALTER TABLE `user` FORCE, ALGORITHM=INPLACE, LOCK=NONE'], api.executed)
+
+    def test_03_fallback(self):
+        api = _FakeMySQL(online=False)
+        api.rebuild_index('user', 'idx_city_age')
+        self.assertEqual(['ALTER TABLE `user` DROP INDEX `idx_city_age`, ADD INDEX `idx_city_age` '
+                          '(`city`(10), `age` DESC)'], api.executed)
+        with self.assertRaises(SqlKeyNameError):
+            api.rebuild_index('user', 'nope')
+
+    def test_04_deferred(self):
+        api = _FakeMySQL()
+        with api.deferred_indexes('user') as deferred:
+            self.assertEqual(['idx_city_age', 'ft_bio'], [_['name'] for _ in deferred])
+        self.assertEqual('ALTER TABLE `user` ADD INDEX `idx_city_age` (`city`(10), `age` DESC), '
+                         'ADD FULLTEXT INDEX `ft_bio` (`bio`), ALGORITHM=INPLACE, LOCK=NONE', api.executed[-1])
+        self.assertEqual(3, len(api.executed))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,109 @@
 @Author     : LeeCQ
 @Date-Time  : 2021/1/8 20:15
 """
+import pickle
+import unittest
 
+from sqllib.SQLite.document import DocumentStore
+from sqllib.SQLite.kvstore import KVStore
+from sqllib.common.base_no_sql import NoSQLBase
 
 __all__ = []
+
+
+class TESTKVStore(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.kv = KVStore(':memory:', cache_size=2)
+
+    def tearDown(self) -> None:
+        self.kv.close()
+
+    def test_00_base(self):
+        self.assertIsInstance(self.kv, NoSQLBase)
+
+    def test_01_get_put_delete(self):
+        self.kv.put('a', b'1')
+        self.assertEqual(b'1', self.kv.get('a'))
+        self.kv.put('a', b'2')
+        self.assertEqual(b'2', self.kv.get('a'))
+        self.assertEqual(1, self.kv.delete('a'))
+        self.assertIsNone(self.kv.get('a'))
+        self.assertNotIn('a', self.kv)
+
+    def test_02_multi(self):
+        self.kv.multi_put({f'k{i}': i for i in range(1200)})
+        self.assertEqual(1200, len(self.kv))
+        _ = self.kv.multi_get([f'k{i}' for i in range(0, 1300, 2)])
+        self.assertEqual(600, len(_))
+        self.assertEqual(998, _['k998'])
+        self.kv.multi_delete(['k0', 'k1'])
+        self.assertEqual(1198, len(self.kv))
+
+    def test_03_scan_prefix(self):
+        self.kv.multi_put([('user:2', 2), ('user:1', 1), ('users', 0), ('user;', 0), ('order:1', 3)])
+        self.assertEqual([('user:1', 1), ('user:2', 2)], list(self.kv.scan_prefix('user:', batch_rows=1)))
+        self.assertEqual([('user:1', 1)], list(self.kv.scan_prefix('user:', limit=1)))
+        self.assertEqual(5, len(list(self.kv.scan_prefix())))
+
+    def test_04_batch_rollback(self):
+        self.kv.put('keep', 1)
+        with self.assertRaises(ZeroDivisionError):
+            with self.kv.batch():
+                self.kv.put('keep', 2)
+                self.kv.put('lost', 3)
+                1 / 0
+        self.assertEqual(1, self.kv.get('keep'))
+        self.assertIsNone(self.kv.get('lost'))
+
+    def test_05_serializer(self):
+        kv = KVStore(':memory:', table='objects', serializer=pickle)
+        kv.put('obj', {'a': [1, 2]})
+        self.assertEqual({'a': [1, 2]}, kv.get('obj'))
+        kv.close()
+
+
+class TESTDocumentStore(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.store = DocumentStore(':memory:')
+        self.users = self.store['users']
+        self.users.insert_many([{'name': 'a', 'age': 18, 'addr': {'city': 'SZ'}},
+                                {'name': 'b', 'age': 30, 'tags': ['x', 'y']},
+                                {'name': 'c', 'age': 45, 'addr': {'city': 'BJ'}}], batch_rows=2)
+
+    def tearDown(self) -> None:
+        self.store.close()
+
+    def test_01_find(self):
+        self.assertEqual(3, len(self.users))
+        self.assertEqual(['b', 'c'], [_['name'] for _ in self.users.find({'age': {'$gte': 20}}, sort=[('age', 1)])])
+        self.assertEqual('SZ', self.users.find_one({'addr.city': 'SZ'})['addr']['city'])
+        self.assertEqual(['a', 'c'], [_['name'] for _ in self.users.find({'name': {'$in': ['a', 'c']}})])
+        self.assertEqual(['b'], [_['name'] for _ in self.users.find({'tags': ['x', 'y']})])
+        self.assertEqual(2, self.users.count({'addr': {'$exists': True}}))
+
+    def test_02_projection(self):
+        _ = self.users.find({'name': 'a'}, projection={'addr.city': 1, '_id': 0})
+        self.assertEqual([{'addr': {'city': 'SZ'}}], _)
+        _ = self.users.find_one({'name': 'b'}, projection=['name'])
+        self.assertEqual({'_id', 'name'}, set(_))
+
+    def test_03_index(self):
+        self.assertIn('SCAN', ' '.join(self.users.explain({'addr.city': 'SZ'})))
+        self.users.create_index('addr.city')
+        self.assertIn('USING INDEX', ' '.join(self.users.explain({'addr.city': 'SZ'})))
+        self.assertEqual(['addr.city'], self.store['users'].list_indexes())
+        self.assertEqual('c', self.users.find_one({'addr.city': 'BJ'})['name'])
+        self.users.drop_index('addr.city')
+        self.assertEqual([], self.users.list_indexes())
+
+    def test_04_update_delete(self):
+        self.assertEqual(1, self.users.update_many({'name': 'a'}, {'age': 19, 'addr.zip': '518000'}))
+        self.assertEqual({'city': 'SZ', 'zip': '518000'}, self.users.find_one({'age': 19})['addr'])
+        self.assertEqual(2, self.users.delete_many({'age': {'$lt': 40}}))
+        self.assertEqual(['users'], self.store.list_collections())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_parallel.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 00:10
+
+UNITTEST for SQLite 多进程并行查询
+"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.SQLite.parallel import merge_partials
+from sqllib.common.error import *
+
+
+class TESTParallelQuery(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.workdir = Path(tempfile.mkdtemp())
+        cls.sql = SQLiteAPI(str(cls.workdir / 'big.db'), prefix='P_')
+        cls.sql.create_table('big', 'id INTEGER PRIMARY KEY, city TEXT, x INT')
+        cls.sql.write_rows('INSERT INTO P_big (id, city, x) VALUES (?, ?, ?)',
+                           [(_i * 3, f'c{_i % 5}', _i) for _i in range(1, 3001)])
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.sql.close()
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+
+    def test_01_concat(self):
+        rows = self.sql.parallel_query('SELECT id, x FROM P_big WHERE {partition} AND x > ? ORDER BY id', (100,),
+                                       workers=3)
+        self.assertEqual(self.sql.read_db('SELECT id, x FROM P_big WHERE x > 100 ORDER BY id'), rows)
+
+    def test_02_partial_aggregates(self):
+        rows = self.sql.parallel_query('SELECT city, COUNT(*) AS n, SUM(x) AS s, MIN(x) AS lo, MAX(x) AS hi '
+                                       'FROM P_big WHERE {partition} GROUP BY city', partition_by='id', workers=2,
+                                       merge={'n': 'count', 's': 'sum', 'lo': 'min', 'hi': 'max'})
+        expected = self.sql.read_db('SELECT city, COUNT(*), SUM(x), MIN(x), MAX(x) FROM P_big GROUP BY city')
+        self.assertEqual(sorted(expected), sorted(rows))
+
+    def test_03_options(self):
+        rows = self.sql.parallel_query('SELECT COUNT(*) AS n FROM P_big b WHERE {partition}', table='big',
+                                       partition_by='b.rowid', partitions=7, merge={'n': 'sum'}, result_type=dict)
+        self.assertEqual([{'n': 3000}], rows)
+        total = self.sql.parallel_query('SELECT x FROM P_big WHERE {partition}', workers=2,
+                                        merge=lambda _rows: [(sum(_[0] for _ in _rows),)])
+        self.assertEqual([(sum(range(1, 3001)),)], total)
+
+    def test_04_wal(self):
+        self.sql.enable_wal()
+        self.sql.write_db("INSERT INTO P_big (id, city, x) VALUES (9001, 'c0', 0)")
+        rows = self.sql.parallel_query('SELECT COUNT(*) AS n FROM P_big WHERE {partition}', merge={'n': 'sum'})
+        self.assertEqual([(3001,)], rows)  # WAL 模式下不使用 immutable，能读到未检查点的数据
+        self.sql.write_db('DELETE FROM P_big WHERE id=9001')
+
+    def test_05_errors(self):
+        with self.assertRaises(SqlModuleError):
+            SQLiteAPI(':memory:').parallel_query('SELECT 1 FROM t WHERE {partition}')
+        with self.assertRaises(SqlModuleError):
+            self.sql.parallel_query('SELECT * FROM big')
+        with self.assertRaises(SqlKeyNameError):
+            merge_partials(['a'], [[(1,)]], {'b': 'sum'})
+        self.assertEqual([('a', 3, None)], merge_partials(['k', 'n', 'm'], [[('a', 1, None)], [('a', 2, None)]],
+                                                          {'n': 'sum', 'm': 'max'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_prepared.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 04:00
+
+UNITTEST for MySqlPreparedAPI(不需要 MySQL 服务器与 mysql-connector-python)
+"""
+import shutil
+import tempfile
+import threading
+import unittest
+from collections import OrderedDict
+from pathlib import Path
+from unittest import mock
+
+from sqllib import RetryPolicy, WriteSpool
+from sqllib.common.error import *
+from sqllib.mysql import prepared
+from sqllib.mysql.prepared import MySqlPreparedAPI
+from sqllib.mysql.replica import is_connection_error
+
+
+class _ConnectorError(Exception):
+    """模拟 mysql.connector.errors.OperationalError"""
+    __module__ = 'mysql.connector.errors'
+
+    def __init__(self, errno, msg=''):
+        super().__init__(msg)
+        self.errno = errno
+
+
+class _Conn:
+    """假的 mysql-connector 连接：记录每个预处理游标执行的 (SQL, 参数)；fail 次数内执行抛出连接错误"""
+
+    def __init__(self):
+        self.cursors = []
+        self.fail = 0
+        self.connection_id = 9
+        self.pings = 0
+
+    def cursor(self, prepared=False, dictionary=False):
+        cur = _Cursor(self, dictionary)
+        self.cursors.append(cur)
+        return cur
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+
+    def close(self):
+        pass
+
+
+class _Cursor:
+    def __init__(self, conn, dictionary):
+        self.conn, self.dictionary = conn, dictionary
+        self.executed = []
+        self.closed = False
+        self.rowcount = 0
+        self.description = (('v',),)
+
+    def execute(self, operation, params=()):
+        if self.conn.fail:
+            self.conn.fail -= 1
+            raise _ConnectorError(2013, 'Lost connection to MySQL server during query')
+        self.executed.append((operation, tuple(params)))
+        self.rowcount = 1
+
+    def executemany(self, operation, seq_params):
+        for params in seq_params:
+            self.execute(operation, params)
+        self.rowcount = len(seq_params)
+
+    def fetchall(self):
+        return [{'v': 1}] if self.dictionary else [(1,)]
+
+    def close(self):
+        self.closed = True
+
+
+def _prepared_api(cache_size=128, **attrs):
+    api = MySqlPreparedAPI.__new__(MySqlPreparedAPI)
+    api.SQL_HOST, api.SQL_PORT, api.SQL_USER, api.SQL_PASSWD, api.SQL_DB = 'h', 3306, 'u', 'p', 'db'
+    api.SQL_CHARSET, api.use_unicode, api._connect_kwargs = 'utf8', None, {}
+    api.TABLE_PREFIX, api.convert_types = '', False
+    api._sql, api.pooled_sql, api._router, api.spool = _Conn(), None, None, None
+    api.retry_policy = api.circuit_breaker = None
+    api.retry_metrics = {'connection_errors': 0, 'retries': 0, 'reconnects': 0, 'exhausted': 0}
+    api.sticky_seconds = 0
+    api._local = threading.local()
+    api.stmt_cache_size = cache_size
+    api._stmt_cache = OrderedDict()
+    for k, v in attrs.items():
+        setattr(api, k, v)
+    return api
+
+
+class TESTPrepared(unittest.TestCase):
+
+    def test_01_cache_hit(self):
+        api = _prepared_api()
+        for _i in range(3):
+            api.read_db('SELECT v FROM t WHERE id = %s', (_i,))
+        api.read_db('SELECT v FROM t WHERE id = %s', (5,), result_type=dict)  # 字典游标单独缓存
+        self.assertEqual(2, len(api._sql.cursors))
+        self.assertEqual([(0,), (1,), (2,)], [_[1] for _ in api._sql.cursors[0].executed])
+        ops = {id(_[0]) for _ in api._sql.cursors[0].executed}
+        self.assertEqual(1, len(ops))  # 总是用首次传入的SQL对象执行，connector 才会跳过 PREPARE
+
+    def test_02_lru_eviction(self):
+        api = _prepared_api(cache_size=2)
+        for sql in ('SELECT 1', 'SELECT 2', 'SELECT 1', 'SELECT 3'):
+            api.read_db(sql)
+        self.assertEqual(['SELECT 1', 'SELECT 3'], api.stmt_cache_info)
+        self.assertTrue(api._sql.cursors[1].closed)  # SELECT 2 最久未使用，被关闭
+        self.assertFalse(api._sql.cursors[0].closed)
+
+    def test_03_named_params(self):
+        api = _prepared_api()
+        api.write_db('UPDATE t SET a = %(a)s, b = %(b)s WHERE id = %(id)s', {'id': 7, 'b': 'x', 'a': 1})
+        api.write_db('UPDATE t SET a = %(a)s, b = %(b)s WHERE id = %(id)s', {'id': 8, 'b': 'y', 'a': 2})
+        self.assertEqual(1, len(api._sql.cursors))
+        self.assertEqual([('UPDATE t SET a = %s, b = %s WHERE id = %s', (1, 'x', 7)),
+                          ('UPDATE t SET a = %s, b = %s WHERE id = %s', (2, 'y', 8))],
+                         api._sql.cursors[0].executed)
+
+    def test_04_retry_and_reconnect(self):
+        self.assertTrue(is_connection_error(_ConnectorError(2013)))
+        self.assertFalse(is_connection_error(_ConnectorError(1064)))
+        api = _prepared_api(retry_policy=RetryPolicy(max_attempts=3, base_delay=0))
+        api.read_db('SELECT 1')
+        api._sql.fail = 1
+        self.assertEqual([(1,)], api.read_db('SELECT 1'))
+        self.assertEqual((1, 1), (api.retry_metrics['retries'], api._sql.pings))
+        self.assertEqual(2, len(api._sql.cursors))  # 重连后预处理语句重新 PREPARE
+        self.assertTrue(api._sql.cursors[0].closed)
+
+    def test_05_spool(self):
+        workdir = Path(tempfile.mkdtemp())
+        try:
+            spool = WriteSpool(workdir / 'p.spool', retry_interval=0)
+            api = _prepared_api(spool=spool)
+            api._sql.fail = 1
+            self.assertEqual(0, api.insert('t', a=1, b='x'))  # connector 的连接错误进入本地队列
+            self.assertEqual(1, spool.pending())
+            self.assertEqual(1, api.replay_spool())
+            spool.close()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def test_06_connect_override(self):
+        fake = mock.Mock()
+        api = _prepared_api(_connect_kwargs={'autocommit': False})
+        with mock.patch.object(prepared, 'connector', fake):
+            api._connect(host='replica', port=3307)
+        self.assertEqual({'host': 'replica', 'port': 3307, 'user': 'u', 'password': 'p', 'database': 'db',
+                          'charset': 'utf8', 'autocommit': False}, fake.connect.call_args.kwargs)
+        self.assertEqual(('h', 3306, 'u', 'p', 9), api._kill_target(api._sql))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_query.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 16:40
+
+UNITTEST for 查询构造器
+"""
+import sqlite3
+import unittest
+
+from sqllib import P
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.common import SQLiteJson
+from sqllib.common.query import Query
+from sqllib.common.error import *
+
+
+class TESTQuery(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.sql = SQLiteAPI(':memory:', prefix='Q_')
+        cls.sql.create_table('user', 'id INTEGER PRIMARY KEY, name TEXT, age INT, city TEXT')
+        cls.sql.create_table('orders', 'id INTEGER PRIMARY KEY, uid INT, amount REAL')
+        cls.sql.insert('user', name=('a', 'b', 'c', 'd'), age=(10, 20, 30, 40), city=('SZ', 'SZ', 'BJ', None))
+        cls.sql.insert('orders', uid=(1, 1, 2, 3), amount=(1.0, 2.0, 3.0, 4.0))
+
+    def test_01_compile_sqlite(self):
+        stmt = self.sql.query('user').select('id', 'name').where(age__gte=P('age'), city='SZ') \
+            .order_by('-id').limit(10).compile()
+        self.assertEqual('SELECT `id`, `name` FROM `Q_user` WHERE `age` >= ? AND `city` = ? '
+                         'ORDER BY `id` DESC LIMIT 10', stmt.sql)
+        self.assertEqual((18, 'SZ'), stmt.bind(age=18))
+        self.assertRaises(SqlModuleError, stmt.bind)
+
+    def test_02_dialects(self):
+        q = Query(self.sql, 'user', dialect='mysql').select('name').where(id__in=[1, 2]).limit(5, offset=5)
+        self.assertEqual('SELECT `name` FROM `Q_user` WHERE `id` IN (%s, %s) LIMIT 5 OFFSET 5', q.sql)
+        q = Query(self.sql, 'user', dialect='mssql').select('name').where(id=P('id')).limit(5)
+        self.assertEqual('SELECT TOP 5 [name] FROM [Q_user] WHERE [id] = %s', q.sql)
+
+    def test_03_reuse_compiled(self):
+        q = self.sql.query('user').select('name').where(age__gt=P('age')).order_by('age')
+        stmt = q.compile()
+        self.assertEqual([('c',), ('d',)], q.all(age=20))
+        self.assertEqual([('b',), ('c',), ('d',)], q.all(age=10))
+        self.assertIs(stmt, q.compile(), '重复执行时重新编译了语句')
+        q.limit(1)
+        self.assertIsNot(stmt, q.compile(), '修改查询后未重新编译')
+
+    def test_04_join_group_in(self):
+        q = self.sql.query('user').select('Q_user.name', 'SUM(amount) AS total') \
+            .join('orders', on='Q_user.id = Q_orders.uid') \
+            .where(name__in=['a', 'b', 'c'], city__isnull=False) \
+            .group_by('Q_user.name').having('SUM(amount) < 4').order_by('Q_user.name')
+        self.assertEqual([{'name': 'a', 'total': 3.0}, {'name': 'b', 'total': 3.0}], q.all(result_type=dict))
+
+    def test_05_none_and_empty_in(self):
+        self.assertEqual(('d',), self.sql.query('user').select('name').where(city=None).first())
+        self.assertIsNone(self.sql.query('user').where(id__in=[]).first())
+
+
+class TESTJson(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.sql = SQLiteAPI(':memory:', json_columns=True)
+        cls.sql.create_table('J', 'id INTEGER PRIMARY KEY, TEST_JSON JSON NOT NULL')
+        cls.sql.insert('J', TEST_JSON=({'a': 1, 'b': {'c': 'x'}}, {'a': 2, 'b': {'c': 'y'}}, [1, 2]))
+
+    def test_01_auto_json(self):
+        self.assertEqual([({'a': 1, 'b': {'c': 'x'}},), ({'a': 2, 'b': {'c': 'y'}},), ([1, 2],)],
+                         self.sql.select('J', 'TEST_JSON'))
+
+    def test_02_where_json(self):
+        q = self.sql.query('J').select('id').where_json('TEST_JSON', 'b.c', P('c'))
+        self.assertEqual("SELECT `id` FROM `J` WHERE json_extract(`TEST_JSON`, '$.b.c') = ?", q.sql)
+        self.assertEqual([(2,)], q.all(c='y'))
+        self.assertEqual([(1,), (2,)], self.sql.query('J').select('id').where_json('TEST_JSON', 'a', [1, 2], 'in').all())
+
+    def test_03_path(self):
+        self.assertEqual("JSON_UNQUOTE(JSON_EXTRACT(`j`, '$.a[0]'))",
+                         Query(self.sql, 'J', dialect='mysql').dialect.json_extract('j', 'a[0]'))
+        self.assertRaises(SqlKeyNameError, SQLiteJson.path, "a') OR 1=1 --")
+
+    def test_04_list_value(self):
+        self.sql.insert('J', id=10, TEST_JSON=[1, 2])  # JSON 列的 list 是一个值
+        self.sql.insert('J', id=[11, 12], TEST_JSON=[[3], {'a': 4}])  # 其他列的 list 决定插入多行
+        self.assertEqual([([1, 2],), ([3],), ({'a': 4},)],
+                         self.sql.select('J', 'TEST_JSON', WHERE='id >= 10', ORDER='id'))
+        with self.assertRaises(sqlite3.ProgrammingError):  # 不注册全局的 list 适配器
+            sqlite3.connect(':memory:').execute('SELECT ?', ([1, 2],))
+        plain = SQLiteAPI(':memory:')
+        plain.create_table('J', 'id INTEGER PRIMARY KEY, TEST_JSON JSON')
+        self.assertRaises(SqlWriteError, plain.insert, 'J', id=1, TEST_JSON={'a': 1})
+        plain.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_replica.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 21:10
+
+UNITTEST for MySQL 读写分离的从库路由(不需要 MySQL 服务器)
+"""
+import threading
+import time
+import unittest
+
+import pymysql
+
+from sqllib.mysql.mysqlbase import MySqlAPI
+from sqllib.mysql.replica import ReplicaRouter, is_connection_error, is_replica_read
+
+
+class _Conn:
+    """假的 pymysql 连接：记录执行的语句；fail 为真时 ping 与查询抛出连接错误"""
+
+    def __init__(self, fail=False, name=''):
+        self.fail = fail
+        self.name = name
+        self.closed = False
+        self.executed = []
+
+    def ping(self, reconnect=True):
+        if self.fail:
+            raise pymysql.err.OperationalError(2003, "Can't connect")
+
+    def close(self):
+        self.closed = True
+
+    def cursor(self, *args):
+        return _Cursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = (('name',),)
+
+    def execute(self, command, args=None):
+        if self.conn.fail:
+            raise pymysql.err.OperationalError(2013, 'Lost connection to MySQL server during query')
+        self.conn.executed.append(command)
+        return 1
+
+    def fetchall(self):
+        return [(self.conn.name,)]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class TESTReplicaRouter(unittest.TestCase):
+
+    def test_01_is_replica_read(self):
+        self.assertTrue(is_replica_read('SELECT * FROM t'))
+        self.assertTrue(is_replica_read('  show tables'))
+        self.assertFalse(is_replica_read('SELECT * FROM t WHERE id=1 FOR UPDATE'))
+        self.assertFalse(is_replica_read('select * from t lock in share mode'))
+        self.assertFalse(is_replica_read('INSERT INTO t VALUES (1)'))
+        self.assertTrue(is_replica_read('WITH a AS (SELECT 1) SELECT * FROM a'))
+        self.assertTrue(is_replica_read('WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT x FROM c'))
+        self.assertFalse(is_replica_read('WITH a AS (SELECT id FROM s) UPDATE t JOIN a USING (id) SET v = 1'))
+        self.assertFalse(is_replica_read("WITH a AS (SELECT ')' AS p) DELETE FROM t WHERE id IN (SELECT 1)"))
+
+    def test_02_is_connection_error(self):
+        self.assertTrue(is_connection_error(pymysql.err.OperationalError(2006, 'MySQL server has gone away')))
+        self.assertTrue(is_connection_error(pymysql.err.InterfaceError(0, '')))
+        self.assertFalse(is_connection_error(pymysql.err.OperationalError(1205, 'Lock wait timeout')))
+        self.assertFalse(is_connection_error(pymysql.err.ProgrammingError(1064, 'syntax')))
+
+    def test_03_round_robin(self):
+        router = ReplicaRouter([('a', _Conn), ('b', _Conn)])
+        self.assertEqual(['a', 'b', 'a', 'b'], [router.choose().name for _ in range(4)])
+        self.assertEqual([2, 2], [_['reads'] for _ in router.stats()])
+
+    def test_04_health(self):
+        router = ReplicaRouter([('a', lambda: _Conn(fail=True)), ('b', _Conn)], down_seconds=60)
+        self.assertEqual(['b', 'b'], [router.choose().name for _ in range(2)])  # a 在健康检查中下线
+        router.mark_down(router.replicas[1])
+        self.assertIsNone(router.choose())  # 全部下线时回到主库
+        self.assertEqual([1, 1], [_['failures'] for _ in router.stats()])
+
+    def test_05_least_latency(self):
+        router = ReplicaRouter([('a', _Conn), ('b', _Conn)], policy='least_latency')
+        router.check()
+        router.replicas[0].latency, router.replicas[1].latency = 0.5, 0.1
+        self.assertEqual('b', router.choose().name)
+        self.assertRaises(ValueError, ReplicaRouter, [], policy='random')
+        self.assertIsNot(router.replicas[0], router.fork().replicas[0])
+
+    def test_06_connection_per_thread(self):
+        router = ReplicaRouter([('a', _Conn)])
+        replica, conns = router.replicas[0], []
+        threads = [threading.Thread(target=lambda: conns.append(replica.connection())) for _ in range(3)]
+        [_.start() for _ in threads]
+        [_.join() for _ in threads]
+        self.assertEqual(3, len({id(_) for _ in conns}))
+        main = replica.connection()
+        self.assertIs(main, replica.connection())
+        router.mark_down(replica)  # 下线后本线程下次使用时重建连接
+        self.assertIsNot(main, replica.connection())
+        self.assertTrue(main.closed)
+        router.close()
+        self.assertTrue(all(_.closed for _ in conns))
+
+    def test_07_check_outside_lock(self):
+        gate = threading.Event()
+
+        class _Slow(_Conn):
+            def ping(self, reconnect=True):
+                gate.wait(2)
+
+        router = ReplicaRouter([('a', _Slow), ('b', _Conn)], health_interval=60)
+        checker = threading.Thread(target=router.choose)
+        checker.start()
+        time.sleep(0.05)  # 第一次健康检查卡在慢从库上
+        start = time.monotonic()
+        self.assertIsNotNone(router.choose())  # 其他线程不被阻塞
+        self.assertLess(time.monotonic() - start, 1)
+        gate.set()
+        checker.join()
+
+
+def _mysql(replicas, sticky_seconds=0):
+    """不连接服务器的 MySqlAPI：主库与各从库都是 _Conn"""
+    api = MySqlAPI.__new__(MySqlAPI)
+    api.primary = _Conn(name='primary')
+    api._sql, api.pooled_sql, api.spool = api.primary, None, None
+    api.retry_policy = api.circuit_breaker = None
+    api.retry_metrics = {'connection_errors': 0, 'retries': 0, 'reconnects': 0, 'exhausted': 0}
+    api.sticky_seconds, api.convert_types = sticky_seconds, False
+    api._local = threading.local()
+    api.replica_conns = {}
+
+    def _factory(name, fail):
+        def _connect():
+            api.replica_conns[name] = _Conn(fail=fail, name=name)
+            return api.replica_conns[name]
+        return _connect
+    api._router = ReplicaRouter([(name, _factory(name, fail)) for name, fail in replicas], health_interval=3600)
+    api._router._checked = time.monotonic()  # 跳过初始健康检查
+    return api
+
+
+class TESTMySqlReplica(unittest.TestCase):
+
+    def test_01_routing(self):
+        api = _mysql([('r1', False), ('r2', False)])
+        self.assertEqual(['r1', 'r2'], [api.read_db('SELECT name')[0][0] for _ in range(2)])
+        self.assertEqual('primary', api.read_db('SELECT name FOR UPDATE')[0][0])
+        self.assertEqual('primary', api.read_db('WITH a AS (SELECT 1) DELETE FROM t')[0][0])
+        api.write_db('UPDATE t SET v = 1')
+        self.assertEqual(['UPDATE t SET v = 1'], api.primary.executed[-1:])
+        self.assertEqual([1, 1], [_['reads'] for _ in api.replica_stats()])
+
+    def test_02_sticky_after_write(self):
+        api = _mysql([('r1', False)], sticky_seconds=0.2)
+        self.assertEqual('r1', api.read_db('SELECT name')[0][0])
+        api.write_db('INSERT INTO t VALUES (1)')
+        self.assertEqual('primary', api.read_db('SELECT name')[0][0])  # 读到自己的写
+        other = []
+        threading.Thread(target=lambda: other.append(api.read_db('SELECT name')[0][0])).start()
+        time.sleep(0.05)
+        self.assertEqual(['r1'], other)  # 只对写入的线程生效
+        time.sleep(0.2)
+        self.assertEqual('r1', api.read_db('SELECT name')[0][0])
+
+    def test_03_on_primary(self):
+        api = _mysql([('r1', False)])
+        with api.on_primary():
+            self.assertEqual('primary', api.read_db('SELECT name')[0][0])
+            with api.on_primary():
+                pass
+            self.assertEqual('primary', api.read_db('SELECT name')[0][0])
+        self.assertEqual('r1', api.read_db('SELECT name')[0][0])
+
+    def test_04_fallback_when_down(self):
+        api = _mysql([('r1', True), ('r2', False)])
+        self.assertEqual('primary', api.read_db('SELECT name')[0][0])  # r1 出错，本次改在主库执行
+        self.assertEqual(['r2', 'r2'], [api.read_db('SELECT name')[0][0] for _ in range(2)])  # r1 已下线
+        api._router.mark_down(api._router.replicas[1])
+        self.assertEqual('primary', api.read_db('SELECT name')[0][0])  # 全部下线时回到主库
+        self.assertEqual([False, False], [_['healthy'] for _ in api.replica_stats()])
+
+
+if __name__ == '__main__':
+    unittest.main()
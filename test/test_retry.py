@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_retry.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 22:30
+
+UNITTEST for 重试策略与熔断器(不需要 MySQL 服务器)
+"""
+import threading
+import time
+import unittest
+
+import pymysql
+
+from sqllib import RetryPolicy, CircuitBreaker
+from sqllib.common.error import *
+from sqllib.mysql.mysqlbase import MyBaseSQL
+
+
+class _FakeAPI:
+    """只带 _retrying() 需要的属性"""
+    _retrying = MyBaseSQL._retrying
+    idempotent = MyBaseSQL.idempotent
+
+    def __init__(self, retry=None, breaker=None):
+        self.retry_policy = retry
+        self.circuit_breaker = breaker
+        self.retry_metrics = {'connection_errors': 0, 'retries': 0, 'reconnects': 0, 'exhausted': 0}
+        self._local = threading.local()
+
+    def _reconnect(self):
+        self.retry_metrics['reconnects'] += 1
+
+
+def _flaky(failures, error=None):
+    state = {'calls': 0}
+
+    def func():
+        state['calls'] += 1
+        if state['calls'] <= failures:
+            raise error or pymysql.err.OperationalError(2006, 'MySQL server has gone away')
+        return 'ok'
+    return func, state
+
+
+class TESTRetry(unittest.TestCase):
+
+    def test_01_delay(self):
+        policy = RetryPolicy(base_delay=0.1, max_delay=0.3, jitter=False)
+        self.assertEqual([0.1, 0.2, 0.3, 0.3], [policy.delay(_) for _ in range(1, 5)])
+        self.assertTrue(all(0 <= RetryPolicy(base_delay=1).delay(3) <= 4 for _ in range(20)))
+
+    def test_02_read_retry(self):
+        api = _FakeAPI(RetryPolicy(max_attempts=3, base_delay=0))
+        func, state = _flaky(2)
+        self.assertEqual('ok', api._retrying(func))
+        self.assertEqual(3, state['calls'])
+        self.assertEqual(2, api.retry_metrics['retries'])
+        self.assertEqual(2, api.retry_metrics['reconnects'])
+        func, state = _flaky(5)
+        self.assertRaises(pymysql.err.OperationalError, api._retrying, func)
+        self.assertEqual(1, api.retry_metrics['exhausted'])
+
+    def test_03_write_needs_mark(self):
+        api = _FakeAPI(RetryPolicy(max_attempts=3, base_delay=0))
+        func, state = _flaky(1)
+        self.assertRaises(pymysql.err.OperationalError, api._retrying, func, write=True)
+        self.assertEqual(1, state['calls'])
+        func, state = _flaky(1)
+        with api.idempotent():
+            self.assertEqual('ok', api._retrying(func, write=True))
+        func, state = _flaky(1, error=pymysql.err.ProgrammingError(1064, 'syntax'))
+        self.assertRaises(pymysql.err.ProgrammingError, api._retrying, func)  # SQL 错误不重试
+        self.assertEqual(1, state['calls'])
+
+    def test_04_circuit_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        api = _FakeAPI(breaker=breaker)
+        func, state = _flaky(3)
+        for _ in range(2):
+            self.assertRaises(pymysql.err.OperationalError, api._retrying, func)
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+        self.assertRaises(SqlCircuitOpenError, api._retrying, func)
+        self.assertEqual(2, state['calls'])
+        time.sleep(0.06)
+        self.assertEqual(CircuitBreaker.HALF_OPEN, breaker.state)
+        self.assertRaises(pymysql.err.OperationalError, api._retrying, func)  # 试探失败，再次打开
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+        time.sleep(0.06)
+        self.assertEqual('ok', api._retrying(func))
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+        stats = breaker.stats()
+        self.assertEqual((2, 1), (stats['opened'], stats['rejected']))
+
+
+if __name__ == '__main__':
+    unittest.main()
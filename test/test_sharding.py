@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_sharding.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 21:50
+
+UNITTEST for ShardedAPI
+"""
+import unittest
+import unittest.mock
+
+from sqllib import ShardedAPI
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.error import *
+
+
+class TESTShardedAPI(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.shards = [SQLiteAPI(':memory:', prefix='S_', check_same_thread=False) for _ in range(3)]
+        cls.sql = ShardedAPI(cls.shards, shard_key={'user': 'uid'}, shard_func=lambda v, n: v % n)
+        cls.sql.create_table('user', 'uid INTEGER PRIMARY KEY, name TEXT, age INT')
+        cls.sql.insert('user', uid=tuple(range(1, 11)), name=tuple('abcdefghij'), age=(5, 3, 8, 1, 9, 2, 7, 4, 6, 0))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.sql.close()
+
+    def test_01_insert_routing(self):
+        for index, shard in enumerate(self.shards):
+            uids = [_[0] for _ in shard.select('user', 'uid')]
+            self.assertTrue(uids and all(_ % 3 == index for _ in uids))
+        self.sql.insert('user', uid=11, name='k', age=10)
+        self.assertEqual(1, len(self.shards[2].select('user', 'uid', WHERE='uid=11')))
+        self.assertRaises(SqlShardError, self.sql.insert, 'user', name='x')
+        self.assertRaises(SqlShardError, self.sql.insert, 'other', uid=1)
+
+    def test_02_select_merge(self):
+        self.assertEqual(11, len(self.sql.select('user', '*')))
+        rows = self.sql.select('user', 'uid', 'age', ORDER='age DESC', LIMIT=3)
+        self.assertEqual([(11, 10), (5, 9), (3, 8)], rows)
+        rows = self.sql.select('user', 'uid', 'name', result_type=dict, ORDER='uid', LIMIT=2, OFFSET=3)
+        self.assertEqual([{'uid': 4, 'name': 'd'}, {'uid': 5, 'name': 'e'}], rows)
+        self.assertEqual([(8,), (9,)], self.sql.select('user', 'uid', ORDER='uid', LIMIT='7, 2'))
+        self.assertRaises(SqlShardError, self.sql.select, 'user', 'uid', ORDER='age')
+
+    def test_03_update_delete(self):
+        self.assertEqual(1, self.sql.update('user', 'uid', 4, name='D'))
+        self.assertEqual([('D',)], self.shards[1].select('user', 'name', WHERE='uid=4'))
+        self.assertEqual(1, self.sql.update('user', 'name', 'e', age=99))  # 非分片键：广播
+        self.assertRaises(SqlShardError, self.sql.update, 'user', 'uid', 4, uid=5)
+        self.assertEqual(1, self.sql.delete('user', 'uid', 11))
+        self.assertEqual(10, len(self.sql.read_db('SELECT uid FROM S_user')))
+
+    def test_04_iter_db(self):
+        batches = list(self.sql.iter_db('SELECT uid FROM S_user', batch_rows=2))
+        self.assertTrue(all(len(_) <= 2 for _ in batches))
+        self.assertEqual(list(range(1, 11)), sorted(_[0] for _ in sum(batches, [])))
+
+    def test_05_get_many(self):
+        calls = [unittest.mock.patch.object(_s, 'get_many', wraps=_s.get_many) for _s in self.shards]
+        mocks = [_.start() for _ in calls]
+        try:
+            rows = self.sql.get_many('user', 'uid', [1, 4, 2, 98], cols=['name'])
+            self.assertEqual([0, 1, 1], [_.call_count for _ in mocks])  # 只查询键所在的分片
+            self.assertEqual([1, 4], mocks[1].call_args.args[2])
+        finally:
+            [_.stop() for _ in calls]
+        self.assertEqual({1: (1, 'a'), 2: (2, 'b'), 4: (4, 'D')}, rows)
+        rows = self.sql.get_many('user', 'name', ['c', 'f'], cols=['uid'])  # 非分片键：所有分片查询后合并
+        self.assertEqual({'c': ('c', 3), 'f': ('f', 6)}, rows)
+        self.assertEqual((7, 'g'), self.sql.batch_loader('user', 'uid', cols=['name'], window=0).load(7))
+        self.assertRaises(SqlModuleError, self.sql.aggregate, 'user')
+
+
+if __name__ == '__main__':
+    unittest.main()
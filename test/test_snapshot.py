@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_snapshot.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 02:20
+
+UNITTEST for SQLite 只读快照
+"""
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from sqllib import SQLiteAPI, SQLiteSnapshot
+from sqllib.common.error import *
+
+
+class TESTSnapshot(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.workdir = Path(tempfile.mkdtemp())
+        cls.path = str(cls.workdir / 'lookup.db')
+        with SQLiteAPI(cls.path, prefix='L_') as sql:
+            sql.create_table('city', 'code TEXT PRIMARY KEY, name TEXT')
+            sql.insert('city', code=['SZ', 'BJ'], name=['深圳', '北京'])
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.workdir, ignore_errors=True)
+
+    def setUp(self) -> None:
+        self.snap = SQLiteAPI.open_snapshot(self.path, mmap_size=1 << 20, cache_size=512, prefix='L_')
+
+    def tearDown(self) -> None:
+        self.snap.close()
+
+    def test_01_read(self):
+        self.assertIsInstance(self.snap, SQLiteSnapshot)
+        self.assertIn('immutable=1', self.snap._db)
+        self.assertEqual([('深圳',)], self.snap.select('city', 'name', WHERE='code="SZ"'))
+        self.assertEqual(1 << 20, self.snap.read_db('PRAGMA mmap_size')[0][0])
+        self.assertEqual(1, self.snap.read_db('PRAGMA query_only')[0][0])
+
+    def test_02_read_only(self):
+        with self.assertRaises(SqlWriteError):
+            self.snap.insert('city', code='GZ', name='广州')
+
+    def test_03_threads(self):
+        results, errors = [], []
+
+        def _reader():
+            try:
+                results.append(self.snap.select('city', 'code', result_type=dict, ORDER='code'))
+            except Exception as _e:
+                errors.append(_e)
+
+        threads = [threading.Thread(target=_reader) for _ in range(4)]
+        [_.start() for _ in threads]
+        [_.join() for _ in threads]
+        self.assertEqual([], errors)
+        self.assertEqual([[{'code': 'BJ'}, {'code': 'SZ'}]] * 4, results)
+        self.assertEqual(5, self.snap.connections)  # 每个线程一个连接(另有创建时主线程的连接)
+        self.snap.close()
+        self.assertEqual(0, self.snap.connections)
+        self.assertEqual(2, len(self.snap.select('city', '*')))  # 关闭后再次访问重新打开
+
+    def test_05_time_limit_threads(self):
+        slow = 'WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x+1 FROM c WHERE x < 1000000) SELECT COUNT(*) FROM c'
+        short_in, long_in, short_done = threading.Event(), threading.Event(), threading.Event()
+        results = {}
+
+        def _short():
+            try:
+                with self.snap.time_limit(0.05):
+                    short_in.set()
+                    long_in.wait(5)
+                    self.snap.read_db(slow)
+                results['short'] = 'finished'
+            except Exception as _e:
+                results['short'] = type(_e)
+            finally:
+                short_done.set()
+
+        def _long():
+            short_in.wait(5)
+            try:
+                with self.snap.time_limit(30):  # 不应继承另一个线程的截止时间
+                    long_in.set()
+                    short_done.wait(5)  # 另一个线程退出 time_limit 后，本线程的截止时间仍然有效
+                    results['long'] = self.snap.read_db(slow)[0][0]
+            except Exception as _e:
+                results['long'] = type(_e)
+
+        threads = [threading.Thread(target=_short), threading.Thread(target=_long)]
+        [_.start() for _ in threads]
+        [_.join() for _ in threads]
+        self.assertEqual({'short': SqlTimeoutError, 'long': 1000000}, results)
+        self.assertEqual({}, self.snap._time_limits)
+
+    def test_04_fork(self):
+        other = self.snap.fork()
+        try:
+            self.assertEqual(1 << 20, other.mmap_size)
+            self.assertEqual([('SZ',)], other.read_db('SELECT code FROM L_city WHERE name=?', ('深圳',)))
+        finally:
+            other.close()
+        for api in (SQLiteAPI.open_snapshot(self.path, prefix='L_', convert_types=True, json_columns=True),
+                    SQLiteAPI(self.path, prefix='L_', convert_types=True, json_columns=True)):
+            other = api.fork(read_only=True)
+            try:
+                self.assertEqual((True, True, 'L_'), (other.convert_types, other.json_columns, other.TABLE_PREFIX))
+            finally:
+                other.close()
+                api.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_spool.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 03:40
+
+UNITTEST for 主库不可用时的本地写入队列(不需要 MySQL 服务器)
+"""
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock
+from pathlib import Path
+
+import pymysql
+
+from sqllib import WriteSpool
+from sqllib.common.error import *
+from sqllib.mysql.mysqlbase import MySqlAPI
+
+
+class _FakeMySQL(MySqlAPI):
+    """不连接服务器：down 为真时写入抛出连接错误，否则记录 (方式, 语句, 参数)"""
+
+    def __init__(self, spool):
+        self.TABLE_PREFIX = 'p_'
+        self.SQL_DB = 'test'
+        self.spool = spool
+        self.down = False
+        self.bad = set()  # 这些参数值触发 SQL 错误
+        self.executed = []
+        self._local = threading.local()
+
+    def _check(self, args):
+        if self.down:
+            _e = SqlWriteError('写入失败')
+            _e.__context__ = pymysql.err.OperationalError(2003, "Can't connect to MySQL server")
+            raise _e
+        if any(_ in self.bad for _ in (args.values() if isinstance(args, dict) else args)):
+            raise SqlWriteError('Duplicate entry')
+
+    def _write_db(self, command, args=None):
+        self._check(args)
+        self.executed.append(('one', command, args))
+        return 1
+
+    def _write_affair(self, command, args):
+        for _a in args:
+            self._check(_a)
+        self.executed.append(('many', command, list(args)))
+        return len(args)
+
+    def tables_name(self):
+        if self.down:
+            raise pymysql.err.OperationalError(2013, 'Lost connection to MySQL server')
+        return ['p_log']
+
+    def columns_name(self, table):
+        return ['id', 'msg']
+
+
+class TESTSpool(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.workdir = Path(tempfile.mkdtemp())
+        self.spool = WriteSpool(self.workdir / 'w.spool', retry_interval=0)
+        self.api = _FakeMySQL(self.spool)
+
+    def tearDown(self) -> None:
+        self.spool.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_01_spool_and_replay(self):
+        self.assertEqual(1, self.api.insert('log', id=1, msg='a'))
+        self.api.down = True
+        self.assertEqual(0, self.api.insert('log', id=2, msg='b'))
+        self.assertEqual(0, self.api.insert('log', id=[3, 4], msg=['c', 'd']))
+        self.assertEqual(0, self.api.update('log', 'id', 2, msg='B'))  # 表检查失败也进入队列
+        self.assertEqual(3, self.spool.pending('p_log'))
+        self.assertEqual(['p_log'], self.spool.tables())
+        self.assertEqual(0, self.api.replay_spool())
+        self.assertEqual(3, self.spool.pending())
+
+        self.api.down = False
+        self.api.executed.clear()
+        self.assertEqual(1, self.api.insert('log', id=5, msg='e'))  # 先重放积压，再写入本条
+        self.assertEqual(0, len(self.spool))
+        self.assertEqual([('one', [2, 'b']), ('many', [(3, 'c'), (4, 'd')]), ('one', {'msg': 'B'}),
+                          ('one', [5, 'e'])], [(_[0], _[2]) for _ in self.api.executed])
+        self.assertEqual({'spooled': 3, 'replayed': 3, 'failed': 0}, self.spool.stats)
+
+    def test_02_batch_and_failures(self):
+        self.api.down = True
+        for _i in range(5):
+            self.api.insert('log', id=_i, msg=f'm{_i}')
+        self.api.down = False
+        self.api.bad = {3}
+        self.assertEqual(4, self.api.replay_spool(batch_rows=3))
+        # 相邻的同一语句合并；含错误行的批次逐条重放，出错的一条跳过
+        self.assertEqual([('many', [[0, 'm0'], [1, 'm1'], [2, 'm2']]), ('one', [4, 'm4'])],
+                         [(_[0], _[2]) for _ in self.api.executed])
+        failed = self.spool.failed()
+        self.assertEqual(([3, 'm3'], 'Duplicate entry'), (failed[0]['args'], failed[0]['error']))
+        self.spool.discard()
+        self.assertEqual([], self.spool.failed())
+
+    def test_03_backoff_and_persist(self):
+        spool = WriteSpool(self.workdir / 'b.spool', retry_interval=60)
+        api = _FakeMySQL(spool)
+        api.down = True
+        api.insert('log', id=1, msg='a')
+        api.down = False
+        api.insert('log', id=2, msg='b')  # 退避期间不访问数据库，仍按顺序入队
+        self.assertEqual([], api.executed)
+        spool.close()
+        spool = WriteSpool(self.workdir / 'b.spool')  # 重新打开后队列仍在
+        self.assertTrue(spool.has_backlog('p_log'))
+        api.spool = spool
+        self.assertEqual(2, api.replay_spool())
+        self.assertEqual([[1, 'a'], [2, 'b']], api.executed[0][2])
+        self.assertFalse(spool.has_backlog())
+        spool.close()
+
+    def test_04_sql_error_not_spooled(self):
+        self.api.bad = {'x'}
+        with self.assertRaises(SqlWriteError):
+            self.api.insert('log', id=1, msg='x')
+        self.assertEqual(0, len(self.spool))
+        self.api.spool = None
+        self.api.down = True
+        with self.assertRaises(SqlWriteError):
+            self.api.insert('log', id=1, msg='a')
+
+    def test_05_no_file_access_when_healthy(self):
+        with unittest.mock.patch.object(self.spool, '_execute', side_effect=AssertionError('访问了队列文件')):
+            self.assertEqual(1, self.api.insert('log', id=1, msg='a'))
+            self.assertEqual(1, self.api.update('log', 'id', 1, msg='b'))
+        self.api.down = True
+        self.api.insert('log', id=2, msg='c')
+        self.assertEqual((True, False), (self.spool.has_backlog('p_log'), self.spool.has_backlog('p_other')))
+        self.api.bad = {2}
+        self.api.down = False
+        self.api.replay_spool()  # 失败的语句不再算作积压
+        self.assertFalse(self.spool.has_backlog())
+
+    def test_06_background_replay(self):
+        self.api.down = True
+        self.api.insert('log', id=1, msg='a')
+        self.api.down = False
+        self.api._spool_stop = threading.Event()
+        thread = threading.Thread(target=self.api._spool_replayer, args=(0.01,))
+        thread.start()
+        try:
+            deadline = time.monotonic() + 5
+            while self.spool.has_backlog() and time.monotonic() < deadline:  # 之后没有写入，仍由后台线程重放
+                time.sleep(0.01)
+        finally:
+            self.api._spool_stop.set()
+            thread.join()
+        self.assertEqual([('one', [1, 'a'])], [(_[0], _[2]) for _ in self.api.executed])
+
+    def test_07_fork_keeps_replayer(self):
+        self.api._spool_stop = threading.Event()
+        self.api._spool_thread = threading.Thread(target=self.api._spool_replayer, args=(0.01,))
+        self.api._spool_thread.start()
+        self.api._router, self.api.pooled_sql = None, None
+        self.api._connect = unittest.mock.Mock
+        self.api.fork().close()  # 副本的 close() 不停止原实例的后台重放
+        self.assertFalse(self.api._spool_stop.is_set())
+        self.api._spool_stop.set()
+        self.api._spool_thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_sync.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/20 02:00
+
+UNITTEST for 按高水位列的增量同步
+"""
+import unittest
+
+from sqllib import incremental_sync
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.error import *
+from sqllib.common.sync import sync_state, upsert_sql
+
+
+class _FakeAPI:
+    def __init__(self, dialect, placeholder='%s'):
+        self.DIALECT = dialect
+        self.PLACEHOLDER = placeholder
+
+    @staticmethod
+    def get_real_table_name(name):
+        return name
+
+
+class TESTIncrementalSync(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.src = SQLiteAPI(':memory:', prefix='S_')
+        self.dst = SQLiteAPI(':memory:')
+        self.src.create_table('orders', 'id INTEGER PRIMARY KEY, amount INT, updated_at TEXT')
+        self.src.insert('orders', id=[1, 2, 3], amount=[10, 20, 30],
+                        updated_at=['2026-10-01 10:00:00', '2026-10-01 11:00:00', '2026-10-01 11:00:00'])
+
+    def _dst_rows(self):
+        return self.dst.read_db('SELECT id, amount, updated_at FROM S_orders ORDER BY id')
+
+    def test_01_full_then_delta(self):
+        self.assertEqual(3, incremental_sync(self.src, self.dst, 'orders', batch_rows=2))
+        self.assertEqual(self.src.read_db('SELECT * FROM S_orders ORDER BY id'), self._dst_rows())
+        state = sync_state(self.dst, 'S_orders->S_orders')
+        self.assertEqual(('2026-10-01 11:00:00', 3), (state['watermark'], state['rows']))
+
+        self.src.update('orders', 'id', 1, amount=11, updated_at='2026-10-02 09:00:00')
+        self.src.insert('orders', id=4, amount=40, updated_at='2026-10-01 11:00:00')  # 与水位相同、提交较晚
+        synced = incremental_sync(self.src, self.dst, 'orders')
+        self.assertEqual(4, synced)  # 水位上的 2、3、4 与更新过的 1
+        self.assertEqual(self.src.read_db('SELECT * FROM S_orders ORDER BY id'), self._dst_rows())
+        self.assertEqual(1, incremental_sync(self.src, self.dst, 'orders'))  # 只剩水位上的一行
+        self.assertEqual('2026-10-02 09:00:00', sync_state(self.dst, 'S_orders->S_orders')['watermark'])
+
+    def test_02_options(self):
+        self.dst.create_table('copy', 'id INTEGER PRIMARY KEY, updated_at TEXT')
+        incremental_sync(self.src, self.dst, 'orders', dst_table='copy', cols=['id', 'updated_at'], create=False)
+        self.assertEqual(3, self.dst.read_db('SELECT COUNT(*) FROM copy')[0][0])
+        with self.assertRaises(SqlModuleError):
+            incremental_sync(self.src, self.dst, 'orders', cols=['id', 'amount'])
+
+    def test_03_upsert_sql(self):
+        self.assertEqual('INSERT INTO `t` (`id`, `v`) VALUES (%s, %s) ON DUPLICATE KEY UPDATE `v` = VALUES(`v`)',
+                         upsert_sql(_FakeAPI('mysql'), 't', ['id', 'v'], ['id']))
+        self.assertEqual('MERGE INTO [t] AS d USING (VALUES (%s, %s)) AS s ([id], [v]) ON d.[id] = s.[id] '
+                         'WHEN MATCHED THEN UPDATE SET [v] = s.[v] WHEN NOT MATCHED THEN INSERT ([id], [v]) '
+                         'VALUES (s.[id], s.[v]);', upsert_sql(_FakeAPI('mssql'), 't', ['id', 'v'], ['id']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_timeout.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 22:50
+
+UNITTEST for 查询超时
+"""
+import threading
+import time
+import unittest
+from unittest import mock
+
+import pymysql
+
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.error import *
+from sqllib.mysql import mysqlbase
+from sqllib.mysql.mysqlbase import MySqlAPI
+
+_SLOW = ('WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000000) '
+         'SELECT COUNT(*) FROM c')
+
+
+class TESTTimeout(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.sql = SQLiteAPI(':memory:', prefix='T_')
+        cls.sql.create_table('t', 'id INTEGER PRIMARY KEY, v INT')
+        cls.sql.insert('t', v=(1, 2, 3))
+
+    def test_01_read_timeout(self):
+        start = time.monotonic()
+        self.assertRaises(SqlTimeoutError, self.sql.read_db, _SLOW, timeout=0.05)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual([(3,)], self.sql.read_db('SELECT COUNT(*) FROM T_t', timeout=1))  # 连接仍可用
+
+    def test_02_write_timeout(self):
+        self.assertRaises(SqlTimeoutError, self.sql.write_db,
+                          f'UPDATE T_t SET v = ({_SLOW})', timeout=0.05)
+        self.assertEqual([(1,), (2,), (3,)], self.sql.select('t', 'v', timeout=1))  # 已回滚
+
+    def test_03_nested(self):
+        with self.sql.time_limit(0.05):
+            with self.assertRaises(SqlTimeoutError):
+                with self.sql.time_limit(10):  # 以较早的截止时间为准
+                    self.sql.read_db(_SLOW)
+        self.assertEqual(1, self.sql.read_db('SELECT 1')[0][0])
+
+
+class _RawConnection:
+    """假的 pymysql 连接：语句执行 sleep 秒；被 KILL 时抛出 1317"""
+
+    def __init__(self, sleep=0.0):
+        self.host, self.port, self.user, self.password = 'db1', 3307, 'u', b'p'
+        self.sleep = sleep
+        self.executed = []
+        self.killed = threading.Event()
+
+    def thread_id(self):
+        return 42
+
+    def cursor(self, *args):
+        return _Cursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = (('x',),)
+
+    def execute(self, command, args=None):
+        self.conn.executed.append(command)
+        if self.conn.killed.wait(self.conn.sleep) if self.conn.sleep else False:
+            raise pymysql.err.OperationalError(1317, 'Query execution was interrupted')
+        return 1
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _Pooled:
+    """模拟 DBUtils：PooledDedicatedDBConnection -> SteadyDBConnection -> 原始连接，只转发 cursor 等方法"""
+
+    def __init__(self, con):
+        self._con = con
+
+    def cursor(self, *args):
+        return self._con.cursor(*args)
+
+    def commit(self):
+        self._con.commit()
+
+    def rollback(self):
+        self._con.rollback()
+
+
+class _Killer:
+    """假的 KILL 连接，记录连接参数与语句，并通知被中断的连接"""
+
+    def __init__(self, victim):
+        self.victim, self.connects, self.executed = victim, [], []
+
+    def __call__(self, **kwargs):
+        self.connects.append(kwargs)
+        return self
+
+    def cursor(self):
+        return self
+
+    def execute(self, command):
+        self.executed.append(command)
+        self.victim.killed.set()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def _mysql(conn):
+    api = MySqlAPI.__new__(MySqlAPI)
+    api.SQL_HOST, api.SQL_PORT, api.SQL_USER, api.SQL_PASSWD = 'primary', 3306, 'root', 'secret'
+    api._sql, api.pooled_sql, api._router, api.spool = conn, None, None, None
+    api.retry_policy = api.circuit_breaker = None
+    api.sticky_seconds, api.convert_types = 0, False
+    api._local = threading.local()
+    return api
+
+
+class TESTMySqlTimeout(unittest.TestCase):
+
+    def test_01_kill_pooled_write(self):
+        raw = _RawConnection(sleep=2)
+        api, killer = _mysql(_Pooled(_Pooled(raw))), _Killer(raw)
+        self.assertEqual(('db1', 3307, 'u', b'p', 42), api._kill_target(api._sql))
+        with mock.patch.object(mysqlbase.pymysql, 'connect', killer):
+            start = time.monotonic()
+            with self.assertRaises(SqlTimeoutError) as _c:  # SqlWriteError 转换为 SqlTimeoutError
+                api.write_db('UPDATE t SET v = 1', timeout=0.05)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertIsInstance(_c.exception.__cause__, SqlWriteError)
+        self.assertEqual(['KILL QUERY 42'], killer.executed)
+        self.assertEqual({'host': 'db1', 'port': 3307, 'user': 'u', 'password': b'p', 'connect_timeout': 5},
+                         killer.connects[0])
+
+    def test_02_fallback_credentials(self):
+        class _Bare:
+            def thread_id(self):
+                return 7
+
+        self.assertEqual(('primary', 3306, 'root', 'secret', 7), _mysql(None)._kill_target(_Pooled(_Bare())))
+
+    def test_03_no_kill_when_done(self):
+        raw = _RawConnection()
+        api, killer = _mysql(_Pooled(raw)), _Killer(raw)
+        with mock.patch.object(mysqlbase.pymysql, 'connect', killer):
+            api.write_db('UPDATE t SET v = 1', timeout=0.05)
+            time.sleep(0.1)
+        self.assertEqual([], killer.executed)
+
+    def test_04_max_execution_time(self):
+        raw = _RawConnection()
+        api = _mysql(raw)
+        with api.time_limit(2):
+            api.read_db('  select x FROM t')
+            api.read_db('SHOW TABLES')
+        api.read_db('SELECT x FROM t')
+        self.assertRegex(raw.executed[0], r'^SELECT /\*\+ MAX_EXECUTION_TIME\((1\d{3}|2000)\) \*/ x FROM t$')
+        self.assertEqual(['SHOW TABLES', 'SELECT x FROM t'], raw.executed[1:])
+        with api.time_limit(0.01):
+            time.sleep(0.02)
+            self.assertRaises(SqlTimeoutError, api.read_db, 'SELECT 1')  # 已过截止时间，不执行
+        self.assertEqual(3, len(raw.executed))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_transfer.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 10:40
+
+UNITTEST for 数据导入导出
+"""
+import csv
+import json
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import unittest.mock
+from decimal import Decimal
+from pathlib import Path
+
+from sqllib import copy_table
+from sqllib.common.base_sql import BaseSQL
+from sqllib.common.transfer import translate_schema
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.error import *
+
+table_name = 'TRANSFER'
+table_structure = ('_ID INT AUTO_INCREMENT PRIMARY KEY , '
+                   'NAME VARCHAR(20) NOT NULL, '
+                   'PRICE DOUBLE, '
+                   'DATA MEDIUMBLOB')
+rows = 1000
+
+
+class TESTTransfer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.workdir = Path(tempfile.mkdtemp())
+        cls.sql = SQLiteAPI(cls.workdir / 'transfer.sqlite', prefix='UT_')
+        cls.sql.enable_wal()
+        cls.sql.create_table(table_name, table_structure)
+        cls.sql.insert(table_name,
+                       NAME=tuple(f'name-{i}' for i in range(rows)),
+                       PRICE=tuple(i / 4 for i in range(rows)),
+                       DATA=tuple(bytes([i % 256]) for i in range(rows)))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.sql.close()
+        shutil.rmtree(cls.workdir)
+
+    def test_01_range_key(self):
+        self.assertEqual('_ID', self.sql.range_key(table_name))
+
+    def test_02_base_defaults(self):
+        self.assertFalse({'columns_info', 'range_key', 'fork', '_iter_db'} & BaseSQL.__abstractmethods__)
+        self.assertIsNone(BaseSQL.range_key(self.sql, table_name))
+        self.assertRaises(SqlModuleError, BaseSQL.fork, self.sql)
+        self.assertRaises(SqlModuleError, BaseSQL.columns_info, self.sql, table_name)
+        batches = list(BaseSQL._iter_db(self.sql, f'SELECT _ID FROM UT_{table_name} WHERE _ID <= 5', batch_rows=2))
+        self.assertEqual([[(1,), (2,)], [(3,), (4,)], [(5,)]], batches)
+
+    def test_11_export_csv_parallel(self):
+        path = self.workdir / 'out.csv'
+        self.assertEqual(rows, self.sql.export_table(table_name, path, chunk_rows=64, workers=4))
+        with open(path, encoding='utf8', newline='') as fp:
+            _lines = list(csv.reader(fp))
+        self.assertEqual(['_ID', 'NAME', 'PRICE', 'DATA'], _lines[0])
+        self.assertEqual([str(i) for i in range(1, rows + 1)], [_[0] for _ in _lines[1:]], '导出顺序错误')
+
+    def test_12_export_jsonl(self):
+        path = self.workdir / 'out.jsonl'
+        self.sql.export_table(table_name, path, format='jsonl', chunk_rows=100, workers=2, cols=['NAME', 'PRICE'])
+        with open(path, encoding='utf8') as fp:
+            _first = json.loads(fp.readline())
+        self.assertEqual({'NAME': 'name-0', 'PRICE': 0.0}, _first)
+
+    def test_13_export_format_error(self):
+        self.assertRaises(SqlModuleError, self.sql.export_table, table_name, self.workdir / 'x', format='xml')
+
+    def test_21_import_roundtrip(self):
+        path = self.workdir / 'roundtrip.csv'
+        self.sql.export_table(table_name, path, cols=['NAME', 'PRICE', 'DATA'])
+        self.sql.create_table('IMPORTED', table_structure, exists_ok=True)
+        _progress = []
+        self.assertEqual(rows, self.sql.import_file('IMPORTED', path, batch_rows=300, progress=_progress.append))
+        self.assertEqual([300, 600, 900, 1000], _progress)
+        self.assertEqual(self.sql.select(table_name, 'NAME', 'PRICE', 'DATA'),
+                         self.sql.select('IMPORTED', 'NAME', 'PRICE', 'DATA'))
+        self.sql.drop_table('IMPORTED')
+
+    def test_21_csv_null_roundtrip(self):
+        path = self.workdir / 'nulls.csv'
+        self.sql.create_table('NULLS', 'ID INTEGER PRIMARY KEY, T TEXT, N INT', exists_ok=True)
+        self.sql.insert('NULLS', ID=[1, 2, 3], T=[None, '', 'x'], N=[None, 0, 5])
+        self.sql.export_table('NULLS', path, cols=['ID', 'T', 'N'])
+        self.assertIn('1,\\N,\\N', path.read_text(encoding='utf8'))
+        self.sql.create_table('NULLS2', 'ID INTEGER PRIMARY KEY, T TEXT, N INT', exists_ok=True)
+        self.sql.import_file('NULLS2', path)
+        self.assertEqual([(1, None, None), (2, '', 0), (3, 'x', 5)], self.sql.select('NULLS2', '*', ORDER='ID'))
+        self.sql.drop_table('NULLS')
+        self.sql.drop_table('NULLS2')
+
+    def test_22_import_resume_checkpoint(self):
+        path = self.workdir / 'resume.jsonl'
+        checkpoint = self.workdir / 'resume.ckpt'
+        self.sql.export_table(table_name, path, format='jsonl', cols=['NAME', 'PRICE'])
+        self.sql.create_table('RESUMED', table_structure, exists_ok=True)
+
+        def _interrupt(done):
+            if done >= 400:
+                raise KeyboardInterrupt
+
+        self.assertRaises(KeyboardInterrupt, self.sql.import_file, 'RESUMED', path, 'jsonl',
+                          batch_rows=200, progress=_interrupt, checkpoint=checkpoint)
+        self.assertTrue(checkpoint.exists())
+        self.assertEqual(rows, self.sql.import_file('RESUMED', path, 'jsonl', batch_rows=200, checkpoint=checkpoint))
+        self.assertFalse(checkpoint.exists())
+        self.assertEqual(self.sql.select(table_name, 'NAME'), self.sql.select('RESUMED', 'NAME', ORDER='_ID'))
+        self.sql.drop_table('RESUMED')
+
+    def test_22_import_checkpoint_other_file(self):
+        path, other = self.workdir / 'ckpt_a.csv', self.workdir / 'ckpt_b.csv'
+        checkpoint = self.workdir / 'other.ckpt'
+        for _p in (path, other):
+            _p.write_text('NAME\na\nb\n', encoding='utf8')
+        checkpoint.write_text(json.dumps({'file': str(other), 'rows': 1}), encoding='utf8')
+        with self.assertRaises(SqlModuleError):
+            self.sql.import_file(table_name, path, checkpoint=checkpoint)
+        self.assertTrue(checkpoint.exists())
+
+    def test_23_import_unknown_column(self):
+        path = self.workdir / 'unknown.csv'
+        path.write_text('NAME,NOT_EXISTS\na,b\n', encoding='utf8')
+        self.assertRaises(SqlKeyNameError, self.sql.import_file, table_name, path)
+        with self.assertRaises(SqlKeyNameError) as _ctx:  # 文件中缺少指定的列
+            self.sql.import_file(table_name, path, columns=['NAME', 'PRICE'])
+        self.assertIn('PRICE', str(_ctx.exception))
+
+
+    def test_31_copy_table(self):
+        with SQLiteAPI(self.workdir / 'copy.sqlite', prefix='CP_') as dst:
+            self.assertEqual(rows, copy_table(self.sql, dst, table_name, batch_rows=128, queue_size=2))
+            self.assertEqual(self.sql.select(table_name, '*'), dst.select('UT_' + table_name, '*'))
+            self.assertEqual('_ID', dst.range_key('UT_' + table_name))
+
+    def test_32_copy_table_memory(self):
+        """内存数据库退回串行复制"""
+        with SQLiteAPI(':memory:') as src, SQLiteAPI(':memory:') as dst:
+            src.create_table('T', 'A INT NOT NULL, B TEXT')
+            src.insert('T', A=tuple(range(10)), B=tuple(map(str, range(10))))
+            self.assertEqual(10, copy_table(src, dst, 'T', batch_rows=3))
+            self.assertEqual(src.select('T', '*'), dst.select('T', '*'))
+            self.assertEqual([True, False], [_['notnull'] for _ in dst.columns_info('T')])
+
+    def test_32_copy_table_isolated_iter(self):
+        """iter_db() 自己使用独立连接的后端(MySQL)不再 fork；fork 失败时读线程报告错误而不是挂起"""
+        src = SQLiteAPI(self.workdir / 'transfer.sqlite', prefix='UT_', check_same_thread=False)
+        src.fork = unittest.mock.Mock(side_effect=SqlModuleError('不应调用 fork'))
+        with SQLiteAPI(self.workdir / 'copy_iso.sqlite', prefix='CI_') as dst:
+            self.assertRaises(SqlModuleError, copy_table, src, dst, table_name, batch_rows=128)
+            src.iter_db_isolated = True
+            self.assertEqual(rows, copy_table(src, dst, table_name, batch_rows=128))
+            self.assertEqual(rows, len(dst.select('UT_' + table_name, '_ID')))
+        src.close()
+
+    def test_33_mysql_schema(self):
+        """SQLite -> MySQL 的字段定义：主键与索引中的 TEXT / BLOB 列不能是 LONGTEXT / LONGBLOB"""
+        with SQLiteAPI(':memory:') as src:
+            src.create_table('city', 'code TEXT PRIMARY KEY, name TEXT NOT NULL, tag, raw BLOB, n INTEGER, '
+                                     'p NUMERIC, r REAL')
+            src.create_index('city', ['tag', 'raw'])
+            self.assertEqual('`code` VARCHAR(255), `name` LONGTEXT NOT NULL, `tag` VARCHAR(255), '
+                             '`raw` VARBINARY(255), `n` BIGINT, `p` DECIMAL(65, 10), `r` DOUBLE, PRIMARY KEY (`code`)',
+                             translate_schema(src, 'city'))
+
+    def test_34_decimal_adapter_scoped(self):
+        with SQLiteAPI(':memory:') as sql:
+            sql.create_table('D', 'V TEXT')
+            sql.insert('D', V=Decimal('1.10'))
+            sql.write_rows('INSERT INTO D VALUES (?)', [(Decimal('2.20'),)])
+            self.assertEqual([('1.10',), ('2.20',)], sql.read_db('SELECT V FROM D WHERE V >= ?', (Decimal('1'),)))
+        other = sqlite3.connect(':memory:')  # 其他 sqlite3 连接不受影响
+        self.assertRaises(sqlite3.ProgrammingError, other.execute, 'SELECT ?', (Decimal('1'),))
+        other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
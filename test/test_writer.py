@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+@File Name  : test_writer.py
+@Author     : LeeCQ
+@Date-Time  : 2026/10/19 14:30
+
+UNITTEST for BufferedWriter
+"""
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from sqllib import BufferedWriter
+from sqllib.SQLite.sqlite import SQLiteAPI
+from sqllib.common.error import *
+
+
+class TESTBufferedWriter(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.workdir = Path(tempfile.mkdtemp())
+        self.sql = SQLiteAPI(self.workdir / 'writer.sqlite')
+        self.sql.create_table('W', 'A INT PRIMARY KEY, B VARCHAR(10)')
+
+    def tearDown(self) -> None:
+        self.sql.close()
+        shutil.rmtree(self.workdir)
+
+    def test_01_batch_and_close(self):
+        with BufferedWriter(self.sql, 'W', ['A', 'B'], batch_rows=100, interval=10) as writer:
+            writer.write_many((i, str(i)) for i in range(250))
+            writer.write({'A': 250, 'B': 'dict'})
+        self.assertEqual(251, self.sql.select('W', 'COUNT(*)')[0][0])
+
+    def test_02_flush(self):
+        writer = BufferedWriter(self.sql, 'W', ['A', 'B'], batch_rows=1000, interval=10)
+        writer.write((1, 'a'))
+        writer.flush()
+        self.assertEqual([(1, 'a')], self.sql.select('W', '*'))
+        writer.close()
+        self.assertRaises(SqlModuleError, writer.write, (2, 'b'))
+
+    def test_03_interval(self):
+        with BufferedWriter(self.sql, 'W', ['A', 'B'], batch_rows=1000, interval=0.05) as writer:
+            writer.write((1, 'a'))
+            time.sleep(0.5)
+            self.assertEqual(1, len(self.sql.select('W', '*')))
+
+    def test_04_error_callback(self):
+        errors = []
+        with BufferedWriter(self.sql, 'W', ['A', 'B'], batch_rows=2, on_error=errors.append) as writer:
+            writer.write_many([(1, 'a'), (1, 'duplicate')])
+        self.assertIsInstance(errors[0], SqlBufferedWriteError)
+        self.assertEqual([(1, 'a'), (1, 'duplicate')], errors[0].rows)
+
+    def test_05_error_raised_on_flush(self):
+        writer = BufferedWriter(self.sql, 'W', ['A', 'B'])
+        writer.write_many([(1, 'a'), (1, 'duplicate')])
+        self.assertRaises(SqlWriteError, writer.flush)
+        writer.close()
+
+    def test_06_callback_raises(self):
+        def _on_error(error):
+            raise RuntimeError('callback failed')
+
+        writer = BufferedWriter(self.sql, 'NOPE', ['A', 'B'], on_error=_on_error)
+        writer.write((1, 'a'))
+        writer.flush()  # 回调出错不会让后台线程退出，flush() 不会阻塞
+        writer.write((2, 'b'))
+        writer.close()
+
+    def test_07_connect_error(self):
+        class _Unreachable(SQLiteAPI):
+            def fork(self, read_only=False):
+                raise ConnectionError('database is down')
+
+        sql = _Unreachable(self.workdir / 'writer.sqlite')
+        writer = BufferedWriter(sql, 'W', ['A', 'B'])
+        writer.write((1, 'a'))
+        with self.assertRaises(SqlBufferedWriteError) as _c:
+            writer.flush()
+        self.assertEqual([(1, 'a')], _c.exception.rows)
+        writer.close()
+        sql.close()
+
+    def test_08_thread_died(self):
+        writer = BufferedWriter(self.sql, 'W', ['A', 'B'], max_queue=2)
+        writer._write = lambda api, rows: 1 / 0  # 模拟后台线程的意外错误
+        writer.write((1, 'a'))
+        self.assertRaises(SqlBufferedWriteError, writer.flush)
+        writer._thread.join()
+        self.assertRaises(SqlBufferedWriteError, writer.write_many, [(2, 'b')] * 5)
+        writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()